@@ -0,0 +1,47 @@
+import os
+import json
+import time
+import logging
+
+from database.write_behind import WriteBehindBuffer
+
+logger = logging.getLogger(__name__)
+
+
+class ActivationLog:
+    """
+    AKTİVASYON KAYDI (Opsiyonel, MYTRANSLATOR_ACTIVATION_LOG=yol)
+    Her önbellek araması JSON-lines olarak eklenir: {"ts", "text", "style", "tier", "score"}.
+    Kayıt, fuzzy eşik/puanlayıcı seçimi için çevrimdışı tekrar oynatılır:
+        python -m database.fuzzy_eval activations.jsonl --db mytranslator.db
+    Dosya yazımı write-behind ile toplu yapılır (sıcak yolda disk I/O yok).
+    Not: Kaynak metinler düz metin olarak saklanır; varsayılan olarak kapalıdır.
+    """
+
+    def __init__(self, path, interval=1.0):
+        self.path = path
+        self._writer = WriteBehindBuffer(self._flush, interval=interval, max_batch=1000, name="ActivationLog")
+
+    @classmethod
+    def from_env(cls):
+        path = os.getenv("MYTRANSLATOR_ACTIVATION_LOG", "").strip()
+        return cls(path) if path else None
+
+    def record(self, text, style, cached):
+        tier = "miss"
+        if cached:
+            tier = "remote" if cached.get("source") == "remote" else cached.get("match_type") or "exact"
+        self._writer.add({"ts": time.time(), "text": text, "style": style, "tier": tier,
+                          "score": cached.get("match_score") if cached else None})
+
+    def _flush(self, records):
+        try:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.writelines(json.dumps(record, ensure_ascii=False) + "\n" for record in records)
+            return True
+        except OSError as e:
+            logger.error(f"Activation Log Error: {e}")
+            return False
+
+    def stop(self):
+        self._writer.stop()
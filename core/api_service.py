@@ -2,17 +2,138 @@ import os
 import logging
 import time
 import threading
+import hashlib
+import json
 from google import genai
 from google.genai import types
 from dotenv import load_dotenv
 
+from core.backends import GeminiBackend, BackendRouter
+from core.metrics import metrics
+from core.tokens import (
+    estimate_tokens, output_token_budget, split_for_budget, translation_expansion,
+    EXPANSION_SAME_LANGUAGE, MAX_OUTPUT_TOKENS, MIN_OUTPUT_TOKENS, SAFETY_MARGIN
+)
+
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
+TRANSLATE_SYSTEM_PROMPT = "Translate to Academic Turkish (if input not TR) or Academic English (if TR). No explanations."
+
+HUMANIZE_SYSTEM_PROMPT = """
+You are an expert academic editor. Your task is to rewrite the 'Current Text' to make it indistinguishable from human writing, specifically to bypass AI detection filters.
+
+Goal: High Perplexity and High Burstiness.
+1.  **Perplexity (Complexity):** Avoid predictable word choices. Use varied vocabulary and slightly more complex sentence structures where appropriate for academia.
+2.  **Burstiness (Sentence Variation):** AI generates sentences of uniform length. You must vary sentence length significantly. Mix short, punchy sentences with longer, complex compound sentences.
+
+Strict Rules:
+-   **CRITICAL:** OUTPUT MUST BE IN THE SAME LANGUAGE AS THE 'Current Text'.
+-   **NEVER** translate the text back to the 'Source Reference Text' language.
+-   Preserve the original academic meaning 100%.
+-   Do NOT be too formal/robotic. Use natural transitions (e.g., "Furthermore," "On the other hand," "Crucially").
+-   If 'Current Text' is Turkish -> Output Turkish.
+-   If 'Current Text' is English -> Output English.
+-   Output ONLY the rewritten text.
+"""
+
+BATCH_INSTRUCTION = (
+    " The input is a JSON array of independent texts. Translate each item separately and"
+    " return ONLY a JSON array of strings with the same length and order."
+)
+
+# --- STİL PROFİLLERİ ---
+# Veritabanında (style_profiles) tablo boşsa bunlarla (prompt'suz) doldurulur; kullanıcı düzenleyebilir.
+DEFAULT_STYLE = "Academic"
+DEFAULT_STYLE_PROFILES = [
+    {"name": "Academic", "system_prompt": TRANSLATE_SYSTEM_PROMPT, "temperature": 0.3},
+    {"name": "Casual", "temperature": 0.5,
+     "system_prompt": "Translate to natural, everyday Turkish (if input not TR) or natural English (if TR). No explanations."},
+    {"name": "Technical", "temperature": 0.2,
+     "system_prompt": "Translate to precise technical Turkish (if input not TR) or technical English (if TR). "
+                      "Keep code, identifiers, units and established English terms unchanged. No explanations."},
+]
+
+# Hazır profillerin prompt'u DB'ye yazılmaz (system_prompt NULL): Kod güncellenince
+# mevcut veritabanları da yeni metni kullanır. Sadece kullanıcının değiştirdiği prompt saklanır.
+BUILTIN_STYLE_PROMPTS = {p["name"]: p["system_prompt"] for p in DEFAULT_STYLE_PROFILES}
+
+# Toplu istekte her öğe için JSON tırnak/virgül ek yükü (token)
+BATCH_ITEM_OVERHEAD = 4
+
+# --- METRİKLER ---
+API_TTFT = metrics.histogram("mytranslator_api_ttft_seconds", "İlk token süresi")
+API_DURATION = metrics.histogram("mytranslator_api_duration_seconds", "İstek toplam süresi")
+API_TOKENS = metrics.counter("mytranslator_api_tokens_total", "Girdi/çıktı token sayısı")
+ERRORS = metrics.counter("mytranslator_errors_total", "Hata sayısı (bileşen bazında)")
+
+# Çıktı MAX_TOKENS ile kesilirse kaç kez devam isteği atılacağı
+MAX_CONTINUATIONS = 2
+CONTINUE_PROMPT = "Continue exactly where you stopped. Do not repeat anything already written. No explanations."
+
+
+def prompt_fingerprint(*parts):
+    """Prompt/model değişikliklerini ayırt etmek için kısa, kararlı bir hash."""
+    digest = hashlib.sha1("\x1f".join(str(p) for p in parts).encode("utf-8"))
+    return digest.hexdigest()[:12]
+
+
+class StyleProfile:
+    """
+    Tek bir stil profili ve ÖNCEDEN OLUŞTURULMUŞ istek ayarları.
+    GenerateContentConfig'ler profil yüklenirken bir kez kurulur, her istekte tekrar kullanılır.
+    prompt_hash (model + prompt) önbellekte bu stilin kayıtlarını etiketler.
+    """
+
+    def __init__(self, name, system_prompt, model_name, temperature=0.3, max_output_tokens=None):
+        self.name = name
+        self.system_prompt = system_prompt
+        self.model_name = model_name
+        self.temperature = temperature
+        self.max_output_tokens = max_output_tokens
+        self.prompt_hash = prompt_fingerprint(model_name, system_prompt)
+        self.settings = (system_prompt, model_name, temperature, max_output_tokens)
+        # ⚡️ OPTİMİZASYON: Token Limiti & Sade Prompt
+        # 2.5 Flash-Lite'ın varsayılan limiti çok yüksektir (65k+), ancak
+        # biz anlık hız için 2048 token (yaklaşık 1500 kelime) ile sınırlandırıyoruz.
+        # Not: max_output_tokens her istekte girdi uzunluğuna göre yeniden boyutlandırılır.
+        self.stream_config = types.GenerateContentConfig(
+            temperature=temperature,
+            max_output_tokens=max_output_tokens or 2048,
+            system_instruction=system_prompt
+        )
+        # 📦 TOPLU ÇEVİRİ: Çok sayıda kısa metin tek istekte (JSON dizi girdi/çıktı)
+        self.batch_config = types.GenerateContentConfig(
+            temperature=temperature,
+            max_output_tokens=max_output_tokens or 2048,
+            response_mime_type="application/json",
+            system_instruction=system_prompt + BATCH_INSTRUCTION
+        )
+
+
 class APIService:
     def __init__(self):
+        # ⚡️ GÜNCEL HIZ MOTORU: Gemini 2.5 Flash-Lite
+        # Ultra düşük gecikme (latency) ve yüksek işlem hacmi için optimize edilmiş
+        # en kararlı ve hızlı sürümdür.
+        self.model_name = "gemini-2.5-flash-lite"
+
+        # 🏷️ CACHE ETİKETİ: Önbellekteki çeviriler bu model + prompt parmak izi ile
+        # işaretlenir. Prompt değişirse eski kayıtlar "stale" sayılır.
+        self.system_instruction = TRANSLATE_SYSTEM_PROMPT
+        self.prompt_hash = prompt_fingerprint(self.model_name, self.system_instruction)
+        self.humanize_prompt_hash = prompt_fingerprint(self.model_name, HUMANIZE_SYSTEM_PROMPT)
+
+        # 🎨 STİL PROFİLLERİ: isim -> StyleProfile (set_profiles ile veritabanından yüklenir)
+        self.default_style = DEFAULT_STYLE
+        self.profiles = {}
+        self._model_routers = {}
+        self.set_profiles([{"name": DEFAULT_STYLE, "system_prompt": self.system_instruction, "temperature": 0.3}])
+
         self.api_key = os.getenv("GEMINI_API_KEY")
         if not self.api_key:
-            logging.error("❌ API Key missing!")
+            logger.error("❌ API Key missing!")
             return
 
         self.client = genai.Client(
@@ -20,26 +141,78 @@ class APIService:
             http_options={'api_version': 'v1beta'}
         )
 
-        # ⚡️ GÜNCEL HIZ MOTORU: Gemini 2.5 Flash-Lite
-        # Ultra düşük gecikme (latency) ve yüksek işlem hacmi için optimize edilmiş
-        # en kararlı ve hızlı sürümdür.
-        self.model_name = "gemini-2.5-flash-lite" 
-        
-        # ⚡️ OPTİMİZASYON: Token Limiti & Sade Prompt
-        # 2.5 Flash-Lite'ın varsayılan limiti çok yüksektir (65k+), ancak
-        # biz anlık hız için 2048 token (yaklaşık 1500 kelime) ile sınırlandırıyoruz.
-        self.stream_config = types.GenerateContentConfig(
-            temperature=0.3,
-            max_output_tokens=2048,
-            system_instruction="Translate to Academic Turkish (if input not TR) or Academic English (if TR). No explanations."
+        # 🔀 ÇOKLU BACKEND: Birincil model + GEMINI_FALLBACK_MODELS (virgülle ayrılmış,
+        # "model" veya "model@https://endpoint" biçiminde). En hızlı sağlıklı olana yönlendirilir.
+        self.router = BackendRouter(
+            self._build_backends(),
+            hedge=os.getenv("MYTRANSLATOR_HEDGE", "0") == "1"
         )
 
+        # 📊 Kullanım kaydı: Her istek sonunda çağrılır (örn. DatabaseManager.add_usage)
+        self.usage_callback = None
+
         # 🛡️ ÇİFTE KORUMA (Latency Önleyici)
         # Warmup: İlk açılıştaki SSL el sıkışmasını yapar.
         # Heartbeat: Bağlantıyı sürekli canlı tutar.
         self.warmup()
         self._start_heartbeat()
 
+    def set_profiles(self, records):
+        """
+        Profilleri (dict: name, system_prompt, temperature, model, max_output_tokens) yükler.
+        system_prompt boşsa hazır profilin koddaki prompt'u kullanılır.
+        Ayarları değişmeyen profillerin hazır config'leri korunur.
+        """
+        profiles = {}
+        for record in records:
+            prompt = record.get("system_prompt") or BUILTIN_STYLE_PROMPTS.get(record["name"], TRANSLATE_SYSTEM_PROMPT)
+            profile = StyleProfile(record["name"], prompt,
+                                   record.get("model") or self.model_name,
+                                   record.get("temperature") if record.get("temperature") is not None else 0.3,
+                                   record.get("max_output_tokens"))
+            previous = self.profiles.get(profile.name)
+            profiles[profile.name] = previous if previous and previous.settings == profile.settings else profile
+        self.profiles = profiles
+
+    def profile(self, style=None):
+        """Stilin profili; tanımsız stil varsayılan profili kullanır (önbellek yine stile göre ayrılır)."""
+        return self.profiles.get(style or self.default_style) or self.profiles.get(self.default_style) \
+            or next(iter(self.profiles.values()))
+
+    def _router_for(self, profile):
+        """Profil farklı bir model istiyorsa o modele ait (tekrar kullanılan) router."""
+        if profile is None or profile.model_name == self.model_name:
+            return self.router
+        router = self._model_routers.get(profile.model_name)
+        if router is None:
+            router = self._model_routers[profile.model_name] = BackendRouter(
+                [GeminiBackend(lambda: self.client, profile.model_name)])
+        return router
+
+    def _build_backends(self):
+        backends = [GeminiBackend(lambda: self.client, self.model_name)]
+        for entry in os.getenv("GEMINI_FALLBACK_MODELS", "").split(","):
+            entry = entry.strip()
+            if not entry or entry == self.model_name:
+                continue
+            model, _, base_url = entry.partition("@")
+            if base_url:
+                client = genai.Client(
+                    api_key=self.api_key,
+                    http_options={'api_version': 'v1beta', 'base_url': base_url}
+                )
+                backends.append(GeminiBackend(lambda c=client: c, model, name=entry))
+            else:
+                backends.append(GeminiBackend(lambda: self.client, model))
+        return backends
+
+    def _ping_backends(self):
+        for backend in self.router.backends:
+            try:
+                backend.ping()
+            except Exception as e:
+                logger.debug(f"Ping hatası ({backend.name}): {e}")
+
     def warmup(self):
         """
         WARMUP (Isınma)
@@ -48,17 +221,13 @@ class APIService:
         """
         def _warmup_task():
             try:
-                logging.info(f"🔥 [Warmup] {self.model_name} motoru ısıtılıyor...")
-                self.client.models.generate_content(
-                    model=self.model_name,
-                    contents="Hi",
-                    config=types.GenerateContentConfig(max_output_tokens=1)
-                )
-                logging.info("✅ [Warmup] Motor ısındı ve hazır!")
+                logger.info(f"🔥 [Warmup] {self.model_name} motoru ısıtılıyor...")
+                self._ping_backends()
+                logger.info("✅ [Warmup] Motor ısındı ve hazır!")
             except Exception as e:
-                logging.warning(f"Isınma hatası (Önemli değil): {e}")
+                logger.warning(f"Isınma hatası (Önemli değil): {e}")
 
-        threading.Thread(target=_warmup_task, daemon=True).start()
+        threading.Thread(target=_warmup_task, daemon=True, name="APIWarmup").start()
 
     def _start_heartbeat(self):
         """
@@ -69,45 +238,124 @@ class APIService:
         def _beat():
             # Warmup ile çakışmaması için 5 saniye bekle
             time.sleep(5) 
-            logging.info("💓 [Heartbeat] Servisi devrede.")
+            logger.info("💓 [Heartbeat] Servisi devrede.")
             
             while True:
                 # 45 saniyede bir (Google genelde 60sn'de hattı keser, biz 45 ile güvenli oynuyoruz)
                 time.sleep(45)
                 try:
                     # Boş bir ping at (Token maliyeti yok gibidir)
-                    self.client.models.generate_content(
-                        model=self.model_name,
-                        contents=".",
-                        config=types.GenerateContentConfig(max_output_tokens=1)
-                    )
+                    self._ping_backends()
                     # Logları kirletmemek için pass geçiyoruz, arka planda sessizce çalışır.
                 except Exception:
                     pass 
 
-        threading.Thread(target=_beat, daemon=True).start()
+        threading.Thread(target=_beat, daemon=True, name="APIHeartbeat").start()
+
+    @staticmethod
+    def _finish_reason(chunk):
+        candidates = getattr(chunk, "candidates", None)
+        if not candidates:
+            return None
+        try:
+            return candidates[0].finish_reason
+        except (IndexError, TypeError, AttributeError):
+            return None
+
+    @staticmethod
+    def _usage_counts(chunk):
+        usage = getattr(chunk, "usage_metadata", None)
+        if usage is None:
+            return None
+        prompt = getattr(usage, "prompt_token_count", None)
+        output = getattr(usage, "candidates_token_count", None)
+        return (prompt if isinstance(prompt, int) else 0, output if isinstance(output, int) else 0)
+
+    def _record_usage(self, record):
+        if not self.usage_callback: return
+        try:
+            self.usage_callback(record)
+        except Exception as e:
+            logger.error(f"Usage Record Error: {e}")
+
+    @staticmethod
+    def _continuation_request(contents, output):
+        return [
+            types.Content(role="user", parts=[types.Part(text=contents)]),
+            types.Content(role="model", parts=[types.Part(text=output)]),
+            types.Content(role="user", parts=[types.Part(text=CONTINUE_PROMPT)]),
+        ]
+
+    def _stream_with_budget(self, kind, contents, base_config, budget_text, expansion, partial="", profile=None):
+        """
+        ADAPTİF TOKEN LİMİTİ + KESİNTİSİZ DEVAM
+        max_output_tokens girdi uzunluğu ve dil yönüne göre boyutlandırılır.
+        Çıktı MAX_TOKENS ile kesilirse, o ana kadarki çıktı ile birlikte
+        "devam et" isteği atılır ve stream kaldığı yerden sürer.
+        'partial' verilirse (yarım kalmış iş) ilk istek de bu devam isteğidir.
+        İstek sonunda token kullanımı ve süreler usage_callback'e bildirilir.
+        """
+        max_tokens = output_token_budget(budget_text, expansion)
+        if profile is not None and profile.max_output_tokens:
+            max_tokens = min(max_tokens, profile.max_output_tokens)  # Profilin token tavanı
+        config = base_config.model_copy(update={"max_output_tokens": max_tokens})
+        router = self._router_for(profile)
+        started = time.monotonic()
+        ttft = None
+        output = partial
+        finish = None
+        continuations = 0
+        prompt_tokens = output_tokens = 0
+        request = self._continuation_request(contents, partial) if partial else contents
+        try:
+            while True:
+                finish = None
+                counts = None
+                for chunk in router.stream(request, config):
+                    reason = self._finish_reason(chunk)
+                    if reason is not None:
+                        finish = reason
+                    counts = self._usage_counts(chunk) or counts
+                    if chunk.text:
+                        if ttft is None:
+                            ttft = time.monotonic() - started
+                        output += chunk.text
+                        yield chunk.text
+                if counts:
+                    prompt_tokens += counts[0]
+                    output_tokens += counts[1]
+
+                if finish != types.FinishReason.MAX_TOKENS or continuations >= MAX_CONTINUATIONS:
+                    break
+                continuations += 1
+                logger.info(f"✂️ [{kind}] Çıktı token limitine takıldı, devam ediliyor ({continuations}/{MAX_CONTINUATIONS})...")
+                request = self._continuation_request(contents, output)
+        finally:
+            duration = time.monotonic() - started
+            if ttft is not None:
+                API_TTFT.observe(ttft, kind=kind)
+            API_DURATION.observe(duration, kind=kind)
+            API_TOKENS.inc(prompt_tokens, direction="in", kind=kind)
+            API_TOKENS.inc(output_tokens, direction="out", kind=kind)
+            self._record_usage({
+                "kind": kind,
+                "model": profile.model_name if profile else self.model_name,
+                "prompt_hash": profile.prompt_hash if profile else self.humanize_prompt_hash,
+                "input_chars": len(budget_text),
+                "estimated_input_tokens": estimate_tokens(budget_text),
+                "prompt_tokens": prompt_tokens,
+                "output_tokens": output_tokens,
+                "max_output_tokens": max_tokens,
+                "finish_reason": getattr(finish, "name", None),
+                "continuations": continuations,
+                "ttft_ms": ttft * 1000 if ttft is not None else None,
+                "duration_ms": duration * 1000,
+            })
 
     # ✨ YENİ FONKSİYON: Humanize
     def humanize_text_stream(self, source_text, current_text):
         if not source_text: return
         
-        HUMANIZE_SYSTEM_PROMPT = """
-You are an expert academic editor. Your task is to rewrite the 'Current Text' to make it indistinguishable from human writing, specifically to bypass AI detection filters.
-
-Goal: High Perplexity and High Burstiness.
-1.  **Perplexity (Complexity):** Avoid predictable word choices. Use varied vocabulary and slightly more complex sentence structures where appropriate for academia.
-2.  **Burstiness (Sentence Variation):** AI generates sentences of uniform length. You must vary sentence length significantly. Mix short, punchy sentences with longer, complex compound sentences.
-
-Strict Rules:
--   **CRITICAL:** OUTPUT MUST BE IN THE SAME LANGUAGE AS THE 'Current Text'.
--   **NEVER** translate the text back to the 'Source Reference Text' language.
--   Preserve the original academic meaning 100%.
--   Do NOT be too formal/robotic. Use natural transitions (e.g., "Furthermore," "On the other hand," "Crucially").
--   If 'Current Text' is Turkish -> Output Turkish.
--   If 'Current Text' is English -> Output English.
--   Output ONLY the rewritten text.
-"""
-        
         humanize_config = types.GenerateContentConfig(
             temperature=0.7, 
             max_output_tokens=2048,
@@ -116,36 +364,95 @@ Strict Rules:
 
         user_prompt = f"Source Reference Text:\n{source_text}\n\nCurrent Text:\n{current_text}"
         
-        # DEBUG LOG
-        logging.critical("\n--- HUMANIZE PROMPT ---")
-        logging.critical(f"Source Len: {len(source_text)}")
-        logging.critical("-----------------------")
+        # DEBUG LOG (Sadece istek başına bir satır; chunk döngüsünde log yok)
+        logger.debug(f"Humanize prompt: source_len={len(source_text)} current_len={len(current_text)}")
 
         try:
-            response = self.client.models.generate_content_stream(
-                model=self.model_name,
-                contents=user_prompt,
-                config=humanize_config
-            )
-            for chunk in response:
-                if chunk.text: 
-                    logging.critical(f"DEBUG CHUNK: {chunk.text[:20]}...") # Gelen veriyi gör
-                    yield chunk.text
+            response = self._stream_with_budget("humanize", user_prompt, humanize_config,
+                                                current_text, EXPANSION_SAME_LANGUAGE)
+            yield from response
         except Exception as e:
-            logging.error(f"❌ Humanize Error: {e}")
+            logger.error(f"❌ Humanize Error: {e}")
+            ERRORS.inc(component="humanize")
             yield f" [Error: {str(e)}]"
 
-    def translate_text_stream(self, text):
+    def translate_text_stream(self, text, partial="", style=None):
+        """
+        'partial': Önceki (yarım kalmış) çıktı; verilirse sadece devamı stream edilir.
+        'style': Stil profili (hazır config, prompt ve model); None = varsayılan stil.
+        """
         if not text: return
         try:
-            response = self.client.models.generate_content_stream(
-                model=self.model_name,
-                contents=text,
-                config=self.stream_config
-            )
-            for chunk in response:
-                if chunk.text:
-                    yield chunk.text
+            profile = self.profile(style)
+            expansion = translation_expansion(text)
+            if partial:
+                yield from self._stream_with_budget("resume", text, profile.stream_config, text, expansion, partial, profile)
+                return
+            # Tavan limite sığmayacak kadar uzun girdiler cümle sınırından bölünür
+            max_input = int((MAX_OUTPUT_TOKENS - MIN_OUTPUT_TOKENS) / (expansion * SAFETY_MARGIN))
+            parts = split_for_budget(text, max_input) if estimate_tokens(text) > max_input else [text]
+            for index, part in enumerate(parts):
+                if index:
+                    yield " "
+                yield from self._stream_with_budget("translate", part, profile.stream_config, part, expansion, profile=profile)
         except Exception as e:
-            logging.error(f"❌ API Stream Error: {e}")
+            logger.error(f"❌ API Stream Error: {e}")
+            ERRORS.inc(component="translate")
             yield f" [Hata: {str(e)}]"
+
+    def _pack_batches(self, texts, token_budget):
+        """Metinleri sırayı koruyarak token bütçesini aşmayan gruplara böler."""
+        batch, used = [], 0
+        for index, text in enumerate(texts):
+            cost = estimate_tokens(text) + BATCH_ITEM_OVERHEAD
+            if batch and used + cost > token_budget:
+                yield batch
+                batch, used = [], 0
+            batch.append(index)
+            used += cost
+        if batch:
+            yield batch
+
+    def _parse_batch_output(self, raw, expected):
+        try:
+            items = json.loads(raw)
+        except (TypeError, ValueError):
+            return None
+        if not isinstance(items, list) or len(items) != expected:
+            return None
+        if not all(isinstance(item, str) and item.strip() for item in items):
+            return None
+        return items
+
+    def translate_batch(self, texts, token_budget=1000, style=None):
+        """
+        TOPLU ÇEVİRİ (Glossary, UI metinleri, tablo hücreleri)
+        Kısa metinleri token bütçesine kadar tek bir JSON isteğinde paketler;
+        böylece system_instruction ve istek ek yükü öğe başına değil grup başına ödenir.
+        Çıktı ayrıştırılamazsa o grup tek tek (translate_text_stream) çevrilir.
+        Girdiyle aynı sırada çeviri listesi döndürür.
+        """
+        profile = self.profile(style)
+        results = [None] * len(texts)
+        for batch in self._pack_batches(texts, token_budget):
+            items = [texts[i] for i in batch]
+            parsed = None
+            if len(items) > 1:
+                try:
+                    payload = json.dumps(items, ensure_ascii=False)
+                    raw = "".join(self._stream_with_budget(
+                        "batch", payload, profile.batch_config, payload, translation_expansion(payload), profile=profile
+                    ))
+                    parsed = self._parse_batch_output(raw, len(items))
+                    if parsed is None:
+                        logger.warning(f"⚠️ [Batch] Çıktı ayrıştırılamadı, {len(items)} öğe tek tek çevrilecek.")
+                except Exception as e:
+                    logger.error(f"❌ Batch Error: {e}")
+                    ERRORS.inc(component="batch")
+
+            if parsed is None:
+                parsed = ["".join(self.translate_text_stream(item, style=style)) for item in items]
+
+            for index, translation in zip(batch, parsed):
+                results[index] = translation
+        return results
@@ -0,0 +1,259 @@
+import abc
+import time
+import queue
+import logging
+import threading
+from collections import deque
+
+from core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+BACKEND_TTFT = metrics.histogram("mytranslator_backend_ttft_seconds", "Backend bazında ilk token süresi")
+BACKEND_ERRORS = metrics.counter("mytranslator_backend_errors_total", "Backend bazında hata sayısı")
+HEDGES = metrics.counter("mytranslator_hedged_requests_total", "Hedge edilen istek sayısı")
+
+
+class TranslationBackend(abc.ABC):
+    """
+    BACKEND ARAYÜZÜ
+    Her backend (model veya endpoint) aynı imzayla stream eder:
+    stream(contents, config) -> .text alanı olan chunk'lar üreten bir iterator.
+    Testlerde gerçek ağ yerine sahte (fake) backend'ler kullanılabilir.
+    stream() tanımlamayan alt sınıf örneklenemez (TypeError).
+    """
+    name = "backend"
+    model_name = None
+
+    @abc.abstractmethod
+    def stream(self, contents, config):
+        """Chunk iterator'ı döndürür."""
+
+    def ping(self):
+        """Bağlantıyı sıcak tutmak için (Warmup/Heartbeat). İsteğe bağlı."""
+        pass
+
+
+class GeminiBackend(TranslationBackend):
+    def __init__(self, get_client, model_name, name=None):
+        # get_client: İstemciyi çağrı anında döndürür (istemci sonradan değiştirilebilir)
+        self.get_client = get_client
+        self.model_name = model_name
+        self.name = name or model_name
+
+    def stream(self, contents, config):
+        return self.get_client().models.generate_content_stream(
+            model=self.model_name,
+            contents=contents,
+            config=config
+        )
+
+    def ping(self):
+        from google.genai import types
+        self.get_client().models.generate_content(
+            model=self.model_name,
+            contents=".",
+            config=types.GenerateContentConfig(max_output_tokens=1)
+        )
+
+
+class BackendStats:
+    """Backend başına kayan pencere TTFT istatistiği ve sağlık durumu."""
+
+    def __init__(self, window=50):
+        self.ttfts = deque(maxlen=window)
+        self.consecutive_errors = 0
+        self.unhealthy_until = 0.0
+        self._lock = threading.Lock()
+
+    def record_ttft(self, seconds):
+        with self._lock:
+            self.ttfts.append(seconds)
+            self.consecutive_errors = 0
+
+    def record_error(self, max_errors, cooldown):
+        with self._lock:
+            self.consecutive_errors += 1
+            if self.consecutive_errors >= max_errors:
+                self.unhealthy_until = time.monotonic() + cooldown
+
+    def is_healthy(self):
+        return time.monotonic() >= self.unhealthy_until
+
+    def percentile(self, pct, default):
+        with self._lock:
+            samples = sorted(self.ttfts)
+        if not samples:
+            return default
+        index = min(len(samples) - 1, int(round(pct / 100.0 * (len(samples) - 1))))
+        return samples[index]
+
+
+class BackendRouter:
+    """
+    GECİKME TABANLI YÖNLENDİRME
+    - Her backend için kayan TTFT (ilk token süresi) tutulur, en hızlı sağlıklı backend seçilir.
+    - Art arda hata veren backend 'cooldown' süresince devre dışı kalır.
+    - İlk token gelmeden hata olursa sıradaki backend'e düşülür (fallback).
+    - Hedging: İlk token p95 tabanlı süre içinde gelmezse ikinci bir istek başlatılır,
+      ilk token'ı getiren kazanır, diğeri iptal edilir.
+    """
+
+    def __init__(self, backends, hedge=False, max_errors=3, cooldown=30.0,
+                 default_ttft=1.0, min_hedge_delay=0.25, min_samples=5):
+        if not backends:
+            raise ValueError("BackendRouter en az bir backend gerektirir.")
+        self.backends = list(backends)
+        self.stats = {id(b): BackendStats() for b in self.backends}
+        self.hedge = hedge
+        self.max_errors = max_errors
+        self.cooldown = cooldown
+        self.default_ttft = default_ttft
+        self.min_hedge_delay = min_hedge_delay
+        self.min_samples = min_samples
+
+    def stats_for(self, backend):
+        return self.stats[id(backend)]
+
+    def ranked(self):
+        """Sağlıklı backend'ler medyan TTFT'ye göre (ölçülmemişler önce denenir)."""
+        healthy = [b for b in self.backends if self.stats_for(b).is_healthy()]
+        if not healthy:
+            # Hepsi soğumada: En erken iyileşecek olanı yine de dene (half-open)
+            return sorted(self.backends, key=lambda b: self.stats_for(b).unhealthy_until)
+        return sorted(healthy, key=lambda b: self.stats_for(b).percentile(50, 0.0))
+
+    def hedge_delay(self, backend):
+        stats = self.stats_for(backend)
+        if len(stats.ttfts) < self.min_samples:
+            return max(self.min_hedge_delay, self.default_ttft)
+        return max(self.min_hedge_delay, stats.percentile(95, self.default_ttft))
+
+    def _observe_ttft(self, backend, seconds):
+        self.stats_for(backend).record_ttft(seconds)
+        BACKEND_TTFT.observe(seconds, backend=backend.name)
+
+    def _record_error(self, backend, error):
+        logger.warning(f"⚠️ [Router] {backend.name} hata verdi: {error}")
+        BACKEND_ERRORS.inc(backend=backend.name)
+        self.stats_for(backend).record_error(self.max_errors, self.cooldown)
+
+    def stream(self, contents, config):
+        candidates = self.ranked()
+        if self.hedge and len(candidates) > 1:
+            yield from self._stream_hedged(candidates, contents, config)
+        else:
+            yield from self._stream_sequential(candidates, contents, config)
+
+    def _stream_sequential(self, candidates, contents, config):
+        last_error = None
+        for backend in candidates:
+            started = time.monotonic()
+            first = True
+            try:
+                for chunk in backend.stream(contents, config):
+                    if first:
+                        self._observe_ttft(backend, time.monotonic() - started)
+                        first = False
+                    yield chunk
+                return
+            except Exception as e:
+                self._record_error(backend, e)
+                if not first:
+                    raise  # Yarım kalan stream başka backend ile birleştirilemez
+                last_error = e
+        raise last_error
+
+    def _stream_hedged(self, candidates, contents, config):
+        events = queue.Queue()
+        cancels = {}
+        started_at = {}
+        active = set()
+        next_index = 0
+        winner = None
+        last_error = None
+
+        def pump(index, backend, cancel):
+            iterator = None
+            try:
+                iterator = iter(backend.stream(contents, config))
+                for chunk in iterator:
+                    if cancel.is_set():
+                        break
+                    events.put(("chunk", index, chunk))
+                events.put(("done", index, None))
+            except Exception as e:
+                events.put(("error", index, e))
+            finally:
+                close = getattr(iterator, "close", None)
+                if close:
+                    try:
+                        close()
+                    except Exception:
+                        pass
+
+        def launch():
+            nonlocal next_index
+            index = next_index
+            next_index += 1
+            cancels[index] = threading.Event()
+            started_at[index] = time.monotonic()
+            active.add(index)
+            threading.Thread(target=pump, args=(index, candidates[index], cancels[index]),
+                             daemon=True, name=f"Hedge-{candidates[index].name}").start()
+            return index
+
+        def cancel_losers():
+            for index in list(active):
+                if index != winner:
+                    cancels[index].set()
+                    # Kaybeden backend için sansürlü örnek: En az bu kadar yavaştı
+                    self.stats_for(candidates[index]).record_ttft(time.monotonic() - started_at[index])
+            active.intersection_update({winner})
+
+        primary = launch()
+        hedge_at = started_at[primary] + self.hedge_delay(candidates[primary])
+        try:
+            while True:
+                timeout = None
+                if winner is None and hedge_at is not None:
+                    timeout = max(0.0, hedge_at - time.monotonic())
+                try:
+                    kind, index, payload = events.get(timeout=timeout)
+                except queue.Empty:
+                    if next_index < len(candidates):
+                        logger.info(f"🏁 [Router] İlk token gecikti, {candidates[next_index].name} ile hedge ediliyor.")
+                        HEDGES.inc()
+                        launch()
+                    hedge_at = None  # Tek hedge yeterli
+                    continue
+
+                backend = candidates[index]
+                if winner is None:
+                    if kind == "error":
+                        active.discard(index)
+                        self._record_error(backend, payload)
+                        last_error = payload
+                        if not active:
+                            if next_index >= len(candidates):
+                                raise last_error
+                            launch()
+                        continue
+                    winner = index
+                    self._observe_ttft(backend, time.monotonic() - started_at[index])
+                    cancel_losers()
+                    if kind == "done":
+                        return
+                    yield payload
+                elif index == winner:
+                    if kind == "chunk":
+                        yield payload
+                    elif kind == "done":
+                        return
+                    else:
+                        self._record_error(backend, payload)
+                        raise payload
+                # Kaybedenlerden gelen geç olaylar yok sayılır
+        finally:
+            for cancel in cancels.values():
+                cancel.set()
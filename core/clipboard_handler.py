@@ -6,46 +6,66 @@ import platform
 import subprocess
 from pynput import keyboard
 
+logger = logging.getLogger(__name__)
+
 # --- IMPORT GÜNCELLEMESİ: MacOS için Güvenli Pano Erişimi ---
 try:
     if platform.system() == 'Darwin':
         from AppKit import NSPasteboard, NSStringPboardType
 except ImportError:
-    logging.warning("⚠️ AppKit not found. Clipboard features may fail. (pip install pyobjc)")
+    logger.warning("⚠️ AppKit not found. Clipboard features may fail. (pip install pyobjc)")
 
-from core.api_service import APIService
-from database.db_manager import DatabaseManager
+from core.engine import TranslationEngine, CACHE_LOOKUPS
+from core.hotkey import HotkeyEngine, ActivationDispatcher
+from core.metrics import metrics
+from core.scheduler import JobCancelled, raise_if_cancelled, PRIORITY_INTERACTIVE, PRIORITY_HUMANIZE
 
 # --- COMPILED REGEX ---
-RE_HYPHEN = re.compile(r'-\s*\n\s*')
-RE_NEWLINES = re.compile(r'[\n\r]+')
-RE_SPACES = re.compile(r'\s+')
+RE_PARAGRAPH_BREAK = re.compile(r'(\n\s*)')
+
+# Kuyrukta bu süreden fazla bekleyen iş artık anlamsızdır (kullanıcı başka şeye geçmiştir)
+INTERACTIVE_DEADLINE = 10.0
+HUMANIZE_DEADLINE = 30.0
+
+# --- METRİKLER ---
+ACTIVATIONS = metrics.counter("mytranslator_activations_total", "Cmd+C+C aktivasyon sayısı")
 
 class ClipboardHandler:
     def __init__(self, update_callback, move_window_callback):
         self.update_callback = update_callback
         self.move_window_callback = move_window_callback
         
-        # Services
-        self.api = APIService()
-        self.api.warmup() 
-        self.db = DatabaseManager()
+        # Services: Arayüzden bağımsız motor (API, önbellek, worker havuzu, bakım)
+        self.engine = TranslationEngine()
+        self.api = self.engine.api
+        self.db = self.engine.db
+        self.scheduler = self.engine.scheduler
+        self.revalidator = self.engine.revalidator
+        self.maintenance = self.engine.maintenance
+        self._popup_job = None
+        self._popup_job_lock = threading.Lock()
         
         # State
         self.last_text = ""
-        self.last_c_press_time = 0
-        self.c_press_count = 0
+        self.style = self.engine.style  # Popup'taki stil seçici ile değişir
+        self.last_style = self.style
+        self.hotkey = HotkeyEngine()
+        self.dispatcher = ActivationDispatcher(self.hotkey.activations, self._dispatch_activation)
         self._running = False
         self.listener = None
 
     def start(self):
         if self._running: return
         self._running = True
-        threading.Thread(target=self._run_listener, daemon=True).start()
-        logging.info("🎧 Clipboard Handler Started (Cmd+C+C Listening...)")
+        threading.Thread(target=self._run_listener, daemon=True, name="KeyboardListener").start()
+        self.engine.start()
+        self.dispatcher.start()
+        logger.info("🎧 Clipboard Handler Started (Cmd+C+C Listening...)")
 
     def stop(self):
         self._running = False
+        self.dispatcher.stop()
+        self.engine.stop()
         if self.listener:
             self.listener.stop()
 
@@ -53,29 +73,28 @@ class ClipboardHandler:
         with keyboard.Listener(on_press=self.on_press, on_release=self.on_release) as self.listener:
             self.listener.join()
 
+    @staticmethod
+    def key_token(key):
+        """pynput tuşunu HotkeyEngine token'ına çevirir ('cmd', 'c', ...)."""
+        if key in (keyboard.Key.cmd, keyboard.Key.cmd_l, keyboard.Key.cmd_r):
+            return "cmd"
+        char = getattr(key, 'char', None)
+        if char:
+            return char.lower()
+        return getattr(key, 'name', None) or str(key)
+
     def on_press(self, key):
+        # pynput callback thread'i: Sadece durum makinesini besler, iş yapmaz
         if not self._running: return False
-        try:
-            if key == keyboard.Key.cmd:
-                pass 
-            elif hasattr(key, 'char') and key.char == 'c':
-                current_time = time.time()
-                if current_time - self.last_c_press_time < 0.5:
-                    self.c_press_count += 1
-                else:
-                    self.c_press_count = 1
-                
-                self.last_c_press_time = current_time
-
-                if self.c_press_count == 2:
-                    self.c_press_count = 0
-                    threading.Thread(target=self.on_activate, daemon=True).start()
-        except AttributeError:
-            self.c_press_count = 0
+        self.hotkey.press(self.key_token(key))
 
     def on_release(self, key):
-        if key == keyboard.Key.cmd:
-            self.c_press_count = 0
+        self.hotkey.release(self.key_token(key))
+
+    def _dispatch_activation(self):
+        # Aktivasyon anı: popup ilk boyamada "Cmd+C+C -> görünür" süresini ölçer
+        self._submit_popup_job(self.on_activate, time.perf_counter(),
+                               priority=PRIORITY_INTERACTIVE, deadline=INTERACTIVE_DEADLINE)
 
     def get_clipboard_content(self):
         """
@@ -98,24 +117,21 @@ class ClipboardHandler:
                 )
                 return result.stdout
         except Exception as e:
-            logging.error(f"Clipboard Read Error: {e}")
+            logger.error(f"Clipboard Read Error: {e}")
             return None
 
     def clean_text(self, text):
-        if not text: return ""
-        text = RE_HYPHEN.sub('', text)
-        text = RE_NEWLINES.sub(' ', text)
-        text = RE_SPACES.sub(' ', text)
-        return text.strip()
+        return self.engine.clean_text(text)
 
-    def on_activate(self):
+    def on_activate(self, activated_at=None):
         """
         LATENCY OPTİMİZASYONU:
         Eskiden 1 saniyede 10 kere kontrol ediyordu (0.1s gecikme riski).
         Şimdi 1 saniyede 100 kere kontrol ediyor (0.01s gecikme riski).
         Çok daha seri hissettirir.
         """
-        logging.info("🎹 Kısayol (Cmd+C+C) Algılandı - İşleniyor...")
+        logger.info("🎹 Kısayol (Cmd+C+C) Algılandı - İşleniyor...")
+        ACTIVATIONS.inc()
         
         raw_text = None
         for i in range(20): # 20 deneme (Maks 0.2sn - Yeterli)
@@ -125,75 +141,220 @@ class ClipboardHandler:
             time.sleep(0.01) # 10ms bekleme
 
         if not raw_text or not raw_text.strip():
-            logging.warning("⚠️ Pano boş veya okunamadı.")
+            logger.warning("⚠️ Pano boş veya okunamadı.")
             return
 
-        self._process_logic(raw_text)
+        self._process_logic(raw_text, activated_at)
+
+    def _submit_popup_job(self, fn, *args, priority, deadline):
+        """
+        Popup'a yazan işler tek seferde bir tane çalışır: Yeni bir aktivasyon,
+        önceki (artık geçersiz) çeviri/humanize işini iptal eder.
+        """
+        with self._popup_job_lock:
+            if self._popup_job is not None and not self._popup_job.done():
+                self._popup_job.cancel()
+            self._popup_job = self.scheduler.submit(fn, *args, priority=priority, deadline=deadline,
+                                                    name=getattr(fn, "__name__", "popup"))
+            return self._popup_job
 
     def process_clipboard_content(self, raw_text):
-        threading.Thread(target=self._process_logic, args=(raw_text,), daemon=True).start()
+        self._submit_popup_job(self._process_logic, raw_text, time.perf_counter(),
+                               priority=PRIORITY_INTERACTIVE, deadline=INTERACTIVE_DEADLINE)
+
+    def _lookup_cache(self, text, style=None):
+        return self.engine.lookup_cache(text, style or self.style)
 
-    def _process_logic(self, raw_text):
+    def set_style(self, style):
+        """
+        Called from UI: Stil değişimi. Profilin config'i hazır, önbellek bölümü ayrı:
+        Son metin yeni stilde önbellekteyse anında gösterilir, yoksa o stilde çevrilir.
+        """
+        if style == self.style or style not in self.engine.style_names():
+            return
+        self.style = style
+        logger.info(f"🎨 Stil: {style}")
+        if self.last_text:
+            self._submit_popup_job(self._process_logic, self.last_text, None, False,
+                                   priority=PRIORITY_INTERACTIVE, deadline=INTERACTIVE_DEADLINE)
+
+    def _process_logic(self, raw_text, activated_at=None, move=True):
         try:
             if not raw_text or not raw_text.strip():
                 return
 
+            self.revalidator.notify_activity()
             text = self.clean_text(raw_text)
             
-            # Aynı metin kontrolü
-            if text == self.last_text:
-                logging.info("♻️ Aynı metin. Önbellek gösteriliyor.")
-                self.move_window_callback()
-                cached = self.db.get_translation(text, "Academic")
+            style = self.style
+            # Aynı metin (ve stil) kontrolü
+            if text == self.last_text and style == self.last_style:
+                logger.info("♻️ Aynı metin. Önbellek gösteriliyor.")
+                CACHE_LOOKUPS.inc(tier="last_text")
+                self.move_window_callback(activated_at)
+                cached = self._lookup_cache(text, style)
                 if cached:
                     self.update_callback(cached)
                     self.update_callback({"finished": True})
                 return
 
             self.last_text = text
-            self.move_window_callback() 
+            self.last_style = style
+            if move:
+                self.move_window_callback(activated_at)
             self.update_callback(None)  
             self.update_callback({"source_text": text}) 
 
-            cached = self.db.get_translation(text, "Academic")
+            cached = self._lookup_cache(text, style)
+            CACHE_LOOKUPS.inc(tier=(cached.get("source") or cached.get("match_type") or "exact") if cached else "miss")
             if cached and "translation" in cached:
                 self.update_callback(cached)
                 self.update_callback({"finished": True})
                 return
 
-            full_translation = ""
             try:
-                for chunk in self.api.translate_text_stream(text):
-                    full_translation += chunk
-                    self.update_callback({"chunk": chunk})
+                # Parçalar iş günlüğüne yazılır; tamamlanınca geçmişe eklenir (yarım kalırsa devam ettirilir)
+                stream = self.engine.translate_stream(text, style)
+                try:
+                    for chunk in stream:
+                        raise_if_cancelled()
+                        self.update_callback({"chunk": chunk})
+                finally:
+                    stream.close()
                 
                 self.update_callback({"finished": True})
-                self.db.add_history(text, full_translation)
                 
+            except JobCancelled:
+                logger.info("⏹️ Çeviri iptal edildi (yeni aktivasyon).")
             except Exception as e:
-                logging.error(f"Translation Error: {e}")
+                logger.error(f"Translation Error: {e}")
                 self.update_callback(f"Hata: {str(e)}")
 
         except Exception as e:
-            logging.error(f"FATAL ERROR in logic: {e}", exc_info=True)
+            logger.error(f"FATAL ERROR in logic: {e}", exc_info=True)
             self.update_callback(f"Kritik Hata: {str(e)}")
 
-    def process_humanize_request(self, source_text, current_text):
+    def translate_many(self, texts, style=None):
+        return self.engine.translate_many(texts, style or self.style)
+
+    def process_edit_request(self, old_source, new_source, translation):
+        """Called from UI: Kaynak metin popup'ta düzenlendi, sadece değişen cümleler yeniden çevrilir."""
+        self._submit_popup_job(self._edit_logic, old_source, new_source, translation,
+                               priority=PRIORITY_INTERACTIVE, deadline=INTERACTIVE_DEADLINE)
+
+    def _edit_logic(self, old_source, new_source, translation):
+        try:
+            result = self.engine.retranslate_edit(old_source, new_source, translation, self.last_style)
+            raise_if_cancelled()
+            if result is None:
+                self.update_callback("Hata: Değişen cümleler çevrilemedi.")
+                return
+            patches, _ = result
+            self.last_text = self.clean_text(new_source)
+            self.update_callback({"patches": patches})
+            self.update_callback({"source_committed": self.last_text})
+            self.update_callback({"finished": True})
+        except JobCancelled:
+            logger.info("⏹️ Düzenleme çevirisi iptal edildi.")
+        except Exception as e:
+            logger.error(f"Edit Logic Error: {e}")
+            self.update_callback(f"Hata: {str(e)}")
+
+    def process_humanize_request(self, source_text, current_text, force_new=False):
         """Called manually from UI (Humanize button)"""
-        threading.Thread(target=self._humanize_logic, args=(source_text, current_text), daemon=True).start()
+        self._submit_popup_job(self._humanize_logic, source_text, current_text, force_new,
+                               priority=PRIORITY_HUMANIZE, deadline=HUMANIZE_DEADLINE)
+
+    def _split_paragraphs(self, text):
+        """Metni [paragraf, ayraç, paragraf, ...] parçalarına böler (birleştirince aynı metin)."""
+        return RE_PARAGRAPH_BREAK.split(text)
+
+    def _humanize_cached(self, source_text, text):
+        return self.engine.humanize_cached(source_text, text)
+
+    def _humanize_store(self, source_text, text, output):
+        self.engine.humanize_store(source_text, text, output)
+
+    def _humanize_stream(self, source_text, text):
+        """
+        API'den humanize stream eder, parçaları UI'a iletir ve tüm çıktıyı döndürür.
+        Çıktı akarken kırpılır (baştaki boşluk atılır, sondaki bir sonraki parçaya kadar bekletilir):
+        UI'da görünen metin önbelleğe yazılanla birebir aynıdır.
+        """
+        full_text = ""
+        trailing = ""
+        for chunk in self.api.humanize_text_stream(source_text, text):
+            raise_if_cancelled()
+            if not full_text:
+                chunk = chunk.lstrip()
+            chunk = trailing + chunk
+            visible = chunk.rstrip()
+            trailing = chunk[len(visible):]
+            if visible:
+                full_text += visible
+                self.update_callback({"chunk": visible})
+        return full_text
 
-    def _humanize_logic(self, source_text, current_text):
+    def _humanize_logic(self, source_text, current_text, force_new=False):
+        """
+        HUMANIZE ÖNBELLEĞİ
+        1. Aynı (kaynak, metin) daha önce humanize edildiyse kayıtlı varyant anında gösterilir.
+        2. Uzun metinde sadece değişen paragraflar API'ye gider, diğerleri önbellekten gelir.
+        3. force_new=True ise önbellek atlanır ve yeni bir varyant üretilir.
+        """
         try:
             # UI Clean up is handled by Popup immediately to show "Humanizing..."
             # We just send data stream
-            
-            full_text = ""
-            for chunk in self.api.humanize_text_stream(source_text, current_text):
-                full_text += chunk
-                self.update_callback({"chunk": chunk})
+            if not force_new:
+                cached = self._humanize_cached(source_text, current_text)
+                if cached:
+                    logger.info("⚡️ [Humanize] Önbellekten getirildi.")
+                    self.update_callback({"chunk": cached})
+                    self.update_callback({"finished": True})
+                    return
+
+            parts = self._split_paragraphs(current_text)
+            paragraphs = parts[0::2]
+            cached_parts = {}
+            if not force_new and len(paragraphs) > 1:
+                for i, para in enumerate(paragraphs):
+                    if para.strip():
+                        hit = self._humanize_cached(source_text, para)
+                        if hit:
+                            cached_parts[i] = hit
+
+            if not cached_parts:
+                # Tam ıskalama: Tek istek (kaynak metin sadece bir kez gönderilir)
+                full_text = self._humanize_stream(source_text, current_text)
+                self._humanize_store(source_text, current_text, full_text)
+                # Paragraf sayısı korunduysa her paragrafı ayrıca önbelleğe al (sonraki kısmi düzenlemeler için)
+                out_paragraphs = self._split_paragraphs(full_text)[0::2]
+                if len(paragraphs) > 1 and len(out_paragraphs) == len(paragraphs):
+                    for para, out in zip(paragraphs, out_paragraphs):
+                        if para.strip():
+                            self._humanize_store(source_text, para, out)
+            else:
+                # Kısmi ıskalama: Sadece değişen paragraflar yeniden humanize edilir
+                logger.info(f"♻️ [Humanize] {len(cached_parts)}/{len(paragraphs)} paragraf önbellekten.")
+                output = []
+                for i, part in enumerate(parts):
+                    if i % 2 == 1 or not part.strip():
+                        # Ayraç veya boş satır: olduğu gibi korunur
+                        self.update_callback({"chunk": part})
+                        output.append(part)
+                    elif i // 2 in cached_parts:
+                        self.update_callback({"chunk": cached_parts[i // 2]})
+                        output.append(cached_parts[i // 2])
+                    else:
+                        new_para = self._humanize_stream(source_text, part)
+                        self._humanize_store(source_text, part, new_para)
+                        output.append(new_para)
+                self._humanize_store(source_text, current_text, "".join(output))
             
             self.update_callback({"finished": True}) # Signals popup to maybe re-enable buttons etc.
 
+        except JobCancelled:
+            logger.info("⏹️ Humanize iptal edildi.")
         except Exception as e:
-            logging.error(f"Humanize Logic Error: {e}")
+            logger.error(f"Humanize Logic Error: {e}")
             self.update_callback(f"Humanize Error: {str(e)}")
@@ -0,0 +1,75 @@
+import difflib
+import re
+
+from core.tokens import RE_SENTENCE_END
+
+# Cümle + ardından gelen boşluk: Parçalar birleşince metnin kendisi çıkar (ofsetler korunur)
+RE_SENTENCE_SPLIT = re.compile(r"((?<=[.!?…])\s+)")
+
+
+def sentence_pieces(text):
+    """Metni cümle parçalarına böler; her parça sonundaki boşluğu da taşır ("".join(...) == text)."""
+    if not text:
+        return []
+    parts = RE_SENTENCE_SPLIT.split(text)
+    pieces = [parts[i] + (parts[i + 1] if i + 1 < len(parts) else "") for i in range(0, len(parts), 2)]
+    return [piece for piece in pieces if piece]
+
+
+def split_sentences(text):
+    return [sentence for sentence in RE_SENTENCE_END.split(text.strip()) if sentence]
+
+
+def plan_edit(old_source, new_source, translation):
+    """
+    DÜZENLEME FARKI (cümle bazında)
+    Eski ve yeni kaynak metin difflib ile cümle cümle karşılaştırılır; eski kaynağın
+    her cümlesi çevirideki aynı sıradaki cümleye karşılık gelir.
+
+    Döndürür: [(start, end, sentences), ...] -> çevirinin [start:end) aralığı, 'sentences'
+    (yeni kaynak cümleleri) çevrilip boşlukla birleştirilmiş haliyle değiştirilir. Aralıklar
+    sondan başa sıralıdır: Sırayla uygulanınca önceki ofsetler kaymaz.
+    Cümle sayıları eşleşmiyorsa (hizalama yok) tüm çeviri tek aralık olarak döner.
+    """
+    old_sentences = split_sentences(old_source)
+    new_sentences = split_sentences(new_source)
+    pieces = sentence_pieces(translation)
+    if len(pieces) != len(old_sentences):
+        return [(0, len(translation), new_sentences)]
+
+    starts = [0]
+    for piece in pieces:
+        starts.append(starts[-1] + len(piece))
+    ends = [start + len(piece.rstrip()) for start, piece in zip(starts, pieces)]  # Sondaki boşluk hariç
+
+    patches = []
+    matcher = difflib.SequenceMatcher(None, old_sentences, new_sentences, autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == "equal":
+            continue
+        sentences = new_sentences[j1:j2]
+        if tag == "replace":
+            patches.append((starts[i1], ends[i2 - 1], sentences))
+        elif tag == "delete":
+            if i2 < len(pieces):
+                patches.append((starts[i1], starts[i2], []))
+            else:
+                # Sondaki cümleler silindi: Önceki cümlenin sonundaki ayraç da gider
+                patches.append((ends[i1 - 1] if i1 else 0, len(translation), []))
+        elif i1 < len(pieces):  # insert (araya)
+            patches.append((starts[i1], starts[i1], sentences + [""]))
+        else:  # insert (sona)
+            patches.append((ends[-1] if ends else 0, len(translation), ([""] if ends else []) + sentences))
+    return patches[::-1]
+
+
+def apply_patches(text, patches):
+    """plan_edit sırasıyla (sondan başa) [(start, end, replacement), ...] uygular."""
+    for start, end, replacement in patches:
+        text = text[:start] + replacement + text[end:]
+    return text
+
+
+def utf16_offset(text, index):
+    """Python indeksini QTextDocument konumuna (UTF-16 birimi) çevirir."""
+    return len(text[:index].encode("utf-16-le")) // 2
@@ -0,0 +1,237 @@
+import os
+import sys
+import logging
+import zipfile
+import argparse
+from collections import deque
+from xml.etree.ElementTree import iterparse
+
+from core.metrics import metrics
+from core.revalidator import get_cache_policy, CACHE_POLICY_REFRESH
+from core.scheduler import JobScheduler, PRIORITY_PREFETCH
+from core.text_cleaner import clean_text
+
+logger = logging.getLogger(__name__)
+
+# --- OPSİYONEL BAĞIMLILIK: PDF ---
+try:
+    from pypdf import PdfReader
+except ImportError:
+    PdfReader = None
+
+DOC_PARAGRAPHS = metrics.counter("mytranslator_document_paragraphs_total", "Doküman modunda çevrilen paragraflar (kaynağa göre)")
+
+WORD_NS = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+
+
+# --- OKUYUCULAR (Hepsi generator: Doküman asla tamamen belleğe alınmaz) ---
+
+def iter_txt_paragraphs(path):
+    """Boş satırlarla ayrılmış paragrafları satır satır okuyarak üretir."""
+    lines = []
+    with open(path, "r", encoding="utf-8", errors="replace") as f:
+        for line in f:
+            if line.strip():
+                lines.append(line)
+            elif lines:
+                yield clean_text("".join(lines))
+                lines = []
+    if lines:
+        yield clean_text("".join(lines))
+
+
+def iter_docx_paragraphs(path):
+    """
+    word/document.xml zip içinden stream edilir. Biten her <w:p> ve paragraf dışındaki her
+    öğe (tablo, sectPr...) temizlenip ebeveyninden koparılır: <w:body> belge boyunca büyümez.
+    """
+    with zipfile.ZipFile(path) as archive, archive.open("word/document.xml") as xml:
+        open_elements = []
+        paragraph_depth = 0
+        for event, element in iterparse(xml, events=("start", "end")):
+            if event == "start":
+                open_elements.append(element)
+                paragraph_depth += element.tag == WORD_NS + "p"
+                continue
+            open_elements.pop()
+            text = None
+            if element.tag == WORD_NS + "p":
+                paragraph_depth -= 1
+                text = clean_text("".join(node.text or "" for node in element.iter(WORD_NS + "t")))
+            elif paragraph_depth:
+                continue  # Paragraf içi (run, w:t): Metin paragraf bitince okunur
+            element.clear()
+            if open_elements:
+                open_elements[-1].remove(element)
+            if text:
+                yield text
+
+
+def iter_pdf_paragraphs(path):
+    """Sayfa sayfa okur (pypdf gerekir; yoksa sessizce boş çıktı yerine ImportError)."""
+    if PdfReader is None:
+        raise ImportError("pypdf not found. PDF documents cannot be read. (pip install pypdf)")
+    return _iter_pdf_pages(PdfReader(path))
+
+
+def _iter_pdf_pages(reader):
+    for page in reader.pages:
+        block = []
+        for line in (page.extract_text() or "").splitlines():
+            if line.strip():
+                block.append(line)
+            elif block:
+                yield clean_text("\n".join(block))
+                block = []
+        if block:
+            yield clean_text("\n".join(block))
+
+
+READERS = {
+    ".txt": iter_txt_paragraphs,
+    ".md": iter_txt_paragraphs,
+    ".docx": iter_docx_paragraphs,
+    ".pdf": iter_pdf_paragraphs,
+}
+
+
+def iter_paragraphs(path):
+    reader = READERS.get(os.path.splitext(path)[1].lower())
+    if reader is None:
+        raise ValueError(f"Desteklenmeyen doküman türü: {path}")
+    return reader(path)
+
+
+# --- ÇIKTI (TSV: index \t kaynak \t çeviri) ---
+
+def _escape(text):
+    return text.replace("\\", "\\\\").replace("\t", "\\t").replace("\n", "\\n").replace("\r", "")
+
+
+def count_completed_rows(output_path):
+    """
+    Yarıda kalan çıktıdaki tamamlanmış satır sayısı (resume noktası).
+    Yazımı yarıda kalmış son satır kesilir, böylece dosyaya güvenle eklenebilir.
+    """
+    if not os.path.exists(output_path):
+        return 0
+    rows = 0
+    last_complete = 0
+    with open(output_path, "rb") as f:
+        for line in f:
+            if not line.endswith(b"\n"):
+                break
+            rows += 1
+            last_complete += len(line)
+    if last_complete != os.path.getsize(output_path):
+        with open(output_path, "r+b") as f:
+            f.truncate(last_complete)
+    return rows
+
+
+class DocumentTranslator:
+    """
+    DOKÜMAN MODU
+    Paragraflar sırayla okunur, her biri çeviri belleğinde aranır, ıskalayanlar
+    scheduler üzerinden (PRIORITY_PREFETCH) en fazla 'concurrency' kadar paralel çevrilir.
+    Sonuçlar girdi sırasıyla TSV'ye yazılır ve her satırda flush edilir; yarıda kalan
+    bir çalışma aynı çıktı dosyasıyla tekrar başlatılınca son tamamlanan paragraftan devam eder.
+    """
+
+    def __init__(self, api, db, scheduler, style="Academic", concurrency=3, cache_policy=None):
+        self.api = api
+        self.db = db
+        self.scheduler = scheduler
+        self.style = style
+        self.concurrency = max(1, concurrency)
+        self.cache_policy = cache_policy or get_cache_policy()
+
+    def translate_paragraph(self, text):
+        profile = self.api.profile(self.style)
+        cached = self.db.get_translation(text, self.style, model=profile.model_name, prompt_hash=profile.prompt_hash)
+        if cached and "translation" in cached and not (cached.get("stale") and self.cache_policy == CACHE_POLICY_REFRESH):
+            DOC_PARAGRAPHS.inc(source="cache")
+            return cached["translation"]
+
+        translation = "".join(self.api.translate_text_stream(text, style=self.style))
+        if not translation or "[Hata:" in translation:
+            return None
+        self.db.add_history(text, translation, self.style,
+                            model=profile.model_name, prompt_hash=profile.prompt_hash)
+        DOC_PARAGRAPHS.inc(source="api")
+        return translation
+
+    def translate_file(self, input_path, output_path, progress_callback=None):
+        """
+        Dokümanı çevirir. Tamamlanan paragraf sayısını döndürür.
+        Bir paragraf çevrilemezse durur (sonraki çalışma oradan devam eder).
+        """
+        done = count_completed_rows(output_path)
+        if done:
+            logger.info(f"⏯️ [Document] {done} paragraf zaten tamamlanmış, devam ediliyor.")
+
+        paragraphs = iter_paragraphs(input_path)
+        window = deque()  # (index, kaynak, job) — sıralı yazım için kayan pencere
+        index = 0
+        with open(output_path, "a", encoding="utf-8") as out:
+            while True:
+                while len(window) < self.concurrency:
+                    text = next(paragraphs, None)
+                    if text is None:
+                        break
+                    if index >= done:
+                        job = self.scheduler.submit(self.translate_paragraph, text,
+                                                    priority=PRIORITY_PREFETCH, name="document-paragraph")
+                        window.append((index, text, job))
+                    index += 1
+                if not window:
+                    break
+
+                row, text, job = window.popleft()
+                job.wait()
+                if job.result is None:
+                    logger.error(f"❌ [Document] Paragraf {row} çevrilemedi, durduruluyor. Tekrar çalıştırınca buradan devam eder.")
+                    for _, _, pending in window:
+                        pending.cancel()
+                    return row
+                out.write(f"{row}\t{_escape(text)}\t{_escape(job.result)}\n")
+                out.flush()
+                if progress_callback:
+                    progress_callback(row + 1)
+
+        logger.info(f"📄 [Document] Tamamlandı: {index} paragraf -> {output_path}")
+        return index
+
+
+def main(argv=None):
+    """python -m core.documents makale.pdf [-o makale.tsv]"""
+    parser = argparse.ArgumentParser(description="Doküman çevirisi (TXT/DOCX/PDF -> iki dilli TSV)")
+    parser.add_argument("input")
+    parser.add_argument("-o", "--output", help="Çıktı TSV (varsayılan: <girdi>.tsv)")
+    parser.add_argument("--style", default="Academic")
+    parser.add_argument("--concurrency", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    from core.api_service import APIService, DEFAULT_STYLE_PROFILES
+    from core.logging_setup import setup_logging
+    from database.db_manager import DatabaseManager
+
+    setup_logging("debug_humanize.log")
+    output = args.output or os.path.splitext(args.input)[0] + ".tsv"
+    scheduler = JobScheduler(workers=args.concurrency, reserved=0, name="Document").start()
+    try:
+        api, db = APIService(), DatabaseManager()
+        api.set_profiles(db.get_style_profiles() or DEFAULT_STYLE_PROFILES)  # --style kayıtlı profillerden
+        translator = DocumentTranslator(api, db, scheduler, style=args.style, concurrency=args.concurrency)
+        translator.translate_file(args.input, output, progress_callback=lambda n: print(f"\r{n} paragraf", end="", flush=True))
+        print()
+    except (ImportError, ValueError) as e:
+        print(f"Hata: {e}", file=sys.stderr)
+        return 1
+    finally:
+        scheduler.stop()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,336 @@
+import os
+import logging
+
+from core.activation_log import ActivationLog
+from core.api_service import APIService, DEFAULT_STYLE, DEFAULT_STYLE_PROFILES, BUILTIN_STYLE_PROMPTS
+from core.diffing import plan_edit, apply_patches
+from core.maintenance import MaintenanceJob
+from core.metrics import metrics
+from core.profiler import profile_ipc_handler
+from core.revalidator import StaleRevalidator, get_cache_policy, CACHE_POLICY_REVALIDATE, CACHE_POLICY_REFRESH
+from core.scheduler import JobScheduler, PRIORITY_BACKGROUND
+from core.text_cleaner import clean_text
+from database.db_manager import DatabaseManager
+
+logger = logging.getLogger(__name__)
+
+CACHE_LOOKUPS = metrics.counter("mytranslator_cache_lookups_total", "Önbellek sonuçları (last_text/exact/normalized/fuzzy/remote/miss)")
+JOURNAL_RESUMED = metrics.counter("mytranslator_journal_resumed_total", "Yarım kalan işlerin akıbeti (resumed/failed/dropped)")
+
+# Yarım iş bu kadar başlangıçta devam ettirilemezse günlükten atılır
+MAX_RESUME_ATTEMPTS = 3
+
+
+class TranslationEngine:
+    """
+    ÇEVİRİ MOTORU (Arayüzden bağımsız)
+    APIService + DatabaseManager + önbellek politikası + arka plan işleri (yenileme, bakım).
+    PyQt ve pynput import etmez: GUI (ClipboardHandler), IPC ve headless daemon aynı motoru kullanır.
+    """
+
+    def __init__(self, api=None, db=None, scheduler=None, warmup=True):
+        self.api = api or APIService()
+        if warmup:
+            self.api.warmup()
+        self.db = db or DatabaseManager()
+        self.api.usage_callback = self.db.add_usage
+
+        # Stil profilleri veritabanından: Her biri hazır config + kendi önbellek bölümü (history.style)
+        self.style = os.getenv("MYTRANSLATOR_STYLE", "").strip() or DEFAULT_STYLE
+        self.reload_styles()
+
+        # Worker Havuzu: Her istek için yeni thread yerine sabit boyutlu, öncelikli kuyruk
+        self.scheduler = scheduler or JobScheduler(workers=int(os.getenv("MYTRANSLATOR_WORKERS", "4")))
+        # Cache Invalidation (Model/Prompt değişikliği)
+        self.cache_policy = get_cache_policy()
+        self.revalidator = StaleRevalidator(self.api, self.db, self.scheduler)
+        # Veritabanı Bakımı (Retention + Sıkıştırma)
+        self.maintenance = MaintenanceJob(self.db, self.scheduler)
+        # Opsiyonel aktivasyon kaydı (fuzzy ayarlarını gerçek iş yüküyle değerlendirmek için)
+        self.activation_log = ActivationLog.from_env()
+
+    def start(self):
+        self.scheduler.start()
+        self.revalidator.start()
+        self.maintenance.start()
+        # Önceki oturumda (çökme/kapanma) yarım kalan çeviriler arka planda tamamlanır
+        self.scheduler.submit(self.resume_jobs, priority=PRIORITY_BACKGROUND, name="resume_jobs")
+
+    def stop(self):
+        self.revalidator.stop()
+        self.maintenance.stop()
+        self.scheduler.stop()
+        self.db.hit_writer.stop()
+        self.db.journal.stop()  # Son parçalar diske yazılır
+        if self.activation_log:
+            self.activation_log.stop()
+        if self.db.remote_writer:
+            self.db.remote_writer.stop()  # Bekleyen yazmaları paylaşılan TM'ye gönder
+
+    @staticmethod
+    def clean_text(text):
+        return clean_text(text)
+
+    # --- Stiller ---
+
+    @staticmethod
+    def _stored_profile(profile):
+        """Hazır profilin koddaki prompt'u DB'ye yazılmaz (NULL): Sadece özelleştirilmiş prompt saklanır."""
+        prompt = profile.get("system_prompt")
+        if not prompt or prompt == BUILTIN_STYLE_PROMPTS.get(profile["name"]):
+            return {**profile, "system_prompt": None}
+        return profile
+
+    def reload_styles(self):
+        profiles = self.db.get_style_profiles()
+        if not profiles:
+            profiles = [self._stored_profile(p) for p in DEFAULT_STYLE_PROFILES]
+            self.db.save_style_profiles(profiles)
+        else:
+            # Eski sürümlerin DB'ye kopyaladığı hazır prompt'lar serbest bırakılır
+            frozen = [p for p in profiles if p["system_prompt"] and self._stored_profile(p) is not p]
+            if frozen:
+                self.db.save_style_profiles([self._stored_profile(p) for p in frozen])
+        self.api.set_profiles(profiles)
+
+    def style_names(self):
+        return list(self.api.profiles)
+
+    def save_style(self, profile):
+        """Profili ekler/günceller; sadece değişen profilin config'i yeniden kurulur."""
+        if not self.db.save_style_profiles([self._stored_profile(profile)]):
+            return False
+        self.reload_styles()
+        return True
+
+    def _tag(self, style):
+        """Stilin önbellek etiketi: (model, prompt_hash)."""
+        profile = self.api.profile(style)
+        return profile.model_name, profile.prompt_hash
+
+    # --- Çeviri ---
+
+    def lookup_cache(self, text, style=None):
+        """
+        Önbellek politikasını uygular.
+        Bayat (farklı model/prompt) kayıt: 'stale' -> göster, 'revalidate' -> göster + arka planda yenile,
+        'refresh' -> yok say (yeniden çevrilir).
+        """
+        style = style or self.style
+        model, prompt_hash = self._tag(style)
+        cached = self.db.get_translation(text, style, model=model, prompt_hash=prompt_hash)
+        if self.activation_log:
+            self.activation_log.record(text, style, cached)
+        if not cached or not cached.get("stale"):
+            return cached
+
+        if self.cache_policy == CACHE_POLICY_REFRESH:
+            logger.info("🔄 Bayat önbellek atlandı (refresh).")
+            return None
+        if self.cache_policy == CACHE_POLICY_REVALIDATE:
+            self.revalidator.request(cached["original_text"], style)
+        return cached
+
+    def store_translation(self, text, translation, style=None):
+        style = style or self.style
+        model, prompt_hash = self._tag(style)
+        self.db.add_history(text, translation, style, model=model, prompt_hash=prompt_hash)
+
+    def translate_stream(self, text, style=None):
+        """
+        GÜNLÜKLÜ ÇEVİRİ STREAM'İ
+        Parçalar iş günlüğüne yazılır; stream tamamlanınca çeviri geçmişe eklenir ve iş
+        günlükten silinir. Yarıda kalırsa (iptal, çökme, ağ hatası) alınan kısım saklanır:
+        Aynı metin tekrar istendiğinde önce o kısım gösterilir, sadece devamı istenir.
+        """
+        style = style or self.style
+        model, prompt_hash = self._tag(style)
+        partial = ""
+        entry = None
+        resumable = self.db.journal.has_incomplete("translate", text, style)
+        for job in self.db.journal.incomplete("translate", text, style) if resumable else ():
+            if job["partial"] and job["model"] == model and job["prompt_hash"] == prompt_hash:
+                entry = self.db.journal.claim(job)
+                if entry:
+                    partial = job["partial"]
+                    logger.info(f"⏯️ [Journal] Yarım çeviri devam ettiriliyor ({len(partial)} karakter).")
+                    yield partial
+                    break
+        if entry is None:
+            entry = self.db.journal.begin("translate", text, style, model=model, prompt_hash=prompt_hash)
+
+        output = partial
+        failed = False
+        try:
+            for chunk in self.api.translate_text_stream(text, partial, style=style):
+                if "[Hata:" in chunk:
+                    failed = True  # Hata metni günlüğe yazılmaz: Alınan kısım sonra devam ettirilebilir
+                else:
+                    entry.append(chunk)
+                output += chunk
+                yield chunk
+        finally:
+            self.db.journal.release(entry.id)
+        if failed:
+            return
+        if output:
+            self.store_translation(text, output, style)
+        entry.finish()
+
+    def resume_jobs(self):
+        """Önceki oturumdan kalan yarım çevirileri devam isteğiyle tamamlar. Tamamlanan iş sayısı."""
+        resumed = 0
+        for job in self.db.journal.incomplete("translate"):
+            text, style = job["source_text"], job["style"] or DEFAULT_STYLE
+            model, prompt_hash = self._tag(style)
+            current = job["model"] == model and job["prompt_hash"] == prompt_hash
+            # Sadece tam eşleşme: Benzer bir cümlenin çevirisi bu işi tamamlamaz, kontrol isabet sayılmaz
+            cached = self.db.get_exact_translation(text, style, model=model, prompt_hash=prompt_hash)
+            if not job["partial"] or not current or (cached and not cached.get("stale")) \
+                    or job["attempts"] >= MAX_RESUME_ATTEMPTS:
+                # Ödenmiş çıktı yok, model/prompt değişmiş, artık önbellekte ya da çok denenmiş
+                self.db.journal.discard(job["id"])
+                JOURNAL_RESUMED.inc(result="dropped")
+                continue
+            entry = self.db.journal.claim(job)
+            if entry is None:
+                continue  # Kullanıcı aynı metni şu an istiyor
+            self.db.journal.record_attempt(job["id"])
+            try:
+                rest = "".join(self.api.translate_text_stream(text, job["partial"], style=style))
+            finally:
+                self.db.journal.release(job["id"])
+            if not rest or "[Hata:" in rest:
+                JOURNAL_RESUMED.inc(result="failed")
+                continue
+            self.store_translation(text, job["partial"] + rest, style)
+            entry.finish()
+            JOURNAL_RESUMED.inc(result="resumed")
+            resumed += 1
+        if resumed:
+            logger.info(f"⏯️ [Journal] {resumed} yarım çeviri tamamlandı.")
+        return resumed
+
+    def stream_translation(self, raw_text, style=None):
+        """
+        Popup'sız çeviri: Önbellek + API stream. Metin parçaları (str), en sonda
+        {"cached", "match_type"} bilgisi üretir; yeni çeviri geçmişe yazılır.
+        """
+        text = self.clean_text(raw_text)
+        if not text:
+            return
+        style = style or self.style
+        self.revalidator.notify_activity()
+        cached = self.lookup_cache(text, style)
+        CACHE_LOOKUPS.inc(tier=(cached.get("source") or cached.get("match_type") or "exact") if cached else "miss")
+        if cached and "translation" in cached:
+            yield cached["translation"]
+            yield {"cached": True, "match_type": cached.get("match_type") or "exact"}
+            return
+        yield from self.translate_stream(text, style)
+        yield {"cached": False}
+
+    def translate_many(self, texts, style=None):
+        """
+        TOPLU / PROGRAMATİK KULLANIM
+        Her metin önce önbellekte aranır; ıskalayanlar tek istekte paketlenerek
+        çevrilir ve her biri kendi anahtarıyla çeviri belleğine yazılır.
+        Girdiyle aynı sırada çeviri listesi döndürür.
+        """
+        style = style or self.style
+        cleaned = [self.clean_text(text) for text in texts]
+        results = {}
+        misses = []
+        for text in dict.fromkeys(cleaned):  # Tekrarlar bir kez çevrilir
+            if not text:
+                results[text] = ""
+                continue
+            cached = self.lookup_cache(text, style)
+            if cached and "translation" in cached:
+                results[text] = cached["translation"]
+            else:
+                misses.append(text)
+
+        if misses:
+            logger.info(f"📦 [Batch] {len(cleaned) - len(misses)} önbellekten, {len(misses)} API'ye gönderiliyor.")
+            for text, translation in zip(misses, self.api.translate_batch(misses, style=style)):
+                results[text] = translation
+                if translation and "[Hata:" not in translation:
+                    self.store_translation(text, translation, style)
+
+        return [results[text] for text in cleaned]
+
+    def retranslate_edit(self, old_source, new_source, translation, style=None):
+        """
+        DÜZENLEMEYE DUYARLI YENİDEN ÇEVİRİ
+        Kaynakta sadece değişen cümleler (önbellek + tek toplu istek) çevrilir; çevirinin geri
+        kalanı olduğu gibi kalır. Döndürür: ([(start, end, metin), ...] sondan başa, yeni çeviri)
+        veya hata olursa None. Tam metin ve cümleler çeviri belleğine yazılır.
+        """
+        style = style or self.style
+        old_source, new_source = self.clean_text(old_source), self.clean_text(new_source)
+        if not new_source:
+            return None
+        plan = plan_edit(old_source, new_source, translation)
+        sentences = list(dict.fromkeys(sentence for _, _, group in plan for sentence in group if sentence))
+        translated = dict(zip(sentences, self.translate_many(sentences, style))) if sentences else {}
+        if any(not text or "[Hata:" in text for text in translated.values()):
+            logger.error("❌ [Edit] Değişen cümleler çevrilemedi.")
+            return None
+
+        patches = [(start, end, " ".join(translated[s] if s else "" for s in group)) for start, end, group in plan]
+        new_translation = apply_patches(translation, patches)
+        logger.info(f"✂️ [Edit] {len(sentences)} cümle yeniden çevrildi, {len(patches)} aralık güncellendi.")
+        self.store_translation(new_source, new_translation, style)
+        return patches, new_translation
+
+    # --- Humanize ---
+
+    def humanize_cached(self, source_text, text):
+        key = self.db.humanize_key(source_text, text)
+        return self.db.get_humanize_variant(key, model=self.api.model_name, prompt_hash=self.api.humanize_prompt_hash)
+
+    def humanize_store(self, source_text, text, output):
+        if not output or "[Error:" in output: return
+        key = self.db.humanize_key(source_text, text)
+        self.db.add_humanize_variant(key, output, model=self.api.model_name, prompt_hash=self.api.humanize_prompt_hash)
+
+    def stream_humanize(self, source_text, current_text, force_new=False):
+        """
+        Popup'sız humanize: Kayıtlı varyant varsa o, yoksa API stream (sonuç önbelleğe yazılır).
+        force_new=True her zaman yeni bir varyant üretir (sonraki isteklerde sırayla gösterilir).
+        """
+        if not current_text.strip():
+            return
+        cached = None if force_new else self.humanize_cached(source_text, current_text)
+        if cached:
+            yield cached
+            yield {"cached": True}
+            return
+        output = ""
+        for chunk in self.api.humanize_text_stream(source_text, current_text):
+            output += chunk
+            yield chunk
+        self.humanize_store(source_text, current_text, output)
+        yield {"cached": False}
+
+    # --- IPC ---
+
+    def ipc_handlers(self):
+        return {
+            "translate": lambda request: self.stream_translation(request.get("text") or "", request.get("style")),
+            "translate_batch": lambda request: [{"translations": self.translate_many(request.get("texts") or [], request.get("style"))}],
+            "styles": lambda request: [{"styles": self.style_names(), "default": self.style}],
+            "retranslate_edit": self._ipc_retranslate_edit,
+            "humanize": lambda request: self.stream_humanize(request.get("source_text") or "", request.get("text") or "",
+                                                             bool(request.get("force_new"))),
+            "profile": profile_ipc_handler,  # Çalışan süreçte örneklemeli profil (python -m core.profiler)
+        }
+
+    def _ipc_retranslate_edit(self, request):
+        result = self.retranslate_edit(request.get("old_source") or "", request.get("new_source") or "",
+                                       request.get("translation") or "", request.get("style"))
+        if result is None:
+            raise RuntimeError("retranslation failed")
+        patches, translation = result
+        yield {"patches": patches, "translation": translation}
@@ -0,0 +1,132 @@
+import time
+import queue
+import logging
+import threading
+
+from core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+HOTKEY_IGNORED = metrics.counter("mytranslator_hotkey_ignored_total", "Aktivasyon sayılmayan 'c' basışları (nedene göre)")
+
+MODIFIER = "cmd"
+TRIGGER = "c"
+
+
+class HotkeyEngine:
+    """
+    KISAYOL DURUM MAKİNESİ (Cmd + C + C)
+    pynput'tan bağımsızdır: Olaylar 'cmd', 'c' gibi token'larla beslenir, böylece
+    sentetik olay dizileriyle test edilebilir.
+    - 'c' sadece Cmd basılıyken sayılır (normal yazım aktivasyon üretmez)
+    - Basılı tutulan tuşun auto-repeat olayları ve 'debounce' altındaki sıçramalar yok sayılır
+    - Arada başka bir tuş veya Cmd bırakılması sayacı sıfırlar
+    Aktivasyonlar tek üreticili (listener thread) bir SimpleQueue'ya bırakılır;
+    listener thread'i hiçbir zaman kilit beklemez.
+    """
+
+    def __init__(self, window=0.5, debounce=0.03, clock=time.monotonic):
+        self.window = window      # İki 'c' arasındaki azami süre
+        self.debounce = debounce  # Bırakıştan bu kadar kısa sürede gelen basış kontak sıçraması sayılır
+        self.clock = clock
+        self.activations = queue.SimpleQueue()
+        self._held = set()
+        self._count = 0
+        self._last_press = None
+        self._last_release = None
+
+    def reset(self):
+        self._count = 0
+        self._last_press = None
+
+    def press(self, token):
+        """Tuş basışını işler; aktivasyon üretildiyse True döner."""
+        if token is None:
+            self.reset()
+            return False
+        if token in self._held:
+            # Tuş bırakılmadan gelen tekrar = auto-repeat
+            if token == TRIGGER:
+                HOTKEY_IGNORED.inc(reason="repeat")
+            return False
+        self._held.add(token)
+
+        if token == MODIFIER:
+            self.reset()
+            return False
+        if token != TRIGGER:
+            self.reset()
+            return False
+        if MODIFIER not in self._held:
+            HOTKEY_IGNORED.inc(reason="no_modifier")
+            self.reset()
+            return False
+
+        now = self.clock()
+        if self._last_release is not None and now - self._last_release < self.debounce:
+            HOTKEY_IGNORED.inc(reason="debounce")
+            return False
+        if self._last_press is not None and now - self._last_press > self.window:
+            self._count = 0
+        self._count += 1
+        self._last_press = now
+
+        if self._count < 2:
+            return False
+        self.reset()
+        self.activations.put(now)
+        return True
+
+    def release(self, token):
+        self._held.discard(token)
+        if token == TRIGGER:
+            self._last_release = self.clock()
+        elif token == MODIFIER:
+            self.reset()
+
+
+class ActivationDispatcher:
+    """
+    Aktivasyon kuyruğunu tüketen tek thread. Birikmiş aktivasyonlar tek
+    aktivasyona indirgenir (art arda Cmd+C+C tek API çağrısı üretir).
+    """
+
+    def __init__(self, activations, callback, name="HotkeyDispatcher"):
+        self.activations = activations
+        self.callback = callback
+        self.name = name
+        self._thread = None
+
+    def start(self):
+        if self._thread is not None: return self
+        self._thread = threading.Thread(target=self._run, daemon=True, name=self.name)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._thread is None: return
+        self.activations.put(None)
+        self._thread.join(timeout=1.0)
+        self._thread = None
+
+    def _run(self):
+        while True:
+            item = self.activations.get()
+            stop = item is None
+            # Kuyrukta bekleyenleri boşalt, sadece en sonuncusunu işle
+            while not stop:
+                try:
+                    newer = self.activations.get_nowait()
+                except queue.Empty:
+                    break
+                if newer is None:
+                    stop = True
+                else:
+                    item = newer
+            if item is not None:
+                try:
+                    self.callback()
+                except Exception as e:
+                    logger.error(f"Hotkey Dispatch Error: {e}")
+            if stop:
+                return
@@ -0,0 +1,336 @@
+import os
+import sys
+import json
+import socket
+import struct
+import ipaddress
+import logging
+import argparse
+import tempfile
+import threading
+import socketserver
+
+from core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Çerçeve: 4 byte (big-endian) uzunluk + UTF-8 JSON
+FRAME_HEADER = struct.Struct(">I")
+MAX_FRAME_BYTES = 16 * 1024 * 1024
+MAX_CLIENTS = 16
+# Aynı anda motoru kullanabilecek istek sayısı; dolarsa yeni istek BUSY_TIMEOUT kadar bekler
+MAX_INFLIGHT = 4
+BUSY_TIMEOUT = 30.0
+
+IPC_REQUESTS = metrics.counter("mytranslator_ipc_requests_total", "IPC istekleri (op ve sonuca göre)")
+IPC_CLIENTS = metrics.gauge("mytranslator_ipc_clients", "Bağlı IPC istemcisi sayısı")
+
+
+class IPCError(Exception):
+    pass
+
+
+def default_address():
+    """Unix soketi (kullanıcıya özel); AF_UNIX yoksa localhost TCP."""
+    if hasattr(socket, "AF_UNIX"):
+        uid = os.getuid() if hasattr(os, "getuid") else os.getenv("USERNAME", "user")
+        return os.path.join(tempfile.gettempdir(), f"mytranslator-{uid}.sock")
+    return ("127.0.0.1", 8766)
+
+
+def parse_address(value):
+    """'/tmp/x.sock' -> yol, '127.0.0.1:8766' veya '8766' -> (host, port)."""
+    value = value.strip()
+    if os.sep in value or value.endswith(".sock"):
+        return value
+    host, _, port = value.rpartition(":")
+    return (host or "127.0.0.1", int(port))
+
+
+def send_frame(sock, payload):
+    body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+    sock.sendall(FRAME_HEADER.pack(len(body)) + body)
+
+
+def _recv_exact(sock, size):
+    buf = bytearray()
+    while len(buf) < size:
+        data = sock.recv(size - len(buf))
+        if not data:
+            if buf:
+                raise IPCError("Bağlantı çerçeve ortasında kapandı")
+            return None
+        buf += data
+    return bytes(buf)
+
+
+def recv_frame(sock):
+    """Bir çerçeve okur; bağlantı kapandıysa None."""
+    header = _recv_exact(sock, FRAME_HEADER.size)
+    if header is None:
+        return None
+    (length,) = FRAME_HEADER.unpack(header)
+    if length > MAX_FRAME_BYTES:
+        raise IPCError(f"Çerçeve çok büyük: {length} byte")
+    body = _recv_exact(sock, length)
+    if body is None:
+        raise IPCError("Bağlantı çerçeve ortasında kapandı")
+    return json.loads(body)
+
+
+def _is_listening(path):
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        probe.connect(path)
+        return True
+    except OSError:
+        return False
+    finally:
+        probe.close()
+
+
+def _is_loopback(host):
+    if host == "localhost":
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+
+def _bind_private_unix(path, handler):
+    """
+    Soket, hedefin yanında açılan 0700 geçici dizinde bind edilip 0600 yapılır ve
+    yerine taşınır: Dosya hiçbir an başka kullanıcılara açık olmaz, süreç umask'ına
+    (diğer thread'lerin dosyalarına) dokunulmaz.
+    """
+    private_dir = tempfile.mkdtemp(prefix=".mytranslator-", dir=os.path.dirname(os.path.abspath(path)))
+    staging = os.path.join(private_dir, "ipc.sock")
+    server = None
+    try:
+        server = socketserver.ThreadingUnixStreamServer(staging, handler)
+        os.chmod(staging, 0o600)
+        os.rename(staging, path)
+        return server
+    except BaseException:
+        if server is not None:
+            server.server_close()
+        raise
+    finally:
+        if os.path.exists(staging):
+            os.remove(staging)
+        os.rmdir(private_dir)
+
+
+class _IPCRequestHandler(socketserver.BaseRequestHandler):
+    server_ref = None
+
+    def handle(self):
+        server = self.server_ref
+        if not server._clients.acquire(blocking=False):
+            send_frame(self.request, {"id": None, "error": "busy: too many clients"})
+            return
+        IPC_CLIENTS.inc()
+        try:
+            while True:
+                try:
+                    request = recv_frame(self.request)
+                except (IPCError, ValueError) as e:
+                    send_frame(self.request, {"id": None, "error": f"bad frame: {e}"})
+                    return
+                if request is None:
+                    return
+                if not server.serve_request(self.request, request):
+                    return
+        except OSError:
+            pass  # İstemci bağlantıyı kopardı
+        finally:
+            IPC_CLIENTS.dec()
+            server._clients.release()
+
+
+class IPCServer:
+    """
+    YEREL IPC SUNUCUSU
+    Çalışan uygulamanın sıcak API bağlantısını, önbelleğini ve limitlerini aynı makinedeki
+    diğer araçlarla (editör eklentileri, scriptler) paylaşır. Unix soketi (0600) veya localhost TCP
+    (kimlik doğrulama olmadığından loopback dışı adresler IPCError ile reddedilir).
+
+    İstek : {"id": 1, "op": "translate", "text": "..."}
+    Cevap : {"id": 1, "chunk": "..."} ... {"id": 1, "done": true, ...} veya {"id": 1, "error": "..."}
+    handlers: op -> fn(request) ; fn str parçalar (ve son çerçeveye eklenecek dict'ler) üretir.
+
+    Her istemci kendi thread'inde sırayla istek gönderir. Parçalar üretildikçe gönderilir:
+    Yavaş okuyan istemcide soket tamponu dolunca üretim (API stream'i) de bekler (backpressure).
+    Motoru aynı anda kullanan istek sayısı MAX_INFLIGHT ile sınırlıdır.
+    """
+
+    def __init__(self, handlers, address=None, max_clients=MAX_CLIENTS, max_inflight=MAX_INFLIGHT):
+        self.handlers = dict(handlers)
+        self.handlers.setdefault("ping", lambda request: iter(()))
+        self.address = address if address is not None else default_address()
+        self._clients = threading.BoundedSemaphore(max_clients)
+        self._inflight = threading.BoundedSemaphore(max_inflight)
+        handler = type("IPCHandler", (_IPCRequestHandler,), {"server_ref": self})
+        if isinstance(self.address, str):
+            if os.path.exists(self.address):
+                if _is_listening(self.address):
+                    raise IPCError(f"{self.address} başka bir süreç tarafından kullanılıyor")
+                os.remove(self.address)  # Önceki oturumdan kalan soket dosyası
+            self.server = _bind_private_unix(self.address, handler)
+        else:
+            if not _is_loopback(self.address[0]):
+                # Kimlik doğrulama yok: translate/humanize/profile ağa açılmaz
+                raise IPCError(f"IPC sadece localhost'a bağlanabilir: {self.address[0]}")
+            self.server = socketserver.ThreadingTCPServer(self.address, handler)
+            self.address = self.server.server_address[:2]
+        self.server.daemon_threads = True
+
+    def start(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True, name="IPCServer").start()
+        logger.info(f"🔌 [IPC] {self.address}")
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+        if isinstance(self.address, str) and os.path.exists(self.address):
+            os.remove(self.address)
+
+    def serve_request(self, sock, request):
+        """Tek isteği cevaplar. Bağlantı kullanılamaz hale geldiyse False."""
+        request_id = request.get("id") if isinstance(request, dict) else None
+        op = request.get("op") if isinstance(request, dict) else None
+        handler = self.handlers.get(op)
+        if handler is None:
+            IPC_REQUESTS.inc(op=str(op), result="unknown")
+            send_frame(sock, {"id": request_id, "error": f"unknown op: {op}"})
+            return True
+        if not self._inflight.acquire(timeout=BUSY_TIMEOUT):
+            IPC_REQUESTS.inc(op=op, result="busy")
+            send_frame(sock, {"id": request_id, "error": "busy"})
+            return True
+        iterator = None
+        try:
+            done = {"id": request_id, "done": True}
+            iterator = iter(handler(request))
+            for item in iterator:
+                if isinstance(item, dict):
+                    done.update(item)
+                elif item:
+                    send_frame(sock, {"id": request_id, "chunk": item})
+            send_frame(sock, done)
+            IPC_REQUESTS.inc(op=op, result="ok")
+            return True
+        except OSError:
+            IPC_REQUESTS.inc(op=op, result="disconnected")
+            return False
+        except Exception as e:
+            logger.error(f"IPC Handler Error ({op}): {e}")
+            IPC_REQUESTS.inc(op=op, result="error")
+            send_frame(sock, {"id": request_id, "error": str(e)})
+            return True
+        finally:
+            # İstemci koptuysa üretici (API stream'i) de kapatılır
+            close = getattr(iterator, "close", None)
+            if close:
+                close()
+            self._inflight.release()
+
+
+def start_ipc_server_from_env(handlers):
+    """MYTRANSLATOR_IPC: boş = varsayılan soket, 0 = kapalı, yol veya host:port."""
+    value = os.getenv("MYTRANSLATOR_IPC", "").strip()
+    if value.lower() in ("0", "false", "no", "off"):
+        return None
+    try:
+        return IPCServer(handlers, parse_address(value) if value else None).start()
+    except Exception as e:
+        logger.error(f"IPC Server Error: {e}")
+        return None
+
+
+class IPCClient:
+    """
+    IPC istemcisi (tek bağlantı, istekler sırayla).
+        with IPCClient() as client:
+            for chunk in client.stream("translate", text="Hello"):
+                print(chunk, end="")
+    """
+
+    def __init__(self, address=None, timeout=None):
+        self.address = address if address is not None else default_address()
+        family = socket.AF_UNIX if isinstance(self.address, str) else socket.AF_INET
+        self.sock = socket.socket(family, socket.SOCK_STREAM)
+        self.sock.settimeout(timeout)
+        self.sock.connect(self.address)
+        self._lock = threading.Lock()
+        self._next_id = 0
+        self.last_done = None
+
+    def stream(self, op, **params):
+        """Parçaları üretir; son çerçevedeki bilgiler self.last_done'a yazılır."""
+        with self._lock:
+            self._next_id += 1
+            request_id = self._next_id
+            send_frame(self.sock, {"id": request_id, "op": op, **params})
+            while True:
+                frame = recv_frame(self.sock)
+                if frame is None:
+                    raise IPCError("Sunucu bağlantıyı kapattı")
+                if frame.get("id") not in (request_id, None):
+                    continue
+                if "error" in frame:
+                    raise IPCError(frame["error"])
+                if frame.get("done"):
+                    self.last_done = frame
+                    return
+                yield frame.get("chunk", "")
+
+    def call(self, op, **params):
+        return "".join(self.stream(op, **params))
+
+    def translate(self, text):
+        return self.call("translate", text=text)
+
+    def humanize(self, source_text, text):
+        return self.call("humanize", source_text=source_text, text=text)
+
+    def close(self):
+        self.sock.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def main(argv=None):
+    """echo 'Hello' | python -m core.ipc  |  python -m core.ipc --humanize SOURCE < draft.txt"""
+    parser = argparse.ArgumentParser(description="Çalışan MyTranslator'a IPC ile çeviri isteği")
+    parser.add_argument("text", nargs="?", help="Çevrilecek metin (yoksa stdin)")
+    parser.add_argument("--humanize", metavar="SOURCE", help="Metni bu kaynak metne göre humanize et")
+    parser.add_argument("--address", help="Soket yolu veya host:port (varsayılan: MYTRANSLATOR_IPC)")
+    args = parser.parse_args(argv)
+
+    address = args.address or os.getenv("MYTRANSLATOR_IPC", "").strip()
+    text = args.text if args.text is not None else sys.stdin.read()
+    try:
+        with IPCClient(parse_address(address) if address else None) as client:
+            if args.humanize is not None:
+                chunks = client.stream("humanize", source_text=args.humanize, text=text)
+            else:
+                chunks = client.stream("translate", text=text)
+            for chunk in chunks:
+                sys.stdout.write(chunk)
+                sys.stdout.flush()
+        sys.stdout.write("\n")
+    except (OSError, IPCError) as e:
+        print(f"IPC hatası: {e}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
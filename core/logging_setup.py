@@ -0,0 +1,111 @@
+import os
+import sys
+import json
+import queue
+import atexit
+import logging
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+from core.metrics import metrics
+
+LOG_DROPPED = metrics.counter("mytranslator_log_records_dropped_total", "Kuyruk dolduğu için atılan log kaydı")
+
+CONSOLE_FORMAT = '%(asctime)s [%(threadName)s] %(message)s'
+
+
+class DroppingQueueHandler(QueueHandler):
+    """
+    Sınırlı kuyruk: Kuyruk doluysa kayıt bekletilmeden atılır.
+    Böylece yoğun kullanımda log hacmi belleği şişirmez, çağıran thread asla bloklanmaz.
+    """
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            LOG_DROPPED.inc()
+
+
+class StoppableQueueListener(QueueListener):
+    """Çalışma durumu kendi bayrağında tutulur: stop() tekrar çağrılırsa (atexit + elle) sessizce geçer."""
+
+    _listener_running = False
+
+    def start(self):
+        super().start()
+        self._listener_running = True
+
+    def stop(self):
+        if not self._listener_running:
+            return
+        self._listener_running = False
+        super().stop()
+
+
+class JsonLinesFormatter(logging.Formatter):
+    """Her kayıt tek satır JSON (grep/jq ile işlenebilir)."""
+
+    def format(self, record):
+        entry = {
+            "ts": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "thread": record.threadName,
+            "msg": record.getMessage(),
+        }
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False)
+
+
+def parse_module_levels(spec):
+    """'core.api_service=DEBUG,database=WARNING' -> {'core.api_service': 10, 'database': 30}"""
+    levels = {}
+    for item in (spec or "").split(","):
+        name, _, level = item.partition("=")
+        name, level = name.strip(), level.strip().upper()
+        if name and isinstance(logging.getLevelName(level), int):
+            levels[name] = logging.getLevelName(level)
+    return levels
+
+
+def setup_logging(log_path="debug_humanize.log", level=logging.INFO, max_bytes=5 * 1024 * 1024,
+                  backup_count=3, queue_size=10000, console=True):
+    """
+    NON-BLOCKING LOGGING
+    Uygulama thread'leri kayıtları sadece bellekteki kuyruğa bırakır; disk ve stdout
+    yazımı ayrı bir QueueListener thread'inde yapılır.
+    - Dosya: JSON-lines, boyut tabanlı rotasyon (max_bytes x backup_count)
+    - Modül seviyeleri: MYTRANSLATOR_LOG_LEVELS="core.api_service=DEBUG,database=WARNING"
+    """
+    handlers = []
+    file_handler = RotatingFileHandler(log_path, maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8")
+    file_handler.setFormatter(JsonLinesFormatter())
+    handlers.append(file_handler)
+    if console:
+        stream_handler = logging.StreamHandler(sys.stdout)
+        stream_handler.setFormatter(logging.Formatter(CONSOLE_FORMAT))
+        handlers.append(stream_handler)
+
+    log_queue = queue.Queue(maxsize=queue_size)
+    listener = StoppableQueueListener(log_queue, *handlers, respect_handler_level=True)
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(DroppingQueueHandler(log_queue))
+    root.setLevel(level)
+
+    for name, module_level in parse_module_levels(os.getenv("MYTRANSLATOR_LOG_LEVELS")).items():
+        logging.getLogger(name).setLevel(module_level)
+
+    listener.start()
+    atexit.register(_stop_listener, listener)
+    return listener
+
+
+def _stop_listener(listener):
+    # Çıkışta kuyrukta kalan kayıtları diske boşaltır (zaten durdurulmuşsa stop() dokunmaz)
+    listener.stop()
@@ -0,0 +1,114 @@
+import os
+import logging
+import threading
+
+from core.scheduler import JobScheduler, PRIORITY_BACKGROUND
+
+logger = logging.getLogger(__name__)
+
+
+def _env_number(name, cast=int):
+    value = os.getenv(name, "").strip()
+    if not value:
+        return None
+    try:
+        return cast(value)
+    except ValueError:
+        logger.warning(f"⚠️ {name}='{value}' geçersiz, yok sayılıyor.")
+        return None
+
+
+class RetentionPolicy:
+    """
+    history tablosunun sınırları (None = sınırsız).
+    MYTRANSLATOR_HISTORY_MAX_ROWS / _MAX_AGE_DAYS / _MAX_MB / _KEEP_HITS / _EVICTION ortam değişkenlerinden okunur.
+    eviction: 'lru' (en uzun süredir kullanılmayan) veya 'lfu' (en az kullanılan) önce silinir.
+    """
+
+    def __init__(self, max_rows=None, max_age_days=None, max_bytes=None, keep_hits=None, eviction="lru"):
+        self.max_rows = max_rows
+        self.max_age_days = max_age_days
+        self.max_bytes = max_bytes
+        self.keep_hits = keep_hits
+        self.eviction = eviction
+
+    @classmethod
+    def from_env(cls):
+        max_mb = _env_number("MYTRANSLATOR_HISTORY_MAX_MB", float)
+        return cls(
+            max_rows=_env_number("MYTRANSLATOR_HISTORY_MAX_ROWS"),
+            max_age_days=_env_number("MYTRANSLATOR_HISTORY_MAX_AGE_DAYS"),
+            max_bytes=int(max_mb * 1024 * 1024) if max_mb else None,
+            keep_hits=_env_number("MYTRANSLATOR_HISTORY_KEEP_HITS"),
+            eviction=os.getenv("MYTRANSLATOR_HISTORY_EVICTION", "lru").strip().lower() or "lru",
+        )
+
+    def is_unbounded(self):
+        return not (self.max_rows or self.max_age_days or self.max_bytes)
+
+
+class MaintenanceJob:
+    """
+    PERİYODİK VERİTABANI BAKIMI
+    Düşük öncelikle (PRIORITY_BACKGROUND) retention politikasını uygular, ardından
+    WAL checkpoint + incremental vacuum + ANALYZE ile dosyayı sıkıştırır.
+    """
+
+    def __init__(self, db, scheduler=None, policy=None, interval=3600.0, initial_delay=300.0):
+        self.db = db
+        self.scheduler = scheduler or JobScheduler(workers=1, reserved=0, name="Maintenance")
+        self.policy = policy or RetentionPolicy.from_env()
+        self.interval = interval
+        self.initial_delay = initial_delay
+        self._running = False
+        self._lock = threading.Lock()
+        self._compaction_pending = False
+
+    def start(self):
+        if self._running: return
+        self._running = True
+        self._schedule(self.initial_delay)
+
+    def stop(self):
+        self._running = False
+
+    def _schedule(self, delay):
+        if self._running:
+            self.scheduler.submit_later(delay, self._tick, priority=PRIORITY_BACKGROUND, name="db-maintenance")
+
+    def _tick(self):
+        try:
+            self.run_once()
+        finally:
+            self._schedule(self.interval)
+
+    def request_compaction(self):
+        """
+        Sıkıştırmayı arka plan önceliğinde kuyruğa alır (örn. geçmiş silindikten sonra).
+        Çağıran (UI thread'i) VACUUM'u beklemez; bekleyen bir istek varsa yenisi eklenmez (None).
+        """
+        with self._lock:
+            if self._compaction_pending:
+                return None
+            self._compaction_pending = True
+        return self.scheduler.submit(self._compact, priority=PRIORITY_BACKGROUND, name="db-compact")
+
+    def _compact(self):
+        with self._lock:
+            self._compaction_pending = False
+        return self.db.compact()
+
+    def run_once(self):
+        """Retention + sıkıştırma. {"deleted", "before", "after", "reclaimed"} döndürür."""
+        deleted = 0
+        if not self.policy.is_unbounded():
+            deleted = self.db.enforce_retention(
+                max_rows=self.policy.max_rows,
+                max_age_days=self.policy.max_age_days,
+                max_bytes=self.policy.max_bytes,
+                keep_hits=self.policy.keep_hits,
+                eviction=self.policy.eviction,
+            )
+        report = self.db.compact()
+        report["deleted"] = deleted
+        return report
@@ -0,0 +1,253 @@
+import os
+import json
+import time
+import logging
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+logger = logging.getLogger(__name__)
+
+# Gecikme histogramları için varsayılan kovalar (saniye)
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _label_key(labels):
+    return tuple(sorted(labels.items()))
+
+
+def _format_labels(key, extra=None):
+    items = list(key) + (list(extra) if extra else [])
+    if not items:
+        return ""
+    body = ",".join(f'{name}="{str(value)}"' for name, value in items)
+    return "{" + body + "}"
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name, help_text):
+        self.name = name
+        self.help = help_text
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._values.get(_label_key(labels), 0)
+
+    def samples(self):
+        with self._lock:
+            return [(self.name, key, value) for key, value in self._values.items()]
+
+    def to_dict(self):
+        with self._lock:
+            return {_format_labels(key) or "": value for key, value in self._values.items()}
+
+
+class Gauge(Counter):
+    """Anlık değer. 'callback' verilirse değer okunurken hesaplanır (örn. thread sayısı)."""
+    kind = "gauge"
+
+    def __init__(self, name, help_text, callback=None):
+        super().__init__(name, help_text)
+        self.callback = callback
+
+    def set(self, value, **labels):
+        with self._lock:
+            self._values[_label_key(labels)] = value
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    def samples(self):
+        if self.callback:
+            return [(self.name, (), self.callback())]
+        return super().samples()
+
+    def to_dict(self):
+        if self.callback:
+            return {"": self.callback()}
+        return super().to_dict()
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name, help_text, buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.buckets = tuple(buckets)
+        self._series = {}  # label_key -> [bucket_counts, sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][i] += 1
+                    break
+            series[1] += value
+            series[2] += 1
+
+    def time(self, **labels):
+        """with metrics_histogram.time(tier='exact'): ... şeklinde süre ölçümü."""
+        return _Timer(self, labels)
+
+    def count(self, **labels):
+        series = self._series.get(_label_key(labels))
+        return series[2] if series else 0
+
+    def samples(self):
+        out = []
+        with self._lock:
+            for key, (counts, total, count) in self._series.items():
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets, counts):
+                    cumulative += bucket_count
+                    out.append((f"{self.name}_bucket", key + (("le", bound),), cumulative))
+                out.append((f"{self.name}_bucket", key + (("le", "+Inf"),), count))
+                out.append((f"{self.name}_sum", key, total))
+                out.append((f"{self.name}_count", key, count))
+        return out
+
+    def to_dict(self):
+        with self._lock:
+            return {
+                _format_labels(key) or "": {
+                    "count": count,
+                    "sum": total,
+                    "buckets": dict(zip((str(b) for b in self.buckets), counts)),
+                }
+                for key, (counts, total, count) in self._series.items()
+            }
+
+
+class _Timer:
+    def __init__(self, histogram, labels):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.started, **self.labels)
+        return False
+
+
+class MetricsRegistry:
+    """
+    METRİK KAYDI (Bağımlılıksız, thread-safe)
+    Aynı isimle tekrar istenen metrik mevcut olanı döndürür, böylece modüller
+    kendi metriklerini import anında tanımlayabilir.
+    """
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, cls, name, help_text, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, help_text, **kwargs)
+            return metric
+
+    def counter(self, name, help_text=""):
+        return self._get_or_create(Counter, name, help_text)
+
+    def gauge(self, name, help_text="", callback=None):
+        return self._get_or_create(Gauge, name, help_text, callback=callback)
+
+    def histogram(self, name, help_text="", buckets=LATENCY_BUCKETS):
+        return self._get_or_create(Histogram, name, help_text, buckets=buckets)
+
+    def render_prometheus(self):
+        lines = []
+        for metric in list(self._metrics.values()):
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, key, value in metric.samples():
+                lines.append(f"{name}{_format_labels(key)} {value}")
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self):
+        return {
+            metric.name: {"type": metric.kind, "values": metric.to_dict()}
+            for metric in list(self._metrics.values())
+        }
+
+
+# Uygulama genelinde tek kayıt
+metrics = MetricsRegistry()
+
+metrics.gauge("mytranslator_threads", "Aktif Python thread sayısı", callback=threading.active_count)
+
+
+class _MetricsRequestHandler(BaseHTTPRequestHandler):
+    registry = metrics
+
+    def do_GET(self):
+        if self.path in ("/metrics", "/"):
+            body = self.registry.render_prometheus().encode("utf-8")
+            content_type = "text/plain; version=0.0.4; charset=utf-8"
+        elif self.path == "/metrics.json":
+            body = json.dumps(self.registry.snapshot(), ensure_ascii=False).encode("utf-8")
+            content_type = "application/json"
+        else:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # Her scrape'i loglamaya gerek yok
+
+
+class MetricsServer:
+    """
+    YEREL METRİK UCU (Opt-in)
+    Sadece 127.0.0.1 üzerinde dinler:
+    /metrics      -> Prometheus text formatı
+    /metrics.json -> JSON snapshot
+    """
+
+    def __init__(self, port=0, host="127.0.0.1", registry=metrics):
+        handler = type("MetricsHandler", (_MetricsRequestHandler,), {"registry": registry})
+        self.httpd = ThreadingHTTPServer((host, port), handler)
+        self.httpd.daemon_threads = True
+        self.port = self.httpd.server_address[1]
+
+    def start(self):
+        threading.Thread(target=self.httpd.serve_forever, daemon=True, name="MetricsServer").start()
+        logger.info(f"📈 [Metrics] http://127.0.0.1:{self.port}/metrics")
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def start_metrics_server_from_env():
+    """MYTRANSLATOR_METRICS_PORT tanımlıysa metrik sunucusunu başlatır."""
+    port = os.getenv("MYTRANSLATOR_METRICS_PORT")
+    if not port:
+        return None
+    try:
+        return MetricsServer(int(port)).start()
+    except Exception as e:
+        logger.error(f"Metrics Server Error: {e}")
+        return None
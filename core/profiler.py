@@ -0,0 +1,223 @@
+"""
+ÇALIŞAN UYGULAMA İÇİN PROFİLLEME
+Yeniden başlatmadan / debugger olmadan yavaşlık teşhisi:
+
+    python -m core.profiler --seconds 10            # tüm thread'lerden örnekleme
+    python -m core.profiler --seconds 10 --memory   # + tracemalloc snapshot'ı
+
+Çıktılar (MYTRANSLATOR_PROFILE_DIR, varsayılan: profiles/):
+- profile-<zaman>.folded : Flamegraph formatı ("thread;modül.fonk;... adet"),
+  flamegraph.pl / speedscope / inferno ile açılır.
+- profile-<zaman>.memory.txt + .tracemalloc : En çok bellek ayıran satırlar ve
+  tracemalloc.Snapshot.load() ile karşılaştırılabilen ham snapshot.
+
+Örnekleyici sys._current_frames() ile çalışır: Hedef kodda hiçbir kanca yoktur,
+maliyet sadece örnekleme aralığında bir yığın okumasıdır (varsayılan 5 ms).
+"""
+import os
+import sys
+import time
+import signal
+import logging
+import argparse
+import threading
+import tracemalloc
+import faulthandler
+from collections import Counter
+
+from core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_INTERVAL = 0.005
+MAX_SECONDS = 300
+TRACEMALLOC_FRAMES = 10
+TOP_ALLOCATIONS = 50
+
+PROFILER_SAMPLES = metrics.counter("mytranslator_profiler_samples_total", "Profil örneklemesinde okunan thread yığınları")
+
+
+def _frame_label(frame):
+    code = frame.f_code
+    return f"{frame.f_globals.get('__name__', '?')}.{getattr(code, 'co_qualname', code.co_name)}"
+
+
+def fold_stack(frame, thread_name):
+    """Yığını kökten yaprağa 'thread;modül.fonk;...' satırına çevirir."""
+    labels = []
+    while frame is not None:
+        labels.append(_frame_label(frame))
+        frame = frame.f_back
+    labels.append(thread_name)
+    return ";".join(reversed(labels))
+
+
+class SamplingProfiler:
+    """
+    ÖRNEKLEMELİ PROFİLER (isteğe bağlı, tek seferde bir oturum)
+    start() ayrı bir thread'de N saniye boyunca tüm thread'lerin yığınlarını toplar,
+    süre bitince (veya stop() ile) dosyaları yazar. Sonuç wait() ile beklenebilir.
+    """
+
+    def __init__(self, output_dir=None, interval=DEFAULT_INTERVAL):
+        self.output_dir = output_dir or os.getenv("MYTRANSLATOR_PROFILE_DIR", "").strip() or "profiles"
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._done = threading.Event()
+        self._done.set()
+        self._thread = None
+        self.last_result = None
+
+    @property
+    def running(self):
+        return not self._done.is_set()
+
+    def start(self, seconds=10, memory=False):
+        """Oturumu başlatır; zaten çalışıyorsa False."""
+        seconds = max(0.1, min(float(seconds), MAX_SECONDS))
+        with self._lock:
+            if self.running:
+                return False
+            self._stop.clear()
+            self._done.clear()
+            self._thread = threading.Thread(target=self._run, args=(seconds, memory), daemon=True, name="Profiler")
+            self._thread.start()
+        logger.info(f"🔬 Profil başladı ({seconds:g} sn{', bellek' if memory else ''}).")
+        return True
+
+    def stop(self):
+        self._stop.set()
+
+    def wait(self, timeout=None):
+        """Oturum bitene kadar bekler; sonuç (dict) veya zaman aşımında None."""
+        if not self._done.wait(timeout):
+            return None
+        return self.last_result
+
+    def _run(self, seconds, memory):
+        started_tracing = False
+        result = {"samples": 0, "folded": None, "memory": None}
+        try:
+            if memory and not tracemalloc.is_tracing():
+                tracemalloc.start(TRACEMALLOC_FRAMES)
+                started_tracing = True
+            stacks, samples, elapsed = self._sample(seconds)
+            stamp = time.strftime("%Y%m%d-%H%M%S")
+            os.makedirs(self.output_dir, exist_ok=True)
+            base = os.path.join(self.output_dir, f"profile-{stamp}")
+            result.update(samples=samples, seconds=round(elapsed, 3), folded=self._write_folded(base, stacks))
+            if memory:
+                result["memory"] = self._write_memory(base, tracemalloc.take_snapshot())
+            logger.info(f"🔬 Profil bitti: {samples} örnek -> {result['folded']}")
+        except Exception as e:
+            logger.error(f"Profiler Error: {e}")
+            result["error"] = str(e)
+        finally:
+            if started_tracing:
+                tracemalloc.stop()
+            self.last_result = result
+            self._done.set()
+
+    def _sample(self, seconds):
+        own = threading.get_ident()
+        stacks = Counter()
+        samples = 0
+        started = time.perf_counter()
+        deadline = started + seconds
+        while not self._stop.is_set() and time.perf_counter() < deadline:
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident != own:
+                    stacks[fold_stack(frame, names.get(ident, f"thread-{ident}"))] += 1
+            samples += 1
+            self._stop.wait(self.interval)
+        PROFILER_SAMPLES.inc(sum(stacks.values()))
+        return stacks, samples, time.perf_counter() - started
+
+    @staticmethod
+    def _write_folded(base, stacks):
+        path = base + ".folded"
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, count in stacks.most_common():
+                f.write(f"{stack} {count}\n")
+        return path
+
+    @staticmethod
+    def _write_memory(base, snapshot):
+        snapshot = snapshot.filter_traces((tracemalloc.Filter(False, tracemalloc.__file__),))
+        snapshot.dump(base + ".tracemalloc")
+        path = base + ".memory.txt"
+        stats = snapshot.statistics("lineno")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(f"Toplam: {sum(stat.size for stat in stats) / 1024:.1f} KiB ({len(stats)} satır)\n")
+            for stat in stats[:TOP_ALLOCATIONS]:
+                f.write(f"{stat}\n")
+        return path
+
+
+# Uygulama genelinde tek örnek (IPC ve CLI aynı oturumu görür)
+profiler = SamplingProfiler()
+
+
+def profile_ipc_handler(request):
+    """
+    IPC 'profile' işlemi: {"seconds": 10, "memory": false, "wait": true}
+    wait=false ise hemen döner; {"action": "stop"} çalışan oturumu erken bitirir.
+    """
+    if request.get("action") == "stop":
+        profiler.stop()
+        yield {"profile": profiler.wait(timeout=5)}
+        return
+    if not profiler.start(request.get("seconds", 10), bool(request.get("memory"))):
+        raise RuntimeError("profiler already running")
+    if request.get("wait", True):
+        yield {"profile": profiler.wait()}
+    else:
+        yield {"profile": {"started": True}}
+
+
+def enable_faulthandler(path="crash_trace.log"):
+    """
+    Çökme (segfault vb.) anında tüm thread yığınları dosyaya yazılır.
+    Unix'te SIGUSR1 ile çalışan uygulamanın yığınları istenildiği an dökülür:
+        kill -USR1 <pid>
+    """
+    try:
+        trace_file = open(path, "a", encoding="utf-8")
+        faulthandler.enable(trace_file, all_threads=True)
+        if hasattr(signal, "SIGUSR1") and threading.current_thread() is threading.main_thread():
+            faulthandler.register(signal.SIGUSR1, trace_file, all_threads=True)
+        return trace_file
+    except Exception as e:
+        logger.error(f"Faulthandler Error: {e}")
+        return None
+
+
+def main(argv=None):
+    """python -m core.profiler --seconds 10 [--memory]: Çalışan uygulamadan (IPC) profil ister."""
+    from core.ipc import IPCClient, IPCError, parse_address
+
+    parser = argparse.ArgumentParser(description="Çalışan MyTranslator'dan örneklemeli profil al")
+    parser.add_argument("--seconds", type=float, default=10, help="Örnekleme süresi (sn)")
+    parser.add_argument("--memory", action="store_true", help="tracemalloc snapshot'ı da al")
+    parser.add_argument("--stop", action="store_true", help="Çalışan oturumu erken bitir")
+    parser.add_argument("--address", help="Soket yolu veya host:port (varsayılan: MYTRANSLATOR_IPC)")
+    args = parser.parse_args(argv)
+
+    address = args.address or os.getenv("MYTRANSLATOR_IPC", "").strip()
+    params = {"action": "stop"} if args.stop else {"seconds": args.seconds, "memory": args.memory}
+    try:
+        with IPCClient(parse_address(address) if address else None, timeout=args.seconds + 60) as client:
+            list(client.stream("profile", **params))
+            result = (client.last_done or {}).get("profile")
+    except (OSError, IPCError) as e:
+        print(f"IPC hatası: {e}", file=sys.stderr)
+        return 1
+    for key, value in (result or {}).items():
+        print(f"{key}: {value}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
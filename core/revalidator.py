@@ -0,0 +1,117 @@
+import os
+import time
+import logging
+import threading
+
+from core.scheduler import JobScheduler, PRIORITY_BACKGROUND
+
+logger = logging.getLogger(__name__)
+
+# --- CACHE POLİTİKALARI ---
+# stale      : Bayat kaydı olduğu gibi göster (API çağrısı yok)
+# revalidate : Bayat kaydı anında göster, arka planda yeniden çevir (Stale-While-Revalidate)
+# refresh    : Bayat kaydı yok say, yeniden çevir
+CACHE_POLICY_SERVE_STALE = "stale"
+CACHE_POLICY_REVALIDATE = "revalidate"
+CACHE_POLICY_REFRESH = "refresh"
+CACHE_POLICIES = (CACHE_POLICY_SERVE_STALE, CACHE_POLICY_REVALIDATE, CACHE_POLICY_REFRESH)
+
+
+def get_cache_policy():
+    """MYTRANSLATOR_CACHE_POLICY ortam değişkeninden politikayı okur."""
+    policy = os.getenv("MYTRANSLATOR_CACHE_POLICY", CACHE_POLICY_REVALIDATE).strip().lower()
+    if policy not in CACHE_POLICIES:
+        logger.warning(f"⚠️ Bilinmeyen cache politikası '{policy}', '{CACHE_POLICY_REVALIDATE}' kullanılıyor.")
+        return CACHE_POLICY_REVALIDATE
+    return policy
+
+
+class StaleRevalidator:
+    """
+    LAZY ARKA PLAN YENİLEME
+    Model veya prompt değiştiğinde önbellek soğumasın diye bayat kayıtları
+    düşük öncelikle (PRIORITY_BACKGROUND), kullanıcı boştayken tek tek yeniden çevirir.
+    Kullanıcının az önce gördüğü bayat kayıtlar (request) hemen kuyruğa girer.
+    """
+
+    def __init__(self, api, db, scheduler=None, idle_delay=30.0, interval=2.0, batch_size=5):
+        self.api = api
+        self.db = db
+        self.scheduler = scheduler or JobScheduler(workers=1, reserved=0, name="Revalidator")
+        self.idle_delay = idle_delay  # Son aktiviteden sonra tarama için beklenecek süre
+        self.interval = interval      # İki yenileme arası bekleme (API'yi boğmamak için)
+        self.batch_size = batch_size
+        self._pending = set()
+        self._failed = set()          # Bu oturumda yenilenemeyen kayıtlar tekrar denenmez
+        self._lock = threading.Lock()
+        self._last_activity = time.monotonic()
+        self._running = False
+
+    def start(self):
+        if self._running: return
+        self._running = True
+        self._schedule_sweep(self.idle_delay)
+
+    def stop(self):
+        self._running = False
+
+    def notify_activity(self):
+        """Kullanıcı aktifken toplu tarama ertelenir."""
+        self._last_activity = time.monotonic()
+
+    def request(self, text, style="Academic"):
+        """Bayat bir kaydı yenileme kuyruğuna ekler (tekrarları yok sayar)."""
+        key = (text, style)
+        with self._lock:
+            if key in self._pending:
+                return
+            self._pending.add(key)
+        self.scheduler.submit(self.revalidate, text, style, priority=PRIORITY_BACKGROUND, name="revalidate")
+
+    def _schedule_sweep(self, delay):
+        if self._running:
+            self.scheduler.submit_later(delay, self._sweep, priority=PRIORITY_BACKGROUND, name="revalidate-sweep")
+
+    def _sweep(self):
+        """Her çalışmada tek bir bayat kaydı yeniler ve kendini yeniden zamanlar."""
+        next_delay = self.idle_delay
+        try:
+            idle_for = time.monotonic() - self._last_activity
+            if idle_for < self.idle_delay:
+                next_delay = self.idle_delay - idle_for
+                return
+
+            # Her stil kendi profilinin model/prompt'una göre bayat sayılır
+            entries = []
+            for style, profile in self.api.profiles.items():
+                entries += self.db.get_stale_entries(profile.model_name, profile.prompt_hash,
+                                                     limit=self.batch_size, style=style)
+            entry = next((e for e in entries if (e['original_text'], e['style']) not in self._failed), None)
+            if entry is None:
+                return  # Yenilenecek bir şey yok
+
+            if self.revalidate(entry['original_text'], entry['style']):
+                next_delay = self.interval
+            else:
+                # API sorunluysa hemen tekrar deneme, bir sonraki boşluğu bekle
+                self._failed.add((entry['original_text'], entry['style']))
+        finally:
+            self._schedule_sweep(next_delay)
+    def revalidate(self, text, style="Academic"):
+        """Tek bir kaydı güncel model/prompt ile yeniden çevirip önbelleğe yazar."""
+        try:
+            profile = self.api.profile(style)
+            translation = "".join(self.api.translate_text_stream(text, style=style))
+            if not translation or "[Hata:" in translation:
+                logger.warning("⚠️ [Revalidate] Yenileme başarısız, eski kayıt korunuyor.")
+                return False
+            self.db.add_history(text, translation, style,
+                                model=profile.model_name, prompt_hash=profile.prompt_hash)
+            logger.info("🔄 [Revalidate] Bayat kayıt güncellendi.")
+            return True
+        except Exception as e:
+            logger.error(f"Revalidate Error: {e}")
+            return False
+        finally:
+            with self._lock:
+                self._pending.discard((text, style))
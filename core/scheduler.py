@@ -0,0 +1,246 @@
+import time
+import heapq
+import logging
+import itertools
+import threading
+
+from core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# --- ÖNCELİKLER (küçük sayı = önce çalışır) ---
+PRIORITY_INTERACTIVE = 0   # Cmd+C+C çevirisi
+PRIORITY_HUMANIZE = 1      # Humanize butonu
+PRIORITY_PREFETCH = 2      # Önden çeviri / toplu işler
+PRIORITY_BACKGROUND = 3    # Revalidate, bakım işleri
+
+PRIORITY_NAMES = {
+    PRIORITY_INTERACTIVE: "interactive",
+    PRIORITY_HUMANIZE: "humanize",
+    PRIORITY_PREFETCH: "prefetch",
+    PRIORITY_BACKGROUND: "background",
+}
+
+QUEUE_WAIT_SECONDS = metrics.histogram("mytranslator_job_queue_wait_seconds", "İşin kuyrukta bekleme süresi")
+JOBS_TOTAL = metrics.counter("mytranslator_jobs_total", "Tamamlanan/iptal edilen/süresi dolan işler")
+QUEUE_DEPTH = metrics.gauge("mytranslator_job_queue_depth", "Kuyrukta bekleyen iş sayısı")
+BUSY_WORKERS = metrics.gauge("mytranslator_busy_workers", "Çalışan worker sayısı")
+
+_local = threading.local()
+
+
+class JobCancelled(Exception):
+    """Çalışan iş iptal edildiğinde uzun döngülerden çıkmak için."""
+
+
+def current_job():
+    """Çalışan işin Job nesnesi (worker thread dışında None). Uzun döngüler iptali buradan kontrol eder."""
+    return getattr(_local, "job", None)
+
+
+def raise_if_cancelled():
+    job = current_job()
+    if job is not None and job.cancelled:
+        raise JobCancelled(job.name)
+
+
+class Job:
+    """
+    Kuyruğa alınmış tek iş.
+    cancel(): Henüz başlamadıysa hiç çalışmaz; çalışıyorsa iş kendi döngüsünde
+    job.cancelled kontrolü ile erken çıkabilir (kooperatif iptal).
+    """
+
+    def __init__(self, fn, args, kwargs, priority, deadline, name):
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.priority = priority
+        self.deadline = deadline  # time.monotonic() cinsinden; None = süresiz
+        self.name = name or getattr(fn, "__name__", "job")
+        self.submitted_at = time.monotonic()
+        self._cancelled = threading.Event()
+        self._done = threading.Event()
+        self.result = None
+        self.error = None
+
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
+
+    @property
+    def expired(self):
+        return self.deadline is not None and time.monotonic() > self.deadline
+
+    def cancel(self):
+        self._cancelled.set()
+
+    def done(self):
+        return self._done.is_set()
+
+    def wait(self, timeout=None):
+        return self._done.wait(timeout)
+
+
+class JobScheduler:
+    """
+    MERKEZİ İŞ ZAMANLAYICI
+    Sabit boyutlu worker havuzu + öncelik kuyruğu. Her istek için yeni thread
+    açmak yerine işler sıraya girer; etkileşimli işler her zaman arka plan
+    işlerinin önüne geçer. 'reserved' kadar worker sadece interactive/humanize
+    işlerini alır, böylece uzun arka plan işleri bir aktivasyonu bekletemez.
+    """
+
+    def __init__(self, workers=4, reserved=1, name="Worker"):
+        self.workers = workers
+        self.reserved = min(reserved, workers - 1)
+        self.name = name
+        self._heap = []
+        self._delayed = []  # (çalışma zamanı, sıra, job)
+        self._sequence = itertools.count()
+        self._cond = threading.Condition()
+        self._threads = []
+        self._running = False
+        # Her start() yeni nesil: stop()'ta join zaman aşımına uğrayan eski worker'lar
+        # yeniden başlatılan havuza karışmaz, işlerini bitirince çıkar
+        self._generation = 0
+
+    @property
+    def running(self):
+        return self._running
+
+    def start(self):
+        with self._cond:
+            if self._running: return self
+            self._running = True
+            self._generation += 1
+            generation = self._generation
+        threads = []
+        for i in range(self.workers):
+            high_only = i < self.reserved
+            threads.append(threading.Thread(target=self._worker, args=(high_only, generation), daemon=True,
+                                            name=f"{self.name}-{i}"))
+        threads.append(threading.Thread(target=self._timer_loop, args=(generation,), daemon=True, name=f"{self.name}-timer"))
+        for thread in threads:
+            thread.start()
+        self._threads = threads
+        return self
+
+    def stop(self, timeout=5.0):
+        """Worker'ları durdurur ve (en fazla 'timeout' sn) bitmelerini bekler. Kuyruktaki işler çalıştırılmaz."""
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+            threads, self._threads = self._threads, []
+        deadline = time.monotonic() + timeout
+        current = threading.current_thread()
+        for thread in threads:
+            if thread is not current:  # stop() bir işin içinden çağrılmış olabilir
+                thread.join(max(0.0, deadline - time.monotonic()))
+        alive = [thread.name for thread in threads if thread.is_alive() and thread is not current]
+        if alive:
+            logger.warning(f"⚠️ [Scheduler] {len(alive)} worker hâlâ çalışıyor (işini bitirince çıkacak): {', '.join(alive)}")
+
+    def pending(self):
+        """Kuyrukta bekleyen (submit_later ile zamanı gelmemişler dahil) iş sayısı."""
+        with self._cond:
+            return len(self._heap) + len(self._delayed)
+
+    def _ensure_running(self, job):
+        """
+        Hiç başlatılmamış zamanlayıcı ilk işte başlatılır. stop() sonrası gelen iş ise
+        kabul edilmez (havuz kendiliğinden yeniden kurulmaz): İptal edilmiş ve bitmiş döner.
+        """
+        if self._running:
+            return True
+        if self._generation == 0:
+            self.start()
+            return True
+        logger.warning(f"⚠️ [Scheduler] {self.name} durdurulmuş, '{job.name}' çalıştırılmadı.")
+        job.cancel()
+        job._done.set()
+        return False
+
+    def submit(self, fn, *args, priority=PRIORITY_BACKGROUND, deadline=None, name=None, **kwargs):
+        """
+        İşi kuyruğa ekler ve Job döndürür.
+        deadline: Saniye cinsinden; iş bu süre içinde başlayamazsa çalıştırılmadan atılır.
+        """
+        absolute_deadline = time.monotonic() + deadline if deadline is not None else None
+        job = Job(fn, args, kwargs, priority, absolute_deadline, name)
+        if not self._ensure_running(job):
+            return job
+        with self._cond:
+            heapq.heappush(self._heap, (priority, next(self._sequence), job))
+            QUEUE_DEPTH.inc()
+            self._cond.notify_all()
+        return job
+
+    def submit_later(self, delay, fn, *args, priority=PRIORITY_BACKGROUND, name=None, **kwargs):
+        """İşi 'delay' saniye sonra kuyruğa alır (periyodik bakım işleri için)."""
+        job = Job(fn, args, kwargs, priority, None, name)
+        if not self._ensure_running(job):
+            return job
+        with self._cond:
+            heapq.heappush(self._delayed, (time.monotonic() + delay, next(self._sequence), job))
+            self._cond.notify_all()
+        return job
+
+    def _active(self, generation):
+        return self._running and self._generation == generation
+
+    def _timer_loop(self, generation):
+        with self._cond:
+            while self._active(generation):
+                now = time.monotonic()
+                while self._delayed and self._delayed[0][0] <= now:
+                    _, seq, job = heapq.heappop(self._delayed)
+                    job.submitted_at = now
+                    heapq.heappush(self._heap, (job.priority, seq, job))
+                    QUEUE_DEPTH.inc()
+                    self._cond.notify_all()
+                timeout = self._delayed[0][0] - now if self._delayed else None
+                self._cond.wait(timeout)
+
+    def _next_job(self, high_only, generation):
+        with self._cond:
+            while self._active(generation):
+                if self._heap and (not high_only or self._heap[0][0] <= PRIORITY_HUMANIZE):
+                    QUEUE_DEPTH.dec()
+                    return heapq.heappop(self._heap)[2]
+                self._cond.wait()
+            return None
+
+    def _worker(self, high_only, generation):
+        while True:
+            job = self._next_job(high_only, generation)
+            if job is None:
+                return
+            priority = PRIORITY_NAMES.get(job.priority, str(job.priority))
+            QUEUE_WAIT_SECONDS.observe(time.monotonic() - job.submitted_at, priority=priority)
+
+            if job.cancelled:
+                JOBS_TOTAL.inc(priority=priority, status="cancelled")
+                job._done.set()
+                continue
+            if job.expired:
+                logger.info(f"⏰ [Scheduler] '{job.name}' süresi doldu, çalıştırılmadı.")
+                JOBS_TOTAL.inc(priority=priority, status="expired")
+                job._done.set()
+                continue
+
+            BUSY_WORKERS.inc()
+            _local.job = job
+            try:
+                job.result = job.fn(*job.args, **job.kwargs)
+                JOBS_TOTAL.inc(priority=priority, status="done")
+            except JobCancelled:
+                JOBS_TOTAL.inc(priority=priority, status="cancelled")
+            except Exception as e:
+                job.error = e
+                logger.error(f"Job Error ({job.name}): {e}", exc_info=True)
+                JOBS_TOTAL.inc(priority=priority, status="error")
+            finally:
+                _local.job = None
+                BUSY_WORKERS.dec()
+                job._done.set()
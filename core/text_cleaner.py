@@ -0,0 +1,15 @@
+import re
+
+# --- COMPILED REGEX ---
+RE_HYPHEN = re.compile(r'-\s*\n\s*')
+RE_NEWLINES = re.compile(r'[\n\r]+')
+RE_SPACES = re.compile(r'\s+')
+
+
+def clean_text(text):
+    """PDF kopyalarındaki satır sonu tirelerini ve kırık satırları tek satıra indirir."""
+    if not text: return ""
+    text = RE_HYPHEN.sub('', text)
+    text = RE_NEWLINES.sub(' ', text)
+    text = RE_SPACES.sub(' ', text)
+    return text.strip()
@@ -0,0 +1,87 @@
+import re
+
+# Kelime ve noktalama parçaları (tokenizer yaklaşımı için)
+RE_TOKEN_PIECES = re.compile(r"\w+|[^\w\s]", re.UNICODE)
+RE_TURKISH_CHARS = re.compile(r"[çğıöşüÇĞİÖŞÜ]")
+RE_SENTENCE_END = re.compile(r"(?<=[.!?…])\s+")
+
+# --- GENİŞLEME ORANLARI (çıktı token / girdi token) ---
+# Türkçe eklemeli bir dil: Aynı anlam tokenizer'da daha fazla parçaya bölünür.
+EXPANSION_EN_TO_TR = 1.35
+EXPANSION_TR_TO_EN = 0.85
+EXPANSION_SAME_LANGUAGE = 1.15  # Humanize (yeniden yazım)
+
+# Çıktı limiti sınırları: Küçük girdiler için taban, uzun girdiler için tavan.
+# Tavanı aşan girdiler parçalara bölünerek çevrilir.
+MIN_OUTPUT_TOKENS = 64
+MAX_OUTPUT_TOKENS = 8192
+SAFETY_MARGIN = 1.25
+
+
+def estimate_tokens(text):
+    """
+    HIZLI TOKEN TAHMİNİ (Yerel, ağ çağrısı yok)
+    Gemini tokenizer'ı kelimeleri ~4 karakterlik alt parçalara böler;
+    noktalama işaretleri genelde tek token'dır.
+    """
+    if not text:
+        return 0
+    tokens = 0
+    for piece in RE_TOKEN_PIECES.findall(text):
+        tokens += max(1, (len(piece) + 3) // 4)
+    return tokens
+
+
+def is_turkish(text):
+    """Türkçeye özgü harflerin oranına bakan kaba dil tespiti."""
+    letters = sum(1 for ch in text[:2000] if ch.isalpha())
+    if not letters:
+        return False
+    return len(RE_TURKISH_CHARS.findall(text[:2000])) / letters > 0.02
+
+
+def translation_expansion(text):
+    return EXPANSION_TR_TO_EN if is_turkish(text) else EXPANSION_EN_TO_TR
+
+
+def output_token_budget(text, expansion=None):
+    """Girdi uzunluğu ve genişleme oranına göre max_output_tokens değeri."""
+    if expansion is None:
+        expansion = translation_expansion(text)
+    estimate = int(estimate_tokens(text) * expansion * SAFETY_MARGIN) + MIN_OUTPUT_TOKENS
+    return max(MIN_OUTPUT_TOKENS, min(MAX_OUTPUT_TOKENS, estimate))
+
+
+def split_for_budget(text, max_tokens):
+    """
+    Metni cümle sınırlarından, her parça en fazla max_tokens (tahmini) olacak şekilde böler.
+    Tek başına sığmayan çok uzun cümleler kelime sınırından bölünür.
+    """
+    parts, current, used = [], [], 0
+    for sentence in RE_SENTENCE_END.split(text.strip()):
+        cost = estimate_tokens(sentence)
+        if cost > max_tokens:
+            words = sentence.split(" ")
+            pieces, piece, piece_used = [], [], 0
+            for word in words:
+                word_cost = estimate_tokens(word) or 1
+                if piece and piece_used + word_cost > max_tokens:
+                    pieces.append(" ".join(piece))
+                    piece, piece_used = [], 0
+                piece.append(word)
+                piece_used += word_cost
+            if piece:
+                pieces.append(" ".join(piece))
+        else:
+            pieces = [sentence]
+
+        for piece_text in pieces:
+            piece_cost = estimate_tokens(piece_text)
+            if current and used + piece_cost > max_tokens:
+                parts.append(" ".join(current))
+                current, used = [], 0
+            current.append(piece_text)
+            used += piece_cost
+    if current:
+        parts.append(" ".join(current))
+    return parts
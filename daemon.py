@@ -0,0 +1,77 @@
+"""
+HEADLESS DAEMON (PyQt / pynput olmadan)
+Sadece çeviri motorunu (API + önbellek + arka plan işleri) başlatır ve yerel IPC
+üzerinden sunar. Sunucular, CI ve toplu işler için:
+
+    python daemon.py                       # MYTRANSLATOR_IPC (varsayılan: kullanıcıya özel Unix soketi)
+    python daemon.py --ipc 127.0.0.1:8766  # localhost TCP
+    echo "Hello" | python -m core.ipc      # istemci
+
+GUI modülleri hiç import edilmez; motor importları da main() içinde yapılır
+(--help anında döner).
+"""
+import os
+import sys
+import signal
+import logging
+import argparse
+import threading
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="MyTranslator headless daemon (GUI olmadan çeviri motoru)")
+    parser.add_argument("--ipc", help="Soket yolu veya host:port (varsayılan: MYTRANSLATOR_IPC)")
+    parser.add_argument("--metrics-port", type=int, help="Metrik ucu portu (varsayılan: MYTRANSLATOR_METRICS_PORT)")
+    parser.add_argument("--log", default="daemon.log", help="Log dosyası")
+    args = parser.parse_args(argv)
+
+    from core.logging_setup import setup_logging
+    setup_logging(args.log)
+    logger = logging.getLogger("daemon")
+
+    from core.profiler import enable_faulthandler
+    enable_faulthandler()
+
+    from core.engine import TranslationEngine
+    from core.ipc import IPCServer, IPCError, parse_address
+    from core.metrics import MetricsServer
+
+    # Env okuması motor importundan sonra: api_service .env dosyasını yükler
+    address = args.ipc or os.getenv("MYTRANSLATOR_IPC", "").strip()
+    if address.lower() in ("0", "false", "no", "off"):
+        logger.error("❌ IPC kapalıyken daemon'a erişilemez (MYTRANSLATOR_IPC=0).")
+        return 2
+    metrics_port = args.metrics_port or os.getenv("MYTRANSLATOR_METRICS_PORT")
+
+    engine = TranslationEngine()
+    try:
+        ipc_server = IPCServer(engine.ipc_handlers(), parse_address(address) if address else None)
+    except (OSError, IPCError, ValueError) as e:
+        logger.error(f"IPC Server Error: {e}")
+        engine.stop()
+        return 1
+
+    stop = threading.Event()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(sig, lambda *_: stop.set())
+
+    metrics_server = None
+    try:
+        engine.start()
+        ipc_server.start()
+        if metrics_port:
+            metrics_server = MetricsServer(int(metrics_port)).start()
+        logger.info("🚀 MyTranslator daemon hazır (headless).")
+        while not stop.wait(1):
+            pass
+    finally:
+        logger.info("🛑 Daemon kapatılıyor...")
+        ipc_server.stop()
+        if metrics_server:
+            metrics_server.stop()
+        engine.stop()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,27 +1,141 @@
 import sqlite3
 import json
 import logging
+import hashlib
+import time
+import math
+import itertools
+import threading
 from datetime import datetime
+from xml.etree.ElementTree import iterparse
+from xml.sax.saxutils import escape, quoteattr
 import os
 
+logger = logging.getLogger(__name__)
+
 # Akıllı Eşleşme Kontrolü
 try:
     from rapidfuzz import process, fuzz
     RAPIDFUZZ_AVAILABLE = True
 except ImportError:
     RAPIDFUZZ_AVAILABLE = False
-    logging.warning("⚠️ RapidFuzz bulunamadı. Akıllı eşleşme devre dışı.")
+    logger.warning("⚠️ RapidFuzz bulunamadı. Akıllı eşleşme devre dışı.")
+
+from core.metrics import metrics
+from core.tokens import is_turkish
+from database.journal import JobJournal
+from database.normalize import normalize_key
+from database.semantic import SemanticIndex, NUMPY_AVAILABLE
+from database.snapshot import HistorySnapshot
+from database.tm_remote import RemoteTMClient
+from database.write_behind import WriteBehindBuffer
+
+DB_LOOKUP_SECONDS = metrics.histogram("mytranslator_db_lookup_seconds", "Önbellek arama süresi (tier bazında)")
+DB_ERRORS = metrics.counter("mytranslator_db_errors_total", "Veritabanı hata sayısı")
+DB_EVICTED = metrics.counter("mytranslator_db_evicted_rows_total", "Retention ile silinen kayıtlar (nedene göre)")
+DB_RECLAIMED = metrics.counter("mytranslator_db_reclaimed_bytes_total", "Sıkıştırma ile geri kazanılan disk alanı")
+NORM_BACKFILL_BATCH = 5000
+# normalize_key davranışı değiştikçe artırılır (PRAGMA user_version)
+NORM_KEY_VERSION = 2
+DB_FILE_BYTES = metrics.gauge("mytranslator_db_file_bytes", "Veritabanı + WAL dosya boyutu")
+
+# Dışarıdan alınan (CAT aracı / başka makine) kayıtların model etiketi: 'import:tmx', 'import:jsonl'
+IMPORT_MODEL_PREFIX = "import:"
 
+STYLE_PROFILES_SCHEMA = '''
+    CREATE TABLE IF NOT EXISTS {table} (
+        name TEXT PRIMARY KEY,
+        system_prompt TEXT,
+        temperature REAL DEFAULT 0.3,
+        model TEXT,
+        max_output_tokens INTEGER,
+        position INTEGER DEFAULT 0,
+        updated DATETIME DEFAULT CURRENT_TIMESTAMP
+    )
+'''
+# Bu kadar veya daha fazla yeni kayıt eklenecekse indeks düşürülüp sonda tek seferde kurulur
+BULK_INDEX_THRESHOLD = 10000
+XML_LANG = "{http://www.w3.org/XML/1998/namespace}lang"
+
+# Fuzzy sıralamada sık onaylanan çevirilere verilen ek puan (log2(1 + hit), en fazla bu kadar)
+HIT_BONUS_MAX = 3.0
+FUZZY_CANDIDATES = 5
+# Fuzzy eşik/puanlayıcı: MYTRANSLATOR_FUZZY_THRESHOLD / MYTRANSLATOR_FUZZY_SCORER
+# (seçim için: python -m database.fuzzy_eval activations.jsonl)
+DEFAULT_FUZZY_THRESHOLD = 90
+FUZZY_SCORERS = ("ratio", "token_sort_ratio", "token_set_ratio", "WRatio", "partial_ratio")
+# Anlamsal katman: Vektör adayları RapidFuzz (kelime sırasından bağımsız) ile yeniden puanlanır
+SEMANTIC_CANDIDATES = 20
+SEMANTIC_THRESHOLD = 85
+# Vektör araması stilden bağımsız: Stilin adayları azsa aday sayısı 4'er kat artırılır (en fazla bu kadar)
+SEMANTIC_MAX_CANDIDATES = 1280
+EVICTION_ORDERS = {
+    # Korunacak kayıtlar önce gelir; sondakiler (en az değerli) silinir
+    "lru": "COALESCE(last_access, timestamp) DESC, id DESC",
+    "lfu": "hit_count DESC, COALESCE(last_access, timestamp) DESC, id DESC",
+}
+HISTORY_ORDERS = {
+    "recent": "COALESCE(last_access, timestamp) DESC, id DESC",
+    "frequent": "hit_count DESC, COALESCE(last_access, timestamp) DESC",
+    "created": "timestamp DESC, id DESC",
+}
 
 
 class DatabaseManager:
-    def __init__(self, db_name="mytranslator.db"):
+    def __init__(self, db_name="mytranslator.db", remote_url=None, semantic=None, snapshot=None,
+                 fuzzy_threshold=None, fuzzy_scorer=None):
         base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
         self.db_path = os.path.join(base_dir, db_name)
         self.init_db()
 
+        # FUZZY AYARLARI: Eşik ve RapidFuzz puanlayıcısı
+        if fuzzy_threshold is None:
+            value = os.getenv("MYTRANSLATOR_FUZZY_THRESHOLD", "").strip()
+            try:
+                fuzzy_threshold = float(value) if value else DEFAULT_FUZZY_THRESHOLD
+            except ValueError:
+                logger.warning(f"⚠️ MYTRANSLATOR_FUZZY_THRESHOLD='{value}' geçersiz, {DEFAULT_FUZZY_THRESHOLD} kullanılıyor.")
+                fuzzy_threshold = DEFAULT_FUZZY_THRESHOLD
+        self.fuzzy_threshold = fuzzy_threshold
+        if fuzzy_scorer is None:
+            fuzzy_scorer = os.getenv("MYTRANSLATOR_FUZZY_SCORER", "").strip() or "ratio"
+        if fuzzy_scorer not in FUZZY_SCORERS:
+            logger.warning(f"⚠️ MYTRANSLATOR_FUZZY_SCORER='{fuzzy_scorer}' geçersiz ({', '.join(FUZZY_SCORERS)}). 'ratio' kullanılıyor.")
+            fuzzy_scorer = "ratio"
+        self.fuzzy_scorer = fuzzy_scorer
+
+        # SNAPSHOT: Fuzzy arama ve geçmiş penceresi metinleri mmap'ten dilimler (MYTRANSLATOR_SNAPSHOT=0 ile kapalı)
+        if snapshot is None:
+            snapshot = os.getenv("MYTRANSLATOR_SNAPSHOT", "1").strip().lower() not in ("0", "false", "no")
+        self.snapshot = HistorySnapshot.open(self.db_path) if snapshot else None
+
+        # ANLAMSAL TM (Opsiyonel, NumPy gerekir): MYTRANSLATOR_SEMANTIC_TM=1
+        if semantic is None:
+            semantic = os.getenv("MYTRANSLATOR_SEMANTIC_TM", "0").strip().lower() in ("1", "true", "yes")
+        if semantic and not (NUMPY_AVAILABLE and RAPIDFUZZ_AVAILABLE):
+            logger.warning("⚠️ Anlamsal TM için NumPy ve RapidFuzz gerekli (pip install numpy). Devre dışı.")
+            semantic = False
+        self.semantic = SemanticIndex(self.db_path) if semantic else None
+        self._semantic_lock = threading.Lock()
+        # Dizin ilk kez güncellenene kadar anlamsal katman atlanır (etkileşimli arama catch_up beklemez)
+        self._semantic_ready = threading.Event()
+
+        # PAYLAŞILAN TM (Opsiyonel): Okumada yerel ıskalanınca sunucuya sorulur (read-through),
+        # yazmalar toplu halde arka planda gönderilir (write-behind).
+        if remote_url is None:
+            remote_url = os.getenv("MYTRANSLATOR_TM_SERVER", "")
+        self.remote = RemoteTMClient(remote_url) if remote_url else None
+        self.remote_writer = WriteBehindBuffer(self.remote.upsert_many, name="TMWriteBehind") if self.remote else None
+        # İSABET SAYACI: Her okuma için ayrı yazma yerine toplu güncelleme
+        self.hit_writer = WriteBehindBuffer(self._flush_hits, interval=5.0, max_batch=1000, name="HitWriteBehind")
+        # İŞ GÜNLÜĞÜ: Yarım kalan stream'ler çökme/kapanma sonrası devam ettirilir
+        self.journal = JobJournal(self)
+        self.catch_up_semantic()
+
     def connect(self):
         conn = sqlite3.connect(self.db_path)
+        # Silinen sayfalar dosyaya iade edilebilsin (WAL'dan önce; yeni DB'de hemen, eskide ilk VACUUM'da etkili)
+        conn.execute("PRAGMA auto_vacuum=INCREMENTAL;")
         # PERFORMANS AYARI: WAL Modu (Eşzamanlı okuma/yazma)
         conn.execute("PRAGMA journal_mode=WAL;") 
         conn.execute("PRAGMA synchronous=NORMAL;") # Disk yazma güvenliğini koruyarak hızı artırır
@@ -41,10 +155,135 @@ class DatabaseManager:
         ''')
         # HIZLI ARAMA İÇİN İNDEKS (Performansın sırrı buradadır)
         cursor.execute('CREATE INDEX IF NOT EXISTS idx_original_text ON history(original_text);')
+        # HUMANIZE ÖNBELLEĞİ: Aynı (kaynak, metin) çifti için üretilmiş varyantlar
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS humanize_cache (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                cache_key TEXT NOT NULL,
+                output TEXT NOT NULL,
+                model TEXT,
+                prompt_hash TEXT,
+                served_count INTEGER DEFAULT 0,
+                timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_humanize_key ON humanize_cache(cache_key);')
+        # KULLANIM KAYDI: İstek başına token ve süre (prompt değişikliklerinin maliyetini izlemek için)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS usage_log (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                kind TEXT,
+                model TEXT,
+                prompt_hash TEXT,
+                input_chars INTEGER,
+                estimated_input_tokens INTEGER,
+                prompt_tokens INTEGER,
+                output_tokens INTEGER,
+                max_output_tokens INTEGER,
+                finish_reason TEXT,
+                continuations INTEGER DEFAULT 0,
+                ttft_ms REAL,
+                duration_ms REAL,
+                timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        self._migrate(cursor)
+        # SNAPSHOT DEĞİŞİKLİK KAYDI: Metni değişen/silinen kayıtlar (snapshot artımlı güncellenir)
+        cursor.execute('CREATE TABLE IF NOT EXISTS history_changes (seq INTEGER PRIMARY KEY AUTOINCREMENT, row_id INTEGER NOT NULL)')
+        cursor.execute('CREATE TABLE IF NOT EXISTS history_snapshot (token TEXT)')
+        # İŞ GÜNLÜĞÜ: Devam eden stream işleri ve alınan parçalar (biten işler silinir)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS job_journal (
+                id TEXT PRIMARY KEY,
+                kind TEXT NOT NULL,
+                source_text TEXT NOT NULL,
+                style TEXT,
+                model TEXT,
+                prompt_hash TEXT,
+                attempts INTEGER DEFAULT 0,
+                started DATETIME DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        cursor.execute('CREATE TABLE IF NOT EXISTS job_chunks (job_id TEXT NOT NULL, seq INTEGER NOT NULL, '
+                       'text TEXT NOT NULL, PRIMARY KEY (job_id, seq)) WITHOUT ROWID')
+        # STİL PROFİLLERİ: history.style bu isimlerle bölümlenir (her stilin kendi önbelleği)
+        # system_prompt NULL: Hazır profil, prompt yüklenirken koddaki güncel metinden alınır
+        cursor.execute(STYLE_PROFILES_SCHEMA.format(table="style_profiles"))
+        self._migrate_style_profiles(cursor)
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS history_changes_update
+            AFTER UPDATE OF original_text, translation, style, norm_key ON history
+            BEGIN INSERT INTO history_changes (row_id) VALUES (OLD.id); END
+        ''')
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS history_changes_delete
+            AFTER DELETE ON history
+            BEGIN INSERT INTO history_changes (row_id) VALUES (OLD.id); END
+        ''')
         conn.commit()
         conn.close()
 
-    def add_history(self, original, translation, style="Academic"):
+    def _migrate(self, cursor):
+        """Eski veritabanlarına eksik kolonları ekler (veri kaybı olmadan)."""
+        cursor.execute('PRAGMA table_info(history)')
+        columns = {row[1] for row in cursor.fetchall()}
+        # Çevirinin hangi model + prompt ile üretildiği (Cache invalidation için)
+        if 'model' not in columns:
+            cursor.execute('ALTER TABLE history ADD COLUMN model TEXT')
+        if 'prompt_hash' not in columns:
+            cursor.execute('ALTER TABLE history ADD COLUMN prompt_hash TEXT')
+        # Kullanım istatistiği (retention/eviction sık kullanılan kayıtları korur)
+        if 'hit_count' not in columns:
+            cursor.execute('ALTER TABLE history ADD COLUMN hit_count INTEGER DEFAULT 0')
+        if 'last_access' not in columns:
+            cursor.execute('ALTER TABLE history ADD COLUMN last_access DATETIME')
+        # Kanonik anahtar (büyük/küçük harf, noktalama, atıf, tırnak farklarına dayanıklı eşleşme)
+        if 'norm_key' not in columns:
+            cursor.execute('ALTER TABLE history ADD COLUMN norm_key TEXT')
+        # normalize_key değişince etkilenen anahtarlar yeniden hesaplanır
+        # (v1: atıf kalıbı daraltıldı, v2: anlam taşıyan semboller korunuyor -> tüm satırlar)
+        if cursor.execute('PRAGMA user_version').fetchone()[0] < NORM_KEY_VERSION:
+            cursor.execute("UPDATE history SET norm_key = NULL")
+            cursor.execute(f'PRAGMA user_version = {NORM_KEY_VERSION}')
+        self._backfill_norm_keys(cursor)
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_norm_key ON history(norm_key, style);')
+
+    def _migrate_style_profiles(self, cursor):
+        """Eski şemada system_prompt NOT NULL idi: Hazır profiller NULL saklanabilsin diye tablo yeniden kurulur."""
+        cursor.execute('PRAGMA table_info(style_profiles)')
+        if not any(row[1] == "system_prompt" and row[3] for row in cursor.fetchall()):
+            return
+        cursor.execute(STYLE_PROFILES_SCHEMA.format(table="style_profiles_new"))
+        cursor.execute('INSERT INTO style_profiles_new SELECT name, system_prompt, temperature, model, '
+                       'max_output_tokens, position, updated FROM style_profiles')
+        cursor.execute('DROP TABLE style_profiles')
+        cursor.execute('ALTER TABLE style_profiles_new RENAME TO style_profiles')
+
+    def _backfill_norm_keys(self, cursor):
+        """Eski kayıtların norm_key'ini parça parça hesaplar (tek seferlik)."""
+        total = 0
+        while True:
+            cursor.execute('SELECT id, original_text FROM history WHERE norm_key IS NULL LIMIT ?', (NORM_BACKFILL_BATCH,))
+            rows = cursor.fetchall()
+            if not rows:
+                break
+            cursor.executemany('UPDATE history SET norm_key = ? WHERE id = ?',
+                               [(normalize_key(text), row_id) for row_id, text in rows])
+            total += len(rows)
+        if total:
+            logger.info(f"🔤 [DB] {total} kayıt için normalize anahtar oluşturuldu.")
+
+    @staticmethod
+    def _is_stale(record, model, prompt_hash):
+        # model verilmezse (eski çağrılar) hiçbir kayıt bayat sayılmaz
+        if model is None:
+            return False
+        # İçe aktarılan çeviri belleği insan çevirisidir, model değişince bayatlamaz
+        if (record['model'] or "").startswith(IMPORT_MODEL_PREFIX):
+            return False
+        return record['model'] != model or record['prompt_hash'] != prompt_hash
+
+    def add_history(self, original, translation, style="Academic", model=None, prompt_hash=None):
         if not original or not translation: return
         conn = self.connect()
         try:
@@ -54,70 +293,826 @@ class DatabaseManager:
             existing = cursor.fetchone()
             
             if existing:
-                cursor.execute('UPDATE history SET translation = ?, timestamp = CURRENT_TIMESTAMP WHERE id = ?', (translation, existing[0]))
+                cursor.execute('UPDATE history SET translation = ?, model = ?, prompt_hash = ?, timestamp = CURRENT_TIMESTAMP, last_access = CURRENT_TIMESTAMP WHERE id = ?', (translation, model, prompt_hash, existing[0]))
             else:
-                cursor.execute('INSERT INTO history (original_text, translation, style) VALUES (?, ?, ?)', (original, translation, style))
+                cursor.execute('INSERT INTO history (original_text, translation, style, model, prompt_hash, norm_key) VALUES (?, ?, ?, ?, ?, ?)', (original, translation, style, model, prompt_hash, normalize_key(original)))
             conn.commit()
-            logging.info(f"💾 [DB] Kaydedildi.")
+            logger.info(f"💾 [DB] Kaydedildi.")
         except Exception as e:
-            logging.error(f"DB Error: {e}")
+            logger.error(f"DB Error: {e}")
+            DB_ERRORS.inc(op="add_history")
+            return
         finally:
             conn.close()
 
-    def get_translation(self, text, style="Academic", threshold=90):
+        if self.remote_writer:
+            self.remote_writer.add({"original_text": original, "translation": translation, "style": style,
+                                    "model": model, "prompt_hash": prompt_hash})
+
+    def add_history_many(self, records):
+        """
+        Toplu upsert (tek transaction). records: original_text/translation/style/model/prompt_hash
+        alanlı dict'ler. Yazılan kayıt sayısını döndürür. (Uzak katmana gönderilmez.)
+        """
+        rows = [(r.get("original_text"), r.get("translation"), r.get("style") or "Academic",
+                 r.get("model"), r.get("prompt_hash")) for r in records]
+        rows = [row for row in rows if row[0] and row[1]]
+        if not rows: return 0
+        conn = self.connect()
+        try:
+            with conn:
+                cursor = conn.cursor()
+                for original, translation, style, model, prompt_hash in rows:
+                    cursor.execute('SELECT id FROM history WHERE original_text = ? AND style = ?', (original, style))
+                    existing = cursor.fetchone()
+                    if existing:
+                        cursor.execute('UPDATE history SET translation = ?, model = ?, prompt_hash = ?, timestamp = CURRENT_TIMESTAMP WHERE id = ?',
+                                       (translation, model, prompt_hash, existing[0]))
+                    else:
+                        cursor.execute('INSERT INTO history (original_text, translation, style, model, prompt_hash, norm_key) VALUES (?, ?, ?, ?, ?, ?)',
+                                       (original, translation, style, model, prompt_hash, normalize_key(original)))
+            return len(rows)
+        except Exception as e:
+            logger.error(f"DB Batch Error: {e}")
+            DB_ERRORS.inc(op="add_history_many")
+            return 0
+        finally:
+            conn.close()
+
+    def get_translation(self, text, style="Academic", threshold=None, model=None, prompt_hash=None):
+        """
+        model/prompt_hash verilirse dönen kayıt 'stale' alanı ile işaretlenir:
+        Başka bir model veya prompt ile üretilmiş çeviriler bayattır.
+        Yerel önbellekte yoksa (ve paylaşılan TM tanımlıysa) sunucuya sorulur.
+        threshold verilmezse self.fuzzy_threshold kullanılır.
+        """
+        if threshold is None:
+            threshold = self.fuzzy_threshold
+        result = self._get_local_translation(text, style, threshold, model, prompt_hash)
+        if result is not None or self.remote is None or not text:
+            return result
+        return self._get_remote_translation(text, style, threshold, model, prompt_hash)
+
+    def get_exact_translation(self, text, style="Academic", model=None, prompt_hash=None):
+        """
+        Sadece tam eşleşme (aynı metin + stil). Fuzzy/anlamsal/uzak katmanlara bakmaz ve
+        isabet kaydetmez: "Bu metin zaten çevrildi mi?" kontrolleri için (örn. yarım işlerin devamı).
+        """
         if not text: return None
         conn = self.connect()
         conn.row_factory = sqlite3.Row
+        try:
+            row = conn.execute('SELECT * FROM history WHERE original_text = ? AND style = ? ORDER BY timestamp DESC LIMIT 1',
+                               (text, style)).fetchone()
+            if row is None:
+                return None
+            result = dict(row)
+            result["stale"] = self._is_stale(row, model, prompt_hash)
+            return result
+        except Exception as e:
+            logger.error(f"DB Get Error: {e}")
+            DB_ERRORS.inc(op="get_translation")
+            return None
+        finally:
+            conn.close()
+
+    def _get_remote_translation(self, text, style, threshold, model, prompt_hash):
+        with DB_LOOKUP_SECONDS.time(tier="remote"):
+            record = self.remote.lookup(text, style, threshold, model=model, prompt_hash=prompt_hash)
+        if not record or not record.get("translation"):
+            return None
+        logger.info("🌐 [DB] Paylaşılan TM Eşleşmesi!")
+        # Yerel önbelleğe al (tekrar sunucuya gönderilmez)
+        self.add_history_many([record])
+        record["stale"] = self._is_stale(record, model, prompt_hash)
+        record["source"] = "remote"
+        return record
+
+    def _get_local_translation(self, text, style="Academic", threshold=None, model=None, prompt_hash=None):
+        if not text: return None
+        if threshold is None:
+            threshold = self.fuzzy_threshold
+        started = time.perf_counter()
+        tier = "miss"
+        conn = self.connect()
+        conn.row_factory = sqlite3.Row
         try:
             cursor = conn.cursor()
             # 1. Tam Eşleşme (Index Kullanır - 0ms)
             cursor.execute('SELECT * FROM history WHERE original_text = ? AND style = ? ORDER BY timestamp DESC LIMIT 1', (text, style))
             row = cursor.fetchone()
             if row:
-                logging.info("⚡️ [DB] Tam Eşleşme!")
-                return dict(row)
-
-            # 2. Akıllı Eşleşme (RapidFuzz)
-            if RAPIDFUZZ_AVAILABLE:
-                cursor.execute('SELECT original_text, translation FROM history WHERE style = ?', (style,))
-                all_records = cursor.fetchall()
-                choices = [rec['original_text'] for rec in all_records]
-                
-                if not choices: return None
-
-                match = process.extractOne(text, choices, scorer=fuzz.ratio)
-                if match:
-                    best_match_text, score, index = match
-                    if score >= threshold:
-                        logging.info(f"🧠 [DB] Akıllı Eşleşme (%{score:.1f})")
+                logger.info("⚡️ [DB] Tam Eşleşme!")
+                tier = "exact"
+                self.record_hit(row['id'])
+                result = dict(row)
+                result["stale"] = self._is_stale(row, model, prompt_hash)
+                return result
+
+            # 2. Kanonik Eşleşme (norm_key indeksi): Büyük/küçük harf, noktalama, atıf, akıllı tırnak farkları
+            key = normalize_key(text)
+            if key:
+                cursor.execute('''
+                    SELECT * FROM history WHERE norm_key = ? AND style = ?
+                    ORDER BY hit_count DESC, COALESCE(last_access, timestamp) DESC, id DESC LIMIT 1
+                ''', (key, style))
+                row = cursor.fetchone()
+                if row:
+                    logger.info("⚡️ [DB] Normalize Eşleşme!")
+                    tier = "normalized"
+                    self.record_hit(row['id'])
+                    result = dict(row)
+                    result["match_score"] = 100.0
+                    result["match_type"] = "normalized"
+                    result["stale"] = self._is_stale(row, model, prompt_hash)
+                    return result
+
+            # 3. Akıllı Eşleşme (RapidFuzz, kanonik anahtarlar üzerinde)
+            if RAPIDFUZZ_AVAILABLE and key:
+                # Eşiği geçen ilk birkaç aday arasından, sık kullanılan (onaylanmış) çeviriye ek puan verilir
+                candidates = self._fuzzy_candidates(conn, key, style, threshold)
+                if candidates:
+                    ids = [row_id for _, row_id in candidates]
+                    rows = {row['id']: row for row in conn.execute(
+                        f'SELECT * FROM history WHERE id IN ({",".join("?" * len(ids))})', ids)}
+                    live = [(score, rows[row_id]) for score, row_id in candidates if row_id in rows]
+                    if live:
+                        score, best = max(live, key=lambda c: c[0] + self._hit_bonus(c[1]['hit_count']))
+                        logger.info(f"🧠 [DB] Akıllı Eşleşme (%{score:.1f})")
+                        tier = "fuzzy"
+                        self.record_hit(best['id'])
                         return {
-                            "original_text": best_match_text,
-                            "translation": all_records[index]['translation'],
+                            "original_text": best['original_text'],
+                            "translation": best['translation'],
+                            "style": style,
+                            "model": best['model'],
+                            "prompt_hash": best['prompt_hash'],
                             "match_score": score,
-                            "match_type": "fuzzy"
+                            "match_type": "fuzzy",
+                            "stale": self._is_stale(best, model, prompt_hash)
                         }
+
+            # 4. Anlamsal Eşleşme (Opsiyonel): Yeniden sıralanmış / kısmen değişmiş cümleler
+            if self.semantic is not None and key:
+                match = self._semantic_match(conn, key, style)
+                if match:
+                    row, score = match
+                    logger.info(f"🧭 [DB] Anlamsal Eşleşme (%{score:.1f})")
+                    tier = "semantic"
+                    self.record_hit(row['id'])
+                    result = dict(row)
+                    result["match_score"] = score
+                    result["match_type"] = "semantic"
+                    result["stale"] = self._is_stale(row, model, prompt_hash)
+                    return result
             return None
         except Exception as e:
-            logging.error(f"DB Get Error: {e}")
+            logger.error(f"DB Get Error: {e}")
+            DB_ERRORS.inc(op="get_translation")
+            tier = "error"
             return None
         finally:
             conn.close()
+            DB_LOOKUP_SECONDS.observe(time.perf_counter() - started, tier=tier)
+
+    def _refresh_snapshot(self, conn):
+        """Snapshot'ı günceller; kullanılamıyorsa (kapalı/hata) False döner ve SQL yoluna düşülür."""
+        if self.snapshot is None:
+            return False
+        try:
+            self.snapshot.refresh(conn)
+            return True
+        except Exception as e:
+            logger.error(f"DB Snapshot Error: {e}")
+            DB_ERRORS.inc(op="snapshot")
+            return False
+
+    def _fuzzy_candidates(self, conn, key, style, threshold):
+        """[(skor, history.id), ...]. Snapshot varken anahtarlar mmap'ten parça parça taranır."""
+        scorer = getattr(fuzz, self.fuzzy_scorer)
+        if self._refresh_snapshot(conn):
+            reader = self.snapshot.reader()
+            matches = reader.extract(key, style, scorer, FUZZY_CANDIDATES, threshold, process.extract)
+            return [(score, reader.row_id(pos)) for score, pos in matches]
+        rows = conn.execute("SELECT id, COALESCE(NULLIF(norm_key, ''), original_text) FROM history WHERE style = ?",
+                            (style,)).fetchall()
+        matches = process.extract(key, [row[1] for row in rows], scorer=scorer,
+                                  limit=FUZZY_CANDIDATES, score_cutoff=threshold)
+        return [(score, rows[index][0]) for _, score, index in matches]
+
+    def catch_up_semantic(self, block=False):
+        """
+        Yeni history satırlarını anlamsal dizine ekler. Varsayılan: Arka plan thread'inde
+        (zaten çalışıyorsa tekrar başlatılmaz). block=True: Bitene kadar bekler.
+        """
+        if self.semantic is None:
+            return False
+        if block:
+            with self._semantic_lock:
+                self._catch_up_semantic_locked()
+            return True
+        if not self._semantic_lock.acquire(blocking=False):
+            return False
+        threading.Thread(target=self._semantic_worker, daemon=True, name="SemanticCatchUp").start()
+        return True
+
+    def _semantic_worker(self):
+        try:
+            self._catch_up_semantic_locked()
+        finally:
+            self._semantic_lock.release()
+
+    def _catch_up_semantic_locked(self):
+        conn = self.connect()
+        try:
+            self.semantic.catch_up(conn)
+            self._semantic_ready.set()
+        except Exception as e:
+            logger.error(f"DB Semantic Error: {e}")
+            DB_ERRORS.inc(op="semantic")
+        finally:
+            conn.close()
+
+    def _semantic_match(self, conn, key, style):
+        """Vektör top-k adaylarını token_sort_ratio ile puanlar: (row, skor) veya None."""
+        # Dizin gerideyse arka planda güncellenir; ilk güncelleme bitene kadar bu katman atlanır
+        if (conn.execute('SELECT MAX(id) FROM history').fetchone()[0] or 0) > self.semantic.last_id:
+            self.catch_up_semantic()
+        if not self._semantic_ready.is_set():
+            return None
+        # Arama tüm stilleri kapsar: Stilin yeterli adayı yoksa daha geniş top-k ile tekrar aranır
+        k = SEMANTIC_CANDIDATES
+        while True:
+            hits = self.semantic.search(key, k=k)
+            if not hits:
+                return None
+            ids = [row_id for row_id, _ in hits]
+            rows = conn.execute(f'SELECT * FROM history WHERE style = ? AND id IN ({",".join("?" * len(ids))})',
+                                (style, *ids)).fetchall()  # Silinmiş kayıtlar burada düşer
+            if len(rows) >= SEMANTIC_CANDIDATES or len(hits) < k or k >= SEMANTIC_MAX_CANDIDATES:
+                break
+            k *= 4
+        best = None
+        for row in rows:
+            score = fuzz.token_sort_ratio(key, row['norm_key'] or normalize_key(row['original_text']))
+            if score >= SEMANTIC_THRESHOLD and (best is None or score > best[1]):
+                best = (row, score)
+        return best
+
+    @staticmethod
+    def _hit_bonus(hit_count):
+        return min(HIT_BONUS_MAX, math.log2(1 + (hit_count or 0)))
+
+    def record_hit(self, row_id):
+        """Önbellek isabetini kaydeder (toplu olarak hit_writer ile yazılır)."""
+        self.hit_writer.add((row_id, time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime())))
+
+    def _flush_hits(self, hits):
+        if not os.path.exists(self.db_path):
+            return True  # Veritabanı dosyası silinmiş: Bekleyen isabetler anlamsız
+        # Aynı kayda gelen isabetler tek UPDATE'e indirgenir
+        counts = {}
+        for row_id, accessed in hits:
+            count, last = counts.get(row_id, (0, accessed))
+            counts[row_id] = (count + 1, max(last, accessed))
+        conn = self.connect()
+        try:
+            with conn:
+                conn.executemany('UPDATE history SET hit_count = COALESCE(hit_count, 0) + ?, last_access = ? WHERE id = ?',
+                                 [(count, last, row_id) for row_id, (count, last) in counts.items()])
+            return True
+        except Exception as e:
+            logger.error(f"DB Hit Flush Error: {e}")
+            DB_ERRORS.inc(op="flush_hits")
+            return False
+        finally:
+            conn.close()
+
+    def get_stale_entries(self, model, prompt_hash, limit=20, style=None):
+        """Güncel model/prompt ile üretilmemiş kayıtlar (en yeniler önce). 'style' verilirse sadece o stil."""
+        conn = self.connect()
+        conn.row_factory = sqlite3.Row
+        try:
+            cursor = conn.cursor()
+            cursor.execute(f'''
+                SELECT id, original_text, style FROM history
+                WHERE (model IS NULL OR model != ? OR prompt_hash IS NULL OR prompt_hash != ?)
+                  AND (model IS NULL OR model NOT LIKE ?) {"AND style = ?" if style else ""}
+                ORDER BY timestamp DESC LIMIT ?
+            ''', (model, prompt_hash, IMPORT_MODEL_PREFIX + "%", *((style,) if style else ()), limit))
+            return [dict(row) for row in cursor.fetchall()]
+        except Exception as e:
+            logger.error(f"DB Stale Error: {e}")
+            return []
+        finally:
+            conn.close()
             
+    STYLE_FIELDS = ("name", "system_prompt", "temperature", "model", "max_output_tokens")
+
+    def get_style_profiles(self):
+        """Kayıtlı stil profilleri (sıralı): [{name, system_prompt, temperature, model, max_output_tokens}]
+        system_prompt None ise hazır profildir (prompt APIService.set_profiles'ta çözülür)."""
+        conn = self.connect()
+        conn.row_factory = sqlite3.Row
+        try:
+            rows = conn.execute(f'SELECT {", ".join(self.STYLE_FIELDS)} FROM style_profiles ORDER BY position, name').fetchall()
+            return [dict(row) for row in rows]
+        except Exception as e:
+            logger.error(f"DB Style Error: {e}")
+            return []
+        finally:
+            conn.close()
+
+    def save_style_profiles(self, profiles):
+        """Profilleri ekler/günceller (yeni profiller listenin sonuna eklenir). Başarılıysa True."""
+        conn = self.connect()
+        try:
+            with conn:
+                conn.executemany('''
+                    INSERT INTO style_profiles (name, system_prompt, temperature, model, max_output_tokens, position)
+                    VALUES (?, ?, ?, ?, ?, (SELECT COALESCE(MAX(position) + 1, 0) FROM style_profiles))
+                    ON CONFLICT(name) DO UPDATE SET system_prompt = excluded.system_prompt,
+                        temperature = excluded.temperature, model = excluded.model,
+                        max_output_tokens = excluded.max_output_tokens, updated = CURRENT_TIMESTAMP
+                ''', [(p["name"], p.get("system_prompt"), p.get("temperature", 0.3), p.get("model"),
+                       p.get("max_output_tokens")) for p in profiles])
+            return True
+        except Exception as e:
+            logger.error(f"DB Style Save Error: {e}")
+            return False
+        finally:
+            conn.close()
+
+    def delete_style_profile(self, name):
+        """Profili siler; o stilin önbellek kayıtları (history) korunur."""
+        conn = self.connect()
+        try:
+            with conn:
+                conn.execute('DELETE FROM style_profiles WHERE name = ?', (name,))
+            return True
+        except Exception as e:
+            logger.error(f"DB Style Delete Error: {e}")
+            return False
+        finally:
+            conn.close()
+
+    @staticmethod
+    def humanize_key(source_text, current_text):
+        """Humanize önbellek anahtarı: kaynak + girdi metninin hash'i."""
+        digest = hashlib.sha256(f"{source_text}\x1f{current_text}".encode("utf-8"))
+        return digest.hexdigest()
+
+    def add_humanize_variant(self, cache_key, output, model=None, prompt_hash=None, max_variants=5):
+        """Yeni bir humanize varyantı kaydeder. Aynı çıktı tekrar eklenmez, en eski varyantlar budanır."""
+        if not cache_key or not output or not output.strip(): return
+        conn = self.connect()
+        try:
+            cursor = conn.cursor()
+            cursor.execute('SELECT id FROM humanize_cache WHERE cache_key = ? AND output = ?', (cache_key, output))
+            if cursor.fetchone():
+                return
+            cursor.execute('INSERT INTO humanize_cache (cache_key, output, model, prompt_hash) VALUES (?, ?, ?, ?)',
+                           (cache_key, output, model, prompt_hash))
+            cursor.execute('''
+                DELETE FROM humanize_cache WHERE cache_key = ? AND id NOT IN (
+                    SELECT id FROM humanize_cache WHERE cache_key = ? ORDER BY id DESC LIMIT ?
+                )
+            ''', (cache_key, cache_key, max_variants))
+            conn.commit()
+        except Exception as e:
+            logger.error(f"DB Humanize Error: {e}")
+        finally:
+            conn.close()
+
+    def get_humanize_variant(self, cache_key, model=None, prompt_hash=None):
+        """
+        Kayıtlı varyantlardan en az gösterilmiş olanı döndürür (ve gösterim sayısını artırır).
+        Böylece tekrar tıklamalar anında ve sırayla farklı varyantlar getirir.
+        """
+        if not cache_key: return None
+        conn = self.connect()
+        try:
+            cursor = conn.cursor()
+            if model is None:
+                cursor.execute('SELECT id, output FROM humanize_cache WHERE cache_key = ? ORDER BY served_count ASC, id DESC LIMIT 1',
+                               (cache_key,))
+            else:
+                cursor.execute('''
+                    SELECT id, output FROM humanize_cache
+                    WHERE cache_key = ? AND model = ? AND prompt_hash = ?
+                    ORDER BY served_count ASC, id DESC LIMIT 1
+                ''', (cache_key, model, prompt_hash))
+            row = cursor.fetchone()
+            if not row:
+                return None
+            cursor.execute('UPDATE humanize_cache SET served_count = served_count + 1 WHERE id = ?', (row[0],))
+            conn.commit()
+            return row[1]
+        except Exception as e:
+            logger.error(f"DB Humanize Get Error: {e}")
+            return None
+        finally:
+            conn.close()
+
+    USAGE_FIELDS = ("kind", "model", "prompt_hash", "input_chars", "estimated_input_tokens", "prompt_tokens",
+                    "output_tokens", "max_output_tokens", "finish_reason", "continuations", "ttft_ms", "duration_ms")
+
+    def add_usage(self, record):
+        """APIService.usage_callback olarak kullanılır: Tek bir isteğin token/süre kaydı."""
+        conn = self.connect()
+        try:
+            values = tuple(record.get(field) for field in self.USAGE_FIELDS)
+            placeholders = ", ".join("?" for _ in self.USAGE_FIELDS)
+            conn.execute(f'INSERT INTO usage_log ({", ".join(self.USAGE_FIELDS)}) VALUES ({placeholders})', values)
+            conn.commit()
+        except Exception as e:
+            logger.error(f"DB Usage Error: {e}")
+        finally:
+            conn.close()
+
+    def get_usage_summary(self):
+        """Prompt sürümü başına istek sayısı, token ve gecikme ortalamaları."""
+        conn = self.connect()
+        conn.row_factory = sqlite3.Row
+        try:
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT kind, model, prompt_hash, COUNT(*) AS requests,
+                       SUM(prompt_tokens) AS prompt_tokens, SUM(output_tokens) AS output_tokens,
+                       AVG(ttft_ms) AS avg_ttft_ms, AVG(duration_ms) AS avg_duration_ms,
+                       SUM(CASE WHEN continuations > 0 THEN 1 ELSE 0 END) AS truncated
+                FROM usage_log GROUP BY kind, model, prompt_hash ORDER BY MAX(id) DESC
+            ''')
+            return [dict(row) for row in cursor.fetchall()]
+        except Exception as e:
+            logger.error(f"DB Usage Summary Error: {e}")
+            return []
+        finally:
+            conn.close()
+
+    # --- ÇEVİRİ BELLEĞİ İÇE/DIŞA AKTARIM (TMX / JSONL) ---
+    # Kayıtlar her iki yönde de stream edilir; milyonlarca satır belleğe alınmaz.
+
+    def _iter_history(self, style=None):
+        conn = self.connect()
+        conn.row_factory = sqlite3.Row
+        try:
+            if style:
+                cursor = conn.execute('SELECT * FROM history WHERE style = ? ORDER BY id', (style,))
+            else:
+                cursor = conn.execute('SELECT * FROM history ORDER BY id')
+            for row in cursor:
+                yield row
+        finally:
+            conn.close()
+
+    def export_jsonl(self, path, style=None):
+        """Her satır: {"source", "target", "style", "model", "prompt_hash", "timestamp"}. Yazılan kayıt sayısını döndürür."""
+        count = 0
+        try:
+            with open(path, "w", encoding="utf-8") as f:
+                for row in self._iter_history(style):
+                    f.write(json.dumps({
+                        "source": row['original_text'],
+                        "target": row['translation'],
+                        "style": row['style'],
+                        "model": row['model'],
+                        "prompt_hash": row['prompt_hash'],
+                        "timestamp": row['timestamp'],
+                    }, ensure_ascii=False) + "\n")
+                    count += 1
+            logger.info(f"📤 [DB] {count} kayıt JSONL olarak dışa aktarıldı.")
+        except Exception as e:
+            logger.error(f"DB Export Error: {e}")
+            DB_ERRORS.inc(op="export")
+        return count
+
+    def export_tmx(self, path, style=None, source_lang=None, target_lang=None):
+        """
+        TMX 1.4 çıktısı (CAT araçlarıyla uyumlu). Yazılan kayıt sayısını döndürür.
+        Dil çifti verilmezse yön her kayıt için kaynak metinden tespit edilir (TR->EN / EN->TR);
+        başlıkta srclang="*all*", her <tu>'da kendi srclang'ı yazılır.
+        """
+        count = 0
+        try:
+            with open(path, "w", encoding="utf-8") as f:
+                f.write('<?xml version="1.0" encoding="UTF-8"?>\n<tmx version="1.4">\n')
+                f.write(f'<header creationtool="MyTranslator" creationtoolversion="1.0" segtype="sentence" '
+                        f'o-tmf="sqlite" adminlang="en" srclang={quoteattr(source_lang or "*all*")} datatype="plaintext"/>\n<body>\n')
+                for row in self._iter_history(style):
+                    src, tgt = self._tmx_languages(row["original_text"], source_lang, target_lang)
+                    f.write(f'<tu srclang={quoteattr(src)}><prop type="x-style">{escape(row["style"] or "")}</prop>'
+                            f'<tuv xml:lang={quoteattr(src)}><seg>{escape(row["original_text"])}</seg></tuv>'
+                            f'<tuv xml:lang={quoteattr(tgt)}><seg>{escape(row["translation"])}</seg></tuv></tu>\n')
+                    count += 1
+                f.write('</body>\n</tmx>\n')
+            logger.info(f"📤 [DB] {count} kayıt TMX olarak dışa aktarıldı.")
+        except Exception as e:
+            logger.error(f"DB Export Error: {e}")
+            DB_ERRORS.inc(op="export")
+        return count
+
+    @staticmethod
+    def _tmx_languages(text, source_lang=None, target_lang=None):
+        detected_source, detected_target = ("tr", "en") if is_turkish(text) else ("en", "tr")
+        return source_lang or detected_source, target_lang or detected_target
+
+    @staticmethod
+    def _segment_text(seg):
+        # <bpt>/<ph> gibi biçim etiketlerinin içeriği (native kod) alınmaz, sadece metin ve kuyruklar
+        parts = [seg.text or ""]
+        for child in seg:
+            parts.append(child.tail or "")
+        return "".join(parts).strip()
+
+    def _iter_tmx(self, path, source_lang, target_lang, style):
+        """
+        Kaynak dil sırasıyla: Parametre > <tu srclang> > <header srclang> > ilk <tuv>.
+        Hedef: target_lang verilmişse o, yoksa kaynaktan farklı dildeki ilk <tuv>.
+        """
+        source_lang, target_lang = (source_lang or "").lower(), (target_lang or "").lower()
+        header_lang = ""
+        body = None
+        for event, element in iterparse(path, events=("start", "end")):
+            if event == "start":
+                if element.tag == "header":
+                    header_lang = (element.get("srclang") or "").lower()
+                elif element.tag == "body":
+                    body = element
+                continue
+            if element.tag != "tu":
+                continue
+            tu_style = style
+            segments = []
+            for child in element:
+                if child.tag == "prop" and child.get("type") == "x-style" and child.text:
+                    tu_style = child.text
+                elif child.tag == "tuv":
+                    seg = child.find("seg")
+                    if seg is not None:
+                        segments.append(((child.get(XML_LANG) or child.get("lang") or "").lower(), self._segment_text(seg)))
+            src_lang = source_lang or (element.get("srclang") or "").lower() or header_lang
+            if src_lang in ("", "*all*"):
+                src_lang = segments[0][0] if segments else ""
+            source_index = next((i for i, (lang, _) in enumerate(segments) if lang.startswith(src_lang)), None)
+            source = target = None
+            if source_index is not None:
+                source = segments[source_index][1]
+                target = next((text for i, (lang, text) in enumerate(segments) if i != source_index
+                               and (lang.startswith(target_lang) if target_lang else lang != segments[source_index][0])), None)
+            if source and target:
+                yield (source, target, tu_style, IMPORT_MODEL_PREFIX + "tmx", None)
+            # İşlenen <tu> bellekten atılır (bellek kullanımı dosya boyutundan bağımsız)
+            element.clear()
+            if body is not None:
+                body.clear()
+
+    def _iter_jsonl(self, path, style):
+        skipped = 0
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                    source = record.get("source") or record.get("original_text")
+                    target = record.get("target") or record.get("translation")
+                except (ValueError, AttributeError):
+                    source = target = None
+                if not source or not target:
+                    skipped += 1
+                    continue
+                # Başka bir MyTranslator'dan gelen model etiketleri korunur (bayatlık kuralları geçerli kalır)
+                yield (source, target, record.get("style") or style,
+                       record.get("model") or IMPORT_MODEL_PREFIX + "jsonl", record.get("prompt_hash"))
+        if skipped:
+            logger.warning(f"⚠️ [DB] {skipped} bozuk JSONL satırı atlandı.")
+
+    def import_tmx(self, path, source_lang=None, target_lang=None, style="Academic", overwrite=False, batch_size=50000):
+        return self._bulk_import(self._iter_tmx(path, source_lang, target_lang, style), overwrite, batch_size)
+
+    def import_jsonl(self, path, style="Academic", overwrite=False, batch_size=50000):
+        return self._bulk_import(self._iter_jsonl(path, style), overwrite, batch_size)
+
+    def _bulk_import(self, records, overwrite=False, batch_size=50000):
+        """
+        TOPLU YÜKLEME (Hızlı yol)
+        1. Kayıtlar 'batch_size'lık parçalarla geçici staging tablosuna yazılır (tek transaction)
+        2. Staging indeksi yükleme bittikten sonra kurulur
+        3. Birleştirme tek transaction'da: Aynı (metin, stil) için son kayıt kazanır,
+           mevcut kayıtlar 'overwrite' verilmedikçe korunur
+        4. Çok sayıda yeni satır varsa history indeksi düşürülüp sonda tek seferde yeniden kurulur
+        Özet sözlük döndürür: {"read", "inserted", "updated"}
+        """
+        summary = {"read": 0, "inserted": 0, "updated": 0}
+        started = time.perf_counter()
+        conn = self.connect()
+        try:
+            conn.execute("PRAGMA temp_store=MEMORY;")
+            conn.execute("PRAGMA cache_size=-65536;")  # ~64MB sayfa önbelleği
+            conn.execute("DROP TABLE IF EXISTS temp.import_staging")
+            conn.execute("CREATE TEMP TABLE import_staging (original_text TEXT, translation TEXT, style TEXT, model TEXT, prompt_hash TEXT, norm_key TEXT)")
+
+            records = (record + (normalize_key(record[0]),) for record in records)
+            with conn:
+                while True:
+                    chunk = list(itertools.islice(records, batch_size))
+                    if not chunk:
+                        break
+                    conn.executemany("INSERT INTO import_staging VALUES (?, ?, ?, ?, ?, ?)", chunk)
+                    summary["read"] += len(chunk)
+                    logger.info(f"📥 [DB] {summary['read']} kayıt okundu...")
+            if not summary["read"]:
+                return summary
+
+            conn.execute("CREATE INDEX temp.idx_staging ON import_staging(original_text, style)")
+            # Dosya içi tekrarlar: son kayıt kazanır
+            conn.execute("DELETE FROM import_staging WHERE rowid NOT IN (SELECT MAX(rowid) FROM import_staging GROUP BY original_text, style)")
+
+            with conn:
+                if overwrite:
+                    cursor = conn.execute('''
+                        UPDATE history SET
+                            translation = (SELECT s.translation FROM import_staging s WHERE s.original_text = history.original_text AND s.style = history.style),
+                            model = (SELECT s.model FROM import_staging s WHERE s.original_text = history.original_text AND s.style = history.style),
+                            prompt_hash = (SELECT s.prompt_hash FROM import_staging s WHERE s.original_text = history.original_text AND s.style = history.style),
+                            norm_key = (SELECT s.norm_key FROM import_staging s WHERE s.original_text = history.original_text AND s.style = history.style),
+                            timestamp = CURRENT_TIMESTAMP
+                        WHERE EXISTS (SELECT 1 FROM import_staging s WHERE s.original_text = history.original_text AND s.style = history.style)
+                    ''')
+                    summary["updated"] = cursor.rowcount
+
+                # Zaten var olanlar staging'den çıkarılır, kalanlar yeni kayıttır
+                conn.execute('''
+                    DELETE FROM import_staging WHERE EXISTS (
+                        SELECT 1 FROM history h WHERE h.original_text = import_staging.original_text AND h.style = import_staging.style
+                    )
+                ''')
+                new_rows = conn.execute("SELECT COUNT(*) FROM import_staging").fetchone()[0]
+                defer_index = new_rows >= BULK_INDEX_THRESHOLD
+                if defer_index:
+                    conn.execute("DROP INDEX IF EXISTS idx_original_text")
+                    conn.execute("DROP INDEX IF EXISTS idx_norm_key")
+                conn.execute('''
+                    INSERT INTO history (original_text, translation, style, model, prompt_hash, norm_key)
+                    SELECT original_text, translation, style, model, prompt_hash, norm_key FROM import_staging ORDER BY rowid
+                ''')
+                if defer_index:
+                    conn.execute("CREATE INDEX IF NOT EXISTS idx_original_text ON history(original_text)")
+                    conn.execute("CREATE INDEX IF NOT EXISTS idx_norm_key ON history(norm_key, style)")
+                summary["inserted"] = new_rows
+            conn.execute("DROP TABLE IF EXISTS temp.import_staging")
+
+            logger.info(f"📥 [DB] İçe aktarma bitti: {summary['inserted']} yeni, {summary['updated']} güncellendi "
+                        f"({time.perf_counter() - started:.1f}s).")
+        except Exception as e:
+            logger.error(f"DB Import Error: {e}")
+            DB_ERRORS.inc(op="import")
+        finally:
+            conn.close()
+        return summary
+
+    # --- RETENTION VE SIKIŞTIRMA ---
+
+    def file_size(self):
+        """Veritabanı + WAL dosyalarının toplam boyutu (byte)."""
+        total = 0
+        for path in (self.db_path, self.db_path + "-wal"):
+            if os.path.exists(path):
+                total += os.path.getsize(path)
+        return total
+
+    def enforce_retention(self, max_rows=None, max_age_days=None, max_bytes=None, keep_hits=None, eviction="lru"):
+        """
+        history tablosunu sınırlar. eviction='lru': Önce en uzun süredir kullanılmayanlar
+        (last_access, yoksa timestamp); 'lfu': Önce en az isabet alanlar silinir.
+        hit_count >= keep_hits olan kayıtlar korunur.
+        max_bytes: Metin yükü (kaynak + çeviri) sınırı. Silinen kayıt sayısını döndürür.
+        """
+        self.hit_writer.flush()  # Bekleyen isabetler sıralamaya yansısın
+        protect = "hit_count >= ?" if keep_hits else "0"
+        protect_args = (keep_hits,) if keep_hits else ()
+        recency = "COALESCE(last_access, timestamp)"
+        keep_order = EVICTION_ORDERS.get(eviction, EVICTION_ORDERS["lru"])
+        deleted = 0
+        conn = self.connect()
+        try:
+            with conn:
+                if max_age_days:
+                    cursor = conn.execute(f'''
+                        DELETE FROM history WHERE {recency} < datetime('now', ?) AND NOT ({protect})
+                    ''', (f"-{int(max_age_days)} days",) + protect_args)
+                    DB_EVICTED.inc(cursor.rowcount, reason="max_age")
+                    deleted += cursor.rowcount
+                    conn.execute("DELETE FROM humanize_cache WHERE timestamp < datetime('now', ?)", (f"-{int(max_age_days)} days",))
+                if max_rows:
+                    cursor = conn.execute(f'''
+                        DELETE FROM history WHERE id IN (
+                            SELECT id FROM history WHERE NOT ({protect})
+                            ORDER BY {keep_order} LIMIT -1 OFFSET MAX(0, ? - (SELECT COUNT(*) FROM history WHERE {protect}))
+                        )
+                    ''', protect_args + (int(max_rows),) + protect_args)
+                    DB_EVICTED.inc(cursor.rowcount, reason="max_rows")
+                    deleted += cursor.rowcount
+                if max_bytes:
+                    # En yeniden eskiye kümülatif boyut; sınırı aşan (eski) kayıtlar silinir
+                    cursor = conn.execute(f'''
+                        DELETE FROM history WHERE id IN (
+                            SELECT id FROM (
+                                SELECT id, {protect} AS protected,
+                                       SUM(length(CAST(original_text AS BLOB)) + length(CAST(translation AS BLOB)))
+                                           OVER (ORDER BY {protect} DESC, {keep_order}) AS running
+                                FROM history
+                            ) WHERE running > ? AND NOT protected
+                        )
+                    ''', protect_args * 2 + (int(max_bytes),))
+                    DB_EVICTED.inc(cursor.rowcount, reason="max_bytes")
+                    deleted += cursor.rowcount
+            if deleted:
+                logger.info(f"🧹 [DB] Retention: {deleted} kayıt silindi.")
+            return deleted
+        except Exception as e:
+            logger.error(f"DB Retention Error: {e}")
+            DB_ERRORS.inc(op="retention")
+            return deleted
+        finally:
+            conn.close()
+
+    def compact(self):
+        """
+        WAL'ı ana dosyaya yazıp sıfırlar, boş sayfaları diske iade eder ve sorgu
+        planlayıcısı istatistiklerini günceller. {"before", "after", "reclaimed"} (byte) döndürür.
+        """
+        before = self.file_size()
+        conn = self.connect()
+        try:
+            # Snapshot'ın uyguladığı değişiklik kayıtları artık gereksiz
+            trim_seq = self.snapshot.meta["last_seq"] if self._refresh_snapshot(conn) else None
+            conn.execute('DELETE FROM history_changes WHERE seq <= COALESCE(?, seq)', (trim_seq,))
+            conn.commit()
+            conn.execute("PRAGMA wal_checkpoint(TRUNCATE);")
+            if conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2:
+                # executescript: Pragma her adımda tek sayfa iade eder, sonuna kadar çalıştırılmalı
+                conn.executescript("PRAGMA incremental_vacuum;")
+            else:
+                # Eski veritabanı: Bir kerelik tam VACUUM ile INCREMENTAL moda geçilir
+                logger.info("🧹 [DB] auto_vacuum=INCREMENTAL'a geçiliyor (tek seferlik VACUUM)...")
+                conn.execute("VACUUM;")
+            conn.execute("ANALYZE;")
+            conn.commit()
+            conn.execute("PRAGMA wal_checkpoint(TRUNCATE);")
+        except Exception as e:
+            logger.error(f"DB Compact Error: {e}")
+            DB_ERRORS.inc(op="compact")
+        finally:
+            conn.close()
+        after = self.file_size()
+        reclaimed = max(0, before - after)
+        DB_RECLAIMED.inc(reclaimed)
+        DB_FILE_BYTES.set(after)
+        logger.info(f"🧹 [DB] Sıkıştırma: {before / 1024:.0f}KB -> {after / 1024:.0f}KB ({reclaimed / 1024:.0f}KB geri kazanıldı)")
+        return {"before": before, "after": after, "reclaimed": reclaimed}
+
     def clear_history(self):
+        """Geçmişi siler. Boşalan alanın diske iadesi (compact) çağıranın işi: MaintenanceJob.request_compaction."""
         conn = self.connect()
         conn.execute('DELETE FROM history')
+        conn.execute('DELETE FROM humanize_cache')
         conn.commit()
         conn.close()
+        if self.semantic is not None:
+            self.semantic.reset()
 
-    def get_last_history(self, limit=100):
+    def get_last_history(self, limit=100, order="recent"):
+        """order: 'recent' (son kullanılan önce), 'frequent' (en çok kullanılan önce), 'created'."""
+        self.hit_writer.flush()
         conn = self.connect()
         conn.row_factory = sqlite3.Row
         try:
             cursor = conn.cursor()
-            cursor.execute('SELECT * FROM history ORDER BY timestamp DESC LIMIT ?', (limit,))
+            cursor.execute(f'SELECT * FROM history ORDER BY {HISTORY_ORDERS.get(order, HISTORY_ORDERS["recent"])} LIMIT ?', (limit,))
             return [dict(row) for row in cursor.fetchall()]
         except Exception as e:
-            logging.error(f"DB History Error: {e}")
+            logger.error(f"DB History Error: {e}")
+            return []
+        finally:
+            conn.close()
+
+    def get_history_view(self, limit=100, order="recent"):
+        """
+        get_last_history ile aynı sıra ve alanlar; metinler öğeye erişilince snapshot'tan
+        dilimlenir (büyük geçmişte satır başına dict/str tutulmaz). Snapshot yoksa liste döner.
+        """
+        self.hit_writer.flush()
+        conn = self.connect()
+        try:
+            if not self._refresh_snapshot(conn):
+                return self.get_last_history(limit, order)
+            rows = conn.execute(f'SELECT id, timestamp, hit_count, last_access FROM history '
+                                f'ORDER BY {HISTORY_ORDERS.get(order, HISTORY_ORDERS["recent"])} LIMIT ?', (limit,)).fetchall()
+            return self.snapshot.view(rows)
+        except Exception as e:
+            logger.error(f"DB History Error: {e}")
             return []
         finally:
             conn.close()
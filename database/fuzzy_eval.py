@@ -0,0 +1,234 @@
+"""
+FUZZY EŞLEŞME DEĞERLENDİRİCİSİ (Çevrimdışı A/B)
+Kaydedilmiş aktivasyonları (MYTRANSLATOR_ACTIVATION_LOG) veritabanının bellekteki bir
+kopyasına karşı farklı puanlayıcı / eşik / indeks stratejileriyle tekrar oynatır:
+
+    python -m database.fuzzy_eval activations.jsonl --db mytranslator.db \\
+        --scorers ratio,token_set_ratio,WRatio --thresholds 80,85,90,95 --index scan,length
+
+Her aktivasyon kendi zamanındaki önbelleğe karşı değerlendirilir (sadece o andan önce
+eklenmiş kayıtlar aday olur). Raporlanan:
+- hit_rate: Önbellekten cevaplanan oran (tam/kanonik + fuzzy)
+- saved_calls / saved_s: Fuzzy katmanın kazandırdığı API çağrısı ve tahmini süre
+  (usage_log'daki medyan çeviri süresi ya da --api-latency)
+- wrong: Sunulan fuzzy çevirinin, aynı metnin gerçek çevirisine (sonradan API'den gelen)
+  benzerliği --agree altında kalan isabetler
+- lookup_ms: Fuzzy aramanın ortalama / p95 maliyeti
+Kaynak veritabanı değiştirilmez.
+"""
+import sys
+import json
+import time
+import bisect
+import sqlite3
+import calendar
+import argparse
+import statistics
+from collections import Counter
+
+from database.db_manager import FUZZY_SCORERS, DEFAULT_FUZZY_THRESHOLD
+from database.normalize import normalize_key
+
+try:
+    from rapidfuzz import process, fuzz
+    RAPIDFUZZ_AVAILABLE = True
+except ImportError:
+    RAPIDFUZZ_AVAILABLE = False
+
+INDEX_STRATEGIES = ("scan", "length")
+DEFAULT_API_LATENCY = 1.0
+DEFAULT_AGREE = 80
+
+
+def copy_database(path):
+    """Veritabanını belleğe kopyalar (backup API): Değerlendirme kaynak dosyaya dokunmaz."""
+    source = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    try:
+        memory = sqlite3.connect(":memory:")
+        source.backup(memory)
+        return memory
+    finally:
+        source.close()
+
+
+def load_activations(path):
+    """Aktivasyon kaydı: [{ts, text, style, tier}, ...] (bozuk satırlar atlanır)."""
+    activations = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if isinstance(record, dict) and record.get("text") and record.get("ts") is not None:
+                activations.append(record)
+    activations.sort(key=lambda record: record["ts"])
+    return activations
+
+
+def api_latency_from_usage(conn):
+    """usage_log'daki medyan çeviri süresi (sn); kayıt yoksa None."""
+    try:
+        rows = conn.execute("SELECT duration_ms FROM usage_log WHERE kind = 'translate' AND duration_ms IS NOT NULL").fetchall()
+    except sqlite3.Error:
+        return None
+    return statistics.median(row[0] for row in rows) / 1000 if rows else None
+
+
+def _epoch(timestamp):
+    try:
+        return calendar.timegm(time.strptime(timestamp, "%Y-%m-%d %H:%M:%S"))
+    except (TypeError, ValueError):
+        return 0
+
+
+class StyleIndex:
+    """Tek stilin kayıtları: Zamana göre (scan) ve uzunluğa göre (length) sıralı görünümler."""
+
+    def __init__(self, rows):
+        rows.sort(key=lambda row: row[0])
+        self.times = [row[0] for row in rows]
+        self.keys = [row[1] for row in rows]
+        self.translations = [row[2] for row in rows]
+        self.first_seen = {}
+        self.reference = {}  # Anahtarın en son (API'den gelen) çevirisi
+        for when, key, translation in rows:
+            self.first_seen.setdefault(key, when)
+            self.reference[key] = translation
+        self.by_length = sorted(range(len(rows)), key=lambda i: len(self.keys[i]))
+        self.lengths = [len(self.keys[i]) for i in self.by_length]
+
+    def candidates(self, ts, strategy, length=0, threshold=0):
+        """ts anından önce eklenmiş kayıtlar: (anahtarlar, satır indeksleri)."""
+        if strategy == "scan":
+            count = bisect.bisect_left(self.times, ts)
+            return self.keys[:count], range(count)
+        # Uzunluk penceresi: ratio için kayıpsız üst sınır 200*min/(a+b) >= eşik
+        lo = length * threshold / (200 - threshold) if threshold < 200 else 0
+        hi = length * (200 - threshold) / threshold if threshold > 0 else float("inf")
+        window = self.by_length[bisect.bisect_left(self.lengths, lo):bisect.bisect_right(self.lengths, hi)]
+        rows = [i for i in window if self.times[i] < ts]
+        return [self.keys[i] for i in rows], rows
+
+
+def load_history(conn):
+    by_style = {}
+    for style, text, norm_key, translation, timestamp in conn.execute(
+            "SELECT style, original_text, norm_key, translation, timestamp FROM history"):
+        key = norm_key or normalize_key(text)
+        if key:
+            by_style.setdefault(style, []).append((_epoch(timestamp), key, translation))
+    return {style: StyleIndex(rows) for style, rows in by_style.items()}
+
+
+def evaluate(activations, history, scorer="ratio", threshold=DEFAULT_FUZZY_THRESHOLD, strategy="scan",
+             api_latency=DEFAULT_API_LATENCY, agree=DEFAULT_AGREE):
+    scorer_fn = getattr(fuzz, scorer)
+    counts = Counter()
+    costs = []
+    for activation in activations:
+        key = normalize_key(activation["text"])
+        index = history.get(activation.get("style") or "Academic")
+        ts = int(activation["ts"])  # history.timestamp saniye çözünürlüklü: Aynı saniyedeki kayıtlar sayılmaz
+        counts["activations"] += 1
+        if index is None or not key:
+            continue
+        first = index.first_seen.get(key)
+        if first is not None and first < ts:
+            counts["cached"] += 1  # Tam / kanonik eşleşme: Eşikten bağımsız
+            continue
+
+        started = time.perf_counter()
+        keys, rows = index.candidates(ts, strategy, len(key), threshold)
+        match = process.extractOne(key, keys, scorer=scorer_fn, score_cutoff=threshold) if keys else None
+        costs.append((time.perf_counter() - started) * 1000)
+        if match is None:
+            continue
+        counts["fuzzy"] += 1
+        reference = index.reference.get(key)
+        if reference is not None:
+            counts["judged"] += 1
+            if fuzz.ratio(index.translations[rows[match[2]]], reference) < agree:
+                counts["wrong"] += 1
+
+    total = counts["activations"]
+    costs.sort()
+    return {
+        "scorer": scorer, "threshold": threshold, "index": strategy,
+        "activations": total,
+        "hit_rate": round((counts["cached"] + counts["fuzzy"]) / total, 4) if total else 0.0,
+        "cached": counts["cached"], "fuzzy": counts["fuzzy"],
+        "api_calls": total - counts["cached"] - counts["fuzzy"],
+        "saved_calls": counts["fuzzy"],
+        "saved_s": round(counts["fuzzy"] * api_latency, 2),
+        "judged": counts["judged"], "wrong": counts["wrong"],
+        "lookup_ms": round(statistics.fmean(costs), 3) if costs else 0.0,
+        "lookup_p95_ms": round(costs[min(len(costs) - 1, int(len(costs) * 0.95))], 3) if costs else 0.0,
+    }
+
+
+COLUMNS = ("scorer", "threshold", "index", "hit_rate", "fuzzy", "saved_calls", "saved_s",
+           "judged", "wrong", "lookup_ms", "lookup_p95_ms")
+
+
+def format_table(reports):
+    rows = [[str(report[column]) for column in COLUMNS] for report in reports]
+    widths = [max([len(column)] + [len(row[i]) for row in rows]) for i, column in enumerate(COLUMNS)]
+    lines = [COLUMNS] + rows
+    return "\n".join("  ".join(value.ljust(width) for value, width in zip(line, widths)).rstrip() for line in lines)
+
+
+def _split(value):
+    return [item.strip() for item in value.split(",") if item.strip()]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Fuzzy eşleşme ayarlarını kaydedilmiş aktivasyonlarla karşılaştır")
+    parser.add_argument("activations", help="MYTRANSLATOR_ACTIVATION_LOG dosyası (JSON-lines)")
+    parser.add_argument("--db", default="mytranslator.db", help="Kopyası üzerinde çalışılacak veritabanı")
+    parser.add_argument("--scorers", default="ratio,token_set_ratio,WRatio", help=f"Virgülle: {', '.join(FUZZY_SCORERS)}")
+    parser.add_argument("--thresholds", default="80,85,90,95")
+    parser.add_argument("--index", default="scan", help=f"Virgülle: {', '.join(INDEX_STRATEGIES)}")
+    parser.add_argument("--api-latency", type=float, help="API çağrısı başına süre (sn); varsayılan: usage_log medyanı")
+    parser.add_argument("--agree", type=float, default=DEFAULT_AGREE, help="Bu benzerliğin altındaki fuzzy isabetler 'yanlış'")
+    parser.add_argument("--json", action="store_true", help="Her ayar için bir JSON satırı")
+    args = parser.parse_args(argv)
+
+    if not RAPIDFUZZ_AVAILABLE:
+        print("RapidFuzz gerekli (pip install rapidfuzz).", file=sys.stderr)
+        return 1
+    scorers, strategies = _split(args.scorers), _split(args.index)
+    invalid = [name for name in scorers if name not in FUZZY_SCORERS] + [s for s in strategies if s not in INDEX_STRATEGIES]
+    if invalid:
+        print(f"Geçersiz seçenek: {', '.join(invalid)}", file=sys.stderr)
+        return 2
+    try:
+        thresholds = [float(value) for value in _split(args.thresholds)]
+        activations = load_activations(args.activations)
+        conn = copy_database(args.db)
+    except (OSError, ValueError, sqlite3.Error) as e:
+        print(f"Hata: {e}", file=sys.stderr)
+        return 1
+
+    try:
+        history = load_history(conn)
+        api_latency = args.api_latency or api_latency_from_usage(conn) or DEFAULT_API_LATENCY
+    finally:
+        conn.close()
+
+    reports = [evaluate(activations, history, scorer, threshold, strategy, api_latency, args.agree)
+               for scorer in scorers for threshold in thresholds for strategy in strategies]
+    if args.json:
+        for report in reports:
+            print(json.dumps(report))
+        return 0
+    live = Counter(activation.get("tier", "miss") for activation in activations)
+    live_hits = len(activations) - live["miss"]
+    print(f"{len(activations)} aktivasyon, kayıttaki isabet oranı: {live_hits / len(activations) if activations else 0:.2%} "
+          f"({dict(live)}), API süresi: {api_latency:.2f} sn")
+    print(format_table(reports))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
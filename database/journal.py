@@ -0,0 +1,152 @@
+import uuid
+import logging
+import threading
+from collections import Counter
+
+from database.write_behind import WriteBehindBuffer
+
+logger = logging.getLogger(__name__)
+
+
+class JournalEntry:
+    """Tek bir işin yazıcısı: append() parçaları sırayla, finish() işi kapatır."""
+
+    def __init__(self, journal, job_id, seq=0):
+        self.journal = journal
+        self.id = job_id
+        self.seq = seq
+
+    def append(self, chunk):
+        self.journal._writer.add(("chunk", self.id, self.seq, chunk))
+        self.seq += 1
+
+    def finish(self):
+        self.journal.discard(self.id)
+
+
+class JobJournal:
+    """
+    İŞ GÜNLÜĞÜ (Crash-safe, append-only)
+    Devam eden stream işleri ve gelen parçaları aynı SQLite (WAL) dosyasındaki
+    job_journal / job_chunks tablolarına write-behind ile toplu yazılır. Biten işin
+    kayıtları silinir (günlük kendini sıkıştırır); flush aralığından kısa süren bir iş
+    diske hiç dokunmaz. Uygulama çökerse yarım işler incomplete() ile geri okunur.
+    """
+
+    def __init__(self, db, interval=0.5):
+        self.db = db
+        self._writer = WriteBehindBuffer(self._flush, interval=interval, max_batch=500, name="JobJournal")
+        self._claimed = set()  # Şu an bir stream'in devam ettirdiği işler
+        self._lock = threading.Lock()
+        # Açık işlerin (kind, metin, stil) anahtarları: Sıcak yolda günlüğe sadece gerekince bakılır
+        self._open = None
+        self._open_keys = Counter()
+
+    def _load_open(self):
+        if self._open is not None:
+            return
+        self._open = {}
+        conn = self.db.connect()
+        try:
+            for job_id, kind, text, style in conn.execute('SELECT id, kind, source_text, style FROM job_journal'):
+                self._track(job_id, (kind, text, style))
+        except Exception as e:
+            logger.error(f"Journal Read Error: {e}")
+        finally:
+            conn.close()
+
+    def _track(self, job_id, key):
+        self._open[job_id] = key
+        self._open_keys[key] += 1
+
+    def has_incomplete(self, kind, source_text, style):
+        with self._lock:
+            self._load_open()
+            return self._open_keys[(kind, source_text, style)] > 0
+
+    def begin(self, kind, source_text, style="Academic", model=None, prompt_hash=None):
+        job_id = uuid.uuid4().hex
+        with self._lock:
+            self._load_open()
+            self._track(job_id, (kind, source_text, style))
+            self._claimed.add(job_id)
+        self._writer.add(("begin", job_id, kind, source_text, style, model, prompt_hash))
+        return JournalEntry(self, job_id)
+
+    def claim(self, job):
+        """Yarım işi devam ettirmek için sahiplenir; başka bir stream zaten sürdürüyorsa None."""
+        with self._lock:
+            if job["id"] in self._claimed:
+                return None
+            self._claimed.add(job["id"])
+        return JournalEntry(self, job["id"], job["chunks"])
+
+    def release(self, job_id):
+        with self._lock:
+            self._claimed.discard(job_id)
+
+    def stop(self):
+        self._writer.stop()
+
+    def _flush(self, items):
+        done = {item[1] for item in items if item[0] == "done"}
+        begins = [item[1:] for item in items if item[0] == "begin" and item[1] not in done]
+        chunks = [item[1:] for item in items if item[0] == "chunk" and item[1] not in done]
+        conn = self.db.connect()
+        try:
+            with conn:
+                conn.executemany('INSERT OR IGNORE INTO job_journal (id, kind, source_text, style, model, prompt_hash) '
+                                 'VALUES (?, ?, ?, ?, ?, ?)', begins)
+                conn.executemany('INSERT OR REPLACE INTO job_chunks (job_id, seq, text) VALUES (?, ?, ?)', chunks)
+                conn.executemany('DELETE FROM job_chunks WHERE job_id = ?', [(job_id,) for job_id in done])
+                conn.executemany('DELETE FROM job_journal WHERE id = ?', [(job_id,) for job_id in done])
+            return True
+        except Exception as e:
+            logger.error(f"Journal Flush Error: {e}")
+            return False
+        finally:
+            conn.close()
+
+    def incomplete(self, kind=None, source_text=None, style=None):
+        """Yarım kalmış işler: [{id, kind, source_text, style, model, prompt_hash, attempts, partial, chunks}]"""
+        self._writer.flush()
+        conn = self.db.connect()
+        try:
+            query = 'SELECT id, kind, source_text, style, model, prompt_hash, attempts FROM job_journal WHERE 1=1'
+            params = []
+            for column, value in (("kind", kind), ("source_text", source_text), ("style", style)):
+                if value is not None:
+                    query += f' AND {column} = ?'
+                    params.append(value)
+            jobs = []
+            for row in conn.execute(query + ' ORDER BY started', params).fetchall():
+                parts = [text for (text,) in conn.execute('SELECT text FROM job_chunks WHERE job_id = ? ORDER BY seq', (row[0],))]
+                jobs.append({"id": row[0], "kind": row[1], "source_text": row[2], "style": row[3], "model": row[4],
+                             "prompt_hash": row[5], "attempts": row[6], "partial": "".join(parts), "chunks": len(parts)})
+            return jobs
+        except Exception as e:
+            logger.error(f"Journal Read Error: {e}")
+            return []
+        finally:
+            conn.close()
+
+    def record_attempt(self, job_id):
+        conn = self.db.connect()
+        try:
+            with conn:
+                conn.execute('UPDATE job_journal SET attempts = attempts + 1 WHERE id = ?', (job_id,))
+        except Exception as e:
+            logger.error(f"Journal Update Error: {e}")
+        finally:
+            conn.close()
+
+    def discard(self, job_id):
+        """İşi kapatır: Kayıtları bir sonraki flush'ta silinir."""
+        self._writer.add(("done", job_id))
+        with self._lock:
+            self._claimed.discard(job_id)
+            key = self._open.pop(job_id, None) if self._open is not None else None
+            if key is not None:
+                self._open_keys[key] -= 1
+                if self._open_keys[key] <= 0:
+                    del self._open_keys[key]
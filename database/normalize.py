@@ -0,0 +1,45 @@
+import re
+import unicodedata
+
+# Akıllı tırnaklar, kesme işaretleri ve tire çeşitleri -> ASCII karşılıkları
+PUNCT_MAP = str.maketrans({
+    "‘": "'", "’": "'", "‚": "'", "‛": "'", "′": "'",
+    "“": '"', "”": '"', "„": '"', "‟": '"', "″": '"',
+    "«": '"', "»": '"',
+    "‐": "-", "‑": "-", "‒": "-", "–": "-", "—": "-", "―": "-", "−": "-",
+    "­": None,  # Yumuşak tire (PDF kopyalarında sık)
+    "İ": "i",   # casefold() 'İ'yi 'i' + birleşik nokta yapar
+})
+
+# Atıflar: [12], [3, 7], [4-9], (Smith et al., 2020), (Yılmaz, 2019a)
+RE_NUMERIC_CITATION = re.compile(r'\[\s*\d+(?:\s*[,;-]\s*\d+)*\s*\]')
+# Yazar-yıl atfı yazar şeklinde olmalı: "(founded in 1998)", "(see Table 2, 2019)" atıf değildir
+_AUTHOR = r"[A-ZÇĞÖŞÜ][\w'-]+"
+_CITE = (rf"{_AUTHOR}(?:\s+et\s+al\.?,?|(?:\s+(?:and|&|ve)\s+{_AUTHOR})?,)"
+         r"\s*(?:1[89]|20)\d{2}[a-z]?")
+RE_AUTHOR_CITATION = re.compile(rf"\(\s*{_CITE}(?:\s*;\s*{_CITE})*\s*\)")
+RE_COMBINING = re.compile(r'[\u0300-\u036f]')
+# Yalnızca cümle noktalaması, tırnak ve ayraç düşer. Rakamlar arasındaki nokta/virgül (0.05, 1,000)
+# ve sayı önündeki eksi (-5) korunur; tire yalnızca kelime ardında ya da sayıdan önce değilse düşer.
+RE_PUNCTUATION = re.compile(r'''(?<!\d)[.,]|[.,](?!\d)|-(?!\d)|(?<=\w)-|[;:!?"'()\[\]{}…_]''')
+# Anlam taşıyan semboller (%$+<>=±/#& ...) ayrı belirteç olarak kalır: "p<0.05" ve "p < 0.05" eşleşir,
+# "p > 0.05", "5$" veya "C" ile eşleşmez.
+RE_SYMBOL = re.compile(r'[^\w\s.,-]')
+RE_SPACES = re.compile(r'\s+')
+
+
+def normalize_key(text):
+    """
+    Çeviri belleği için kanonik anahtar: Unicode NFKC, tırnak/tire birleştirme,
+    atıfların silinmesi, casefold ve noktalama temizliği.
+    "The “Results” — see [12]." ve "the results - see" aynı anahtarı üretir;
+    "p < 0.05" / "p > 0.05", "5%" / "5$", "C++" / "C" ise farklı kalır.
+    """
+    if not text: return ""
+    text = unicodedata.normalize("NFKC", text).translate(PUNCT_MAP)
+    text = RE_NUMERIC_CITATION.sub(" ", text)
+    text = RE_AUTHOR_CITATION.sub(" ", text)
+    text = RE_COMBINING.sub("", text.casefold())
+    text = RE_PUNCTUATION.sub(" ", text)
+    text = RE_SYMBOL.sub(r" \g<0> ", text)
+    return RE_SPACES.sub(" ", text).strip()
@@ -0,0 +1,214 @@
+import os
+import zlib
+import logging
+import threading
+
+from database.normalize import normalize_key
+
+logger = logging.getLogger(__name__)
+
+# --- OPSİYONEL BAĞIMLILIK: NumPy ---
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    np = None
+    NUMPY_AVAILABLE = False
+
+SEARCH_CHUNK_ROWS = 16384  # Matris bu kadar satırlık parçalarla taranır (geçici bellek ~16MB)
+BITS_CHUNK_ROWS = 131072   # Hamming ön filtresi parça boyu (32 byte/satır)
+FLUSH_PENDING = 1024       # Bu kadar yeni vektör birikince dosyaya eklenir
+# Büyük dizinlerde önce işaret bitleri (Hamming) ile aday seçilir, sonra int8 nokta çarpımı
+PREFILTER_MIN_ROWS = 50000
+PREFILTER_CANDIDATES = 256
+HAS_BITCOUNT = NUMPY_AVAILABLE and hasattr(np, "bitwise_count")  # NumPy >= 2.0
+
+
+class HashingVectorizer:
+    """
+    Model gerektirmeyen yerel gömme: Kanonik metnin karakter n-gram'ları
+    'dim' boyutlu vektöre hash'lenir (işaretli), L2 normalize edilip int8'e sıkıştırılır.
+    Kelime sırası değişen veya birkaç kelimesi farklı cümleler yakın vektör üretir.
+    """
+
+    def __init__(self, dim=256, ngrams=(3, 4)):
+        self.dim = dim
+        self.ngrams = ngrams
+
+    def vector(self, text):
+        key = normalize_key(text)
+        vec = np.zeros(self.dim, dtype=np.float32)
+        if not key:
+            return vec.astype(np.int8)
+        for word in key.split():
+            padded = f" {word} "
+            for n in self.ngrams:
+                for i in range(max(1, len(padded) - n + 1)):
+                    h = zlib.crc32(padded[i:i + n].encode("utf-8"))
+                    vec[h % self.dim] += 1.0 if h & 0x80000000 else -1.0
+        norm = np.linalg.norm(vec)
+        if norm:
+            vec /= norm
+        return np.round(vec * 127).astype(np.int8)
+
+
+class SemanticIndex:
+    """
+    ANLAMSAL ÇEVİRİ BELLEĞİ (Opsiyonel)
+    history satırı başına int8 vektör; tek parça, memory-mapped dosyalarda tutulur:
+      <db>.sem<dim>       -> (n, dim) int8 matris
+      <db>.sem<dim>.bits  -> (n, dim/64) uint64 işaret bitleri (ANN ön filtresi)
+      <db>.sem<dim>.ids   -> (n,) int64 history.id
+    Arama: Küçük dizinde parça parça nokta çarpımı; büyük dizinde önce Hamming
+    mesafesiyle aday seçimi, sonra adaylar üzerinde tam skor. Silinen kayıtlar aramada
+    veritabanında bulunamayınca atlanır; yeni kayıtlar catch_up() ile id sırasıyla eklenir.
+    """
+
+    def __init__(self, base_path, dim=256):
+        self.vectorizer = HashingVectorizer(dim)
+        self.dim = dim
+        self.words = dim // 64
+        self.vec_path = f"{base_path}.sem{dim}"
+        self.bits_path = self.vec_path + ".bits"
+        self.ids_path = self.vec_path + ".ids"
+        self._lock = threading.Lock()
+        self._pending_vecs = []
+        self._pending_ids = []
+        self._load()
+
+    def _files(self):
+        # (yol, satır başına byte)
+        return ((self.vec_path, self.dim), (self.bits_path, self.words * 8), (self.ids_path, 8))
+
+    def _stored_rows(self):
+        # Yarım kalmış yazımlara dayanıklı: Dosyaların tutarlı ortak kısmı kullanılır
+        if not all(os.path.exists(path) for path, _ in self._files()):
+            return 0
+        return min(os.path.getsize(path) // width for path, width in self._files())
+
+    def _load(self):
+        rows = self._stored_rows()
+        if rows:
+            self._matrix = np.memmap(self.vec_path, dtype=np.int8, mode="r", shape=(rows, self.dim))
+            self._bits = np.memmap(self.bits_path, dtype=np.uint64, mode="r", shape=(rows, self.words))
+            self._ids = np.memmap(self.ids_path, dtype=np.int64, mode="r", shape=(rows,))
+        else:
+            self._matrix = np.zeros((0, self.dim), dtype=np.int8)
+            self._bits = np.zeros((0, self.words), dtype=np.uint64)
+            self._ids = np.zeros(0, dtype=np.int64)
+        self._rows = rows
+
+    def _sign_bits(self, vectors):
+        return np.packbits(vectors > 0, axis=-1).view(np.uint64)
+
+    def __len__(self):
+        return self._rows + len(self._pending_ids)
+
+    @property
+    def last_id(self):
+        with self._lock:
+            if self._pending_ids:
+                return self._pending_ids[-1]
+            return int(self._ids[-1]) if self._rows else 0
+
+    def add(self, row_id, text):
+        with self._lock:
+            self._pending_vecs.append(self.vectorizer.vector(text))
+            self._pending_ids.append(int(row_id))
+            if len(self._pending_ids) >= FLUSH_PENDING:
+                self._flush_locked()
+
+    def flush(self):
+        with self._lock:
+            self._flush_locked()
+
+    def _flush_locked(self):
+        if not self._pending_ids:
+            return
+        count = self._stored_rows()
+        vectors = np.stack(self._pending_vecs)
+        payloads = (vectors.tobytes(), self._sign_bits(vectors).tobytes(),
+                    np.asarray(self._pending_ids, dtype=np.int64).tobytes())
+        for (path, width), payload in zip(self._files(), payloads):
+            with open(path, "r+b" if os.path.exists(path) else "wb") as f:
+                f.truncate(count * width)  # Tutarsız kuyruk varsa kesilir
+                f.seek(0, os.SEEK_END)
+                f.write(payload)
+        self._pending_vecs = []
+        self._pending_ids = []
+        self._load()
+
+    def catch_up(self, conn, batch_size=5000):
+        """Dizinde olmayan (id > last_id) history satırlarını ekler. Eklenen sayısını döndürür."""
+        added = 0
+        while True:
+            rows = conn.execute('SELECT id, original_text FROM history WHERE id > ? ORDER BY id LIMIT ?',
+                                (self.last_id, batch_size)).fetchall()
+            if not rows:
+                break
+            for row_id, text in rows:
+                self.add(row_id, text)
+            added += len(rows)
+        if added > FLUSH_PENDING:
+            self.flush()
+            logger.info(f"🧭 [Semantic] {added} kayıt dizine eklendi.")
+        return added
+
+    def reset(self):
+        with self._lock:
+            self._matrix = self._bits = self._ids = None
+            for path, _ in self._files():
+                if os.path.exists(path):
+                    os.remove(path)
+            self._pending_vecs = []
+            self._pending_ids = []
+            self._load()
+
+    def search(self, text, k=20, min_score=0.5):
+        """En benzer 'k' kaydın [(history.id, kosinüs), ...] listesi (büyükten küçüğe)."""
+        vector = self.vectorizer.vector(text)
+        query = vector.astype(np.float32) / 127.0
+        if not query.any():
+            return []
+        best_ids = []
+        best_scores = []
+        with self._lock:
+            if HAS_BITCOUNT and self._rows >= PREFILTER_MIN_ROWS:
+                # ANN: Hamming ile aday satırlar, sonra sadece onlar üzerinde tam skor
+                candidates = self._prefilter(self._sign_bits(vector), max(k, PREFILTER_CANDIDATES))
+                blocks = [(self._matrix[candidates], self._ids[candidates])]
+            else:
+                blocks = [(self._matrix, self._ids)]
+            if self._pending_ids:
+                blocks.append((np.stack(self._pending_vecs), np.asarray(self._pending_ids, dtype=np.int64)))
+            for matrix, ids in blocks:
+                for start in range(0, len(ids), SEARCH_CHUNK_ROWS):
+                    chunk = np.asarray(matrix[start:start + SEARCH_CHUNK_ROWS], dtype=np.float32)
+                    scores = chunk @ query / 127.0
+                    take = min(k, len(scores))
+                    top = np.argpartition(-scores, take - 1)[:take]
+                    best_scores.append(scores[top])
+                    best_ids.append(np.asarray(ids[start:start + SEARCH_CHUNK_ROWS])[top])
+        if not best_ids:
+            return []
+        return self._top(best_ids, best_scores, k, min_score)
+
+    def _prefilter(self, query_bits, count):
+        rows = []
+        distances = []
+        for start in range(0, self._rows, BITS_CHUNK_ROWS):
+            distance = np.bitwise_count(self._bits[start:start + BITS_CHUNK_ROWS] ^ query_bits).sum(axis=1, dtype=np.uint16)
+            take = min(count, len(distance))
+            top = np.argpartition(distance, take - 1)[:take]
+            rows.append(top + start)
+            distances.append(distance[top])
+        rows = np.concatenate(rows)
+        order = np.argsort(np.concatenate(distances), kind="stable")[:count]
+        return np.sort(rows[order])  # Sıralı indeks: memmap'ten ardışık okuma
+
+    @staticmethod
+    def _top(best_ids, best_scores, k, min_score):
+        scores = np.concatenate(best_scores)
+        ids = np.concatenate(best_ids)
+        order = np.argsort(-scores)[:k]
+        return [(int(ids[i]), float(scores[i])) for i in order if scores[i] >= min_score]
@@ -0,0 +1,419 @@
+import os
+import json
+import mmap
+import uuid
+import bisect
+import heapq
+import logging
+import threading
+from array import array
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: Süreçler arası kilit yok (tek süreç varsayılır)
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_VERSION = 1
+# Kayıt başına int64 alanlar (<db>.snap.idx)
+FIELDS = 8
+F_ID, F_STYLE, F_OFFSET, F_ORIGINAL, F_TRANSLATION, F_KEY_OFFSET, F_KEY, F_LIVE = range(FIELDS)
+REBUILD_BATCH = 5000
+# Fuzzy tarama bu kadar satırlık parçalarla yapılır (parça başına tek decode + split)
+SCAN_CHUNK_ROWS = 8192
+# Değişen/silinen kayıt oranı veya sıra dışı kuyruk bu sınırları aşarsa snapshot baştan yazılır
+REBUILD_DEAD_RATIO = 0.25
+MAX_TAIL_ROWS = 65536
+
+
+def _write_at(path, offset, data):
+    with open(path, "r+b" if os.path.exists(path) else "w+b") as f:
+        f.seek(offset)
+        f.write(data)
+        f.truncate()
+
+
+def _match_key(key, original):
+    # Anahtarlar satır sonuyla ayrılır: normalize_key boşlukları zaten tek boşluğa indirir
+    return key or " ".join((original or "").split())
+
+
+class HistorySnapshot:
+    """
+    OKUMA İÇİN OPTİMİZE GEÇMİŞ/TM SNAPSHOT'I
+    history tablosunun metin kolonları diske yazılır ve memory-mapped okunur:
+      <db>.snap       -> kaynak + çeviri metinleri (UTF-8, art arda)
+      <db>.snap.keys  -> eşleşme anahtarları (UTF-8, satır başına bir tane; parça parça taranır)
+      <db>.snap.idx   -> kayıt başına sabit genişlikli int64 ofset/uzunluk dizisi
+      <db>.snap.meta  -> satır sayısı, son id, uygulanan son değişiklik (JSON)
+    Okuyucular satır başına dict/str tutmadan kayıtları dilimler.
+
+    Güncelleme artımlıdır: Yeni satırlar (id > last_id) sona eklenir, history_changes
+    tablosundaki (UPDATE/DELETE tetikleyicileri) değişiklikler eski kaydı ölü işaretleyip
+    güncel halini sona ekler. Ölü/sıra dışı kayıtlar çoğalınca dosyalar baştan yazılır.
+    Aynı veritabanı için süreç içinde tek örnek kullanılır: HistorySnapshot.open(db_path).
+    Birden çok süreç (GUI + daemon / documents CLI) aynı dosyaları paylaşabilir: Güncellemeler
+    <db>.snap.lock üzerinde flock ile sıralanır ve kilit altında diskteki meta yeniden okunur.
+    """
+
+    _instances = {}
+    _instances_lock = threading.Lock()
+
+    @classmethod
+    def open(cls, db_path):
+        with cls._instances_lock:
+            if db_path not in cls._instances:
+                cls._instances[db_path] = cls(db_path)
+            return cls._instances[db_path]
+
+    def __init__(self, db_path):
+        self.blob_path = db_path + ".snap"
+        self.keys_path = self.blob_path + ".keys"
+        self.idx_path = self.blob_path + ".idx"
+        self.meta_path = self.blob_path + ".meta"
+        self.lock_path = self.blob_path + ".lock"
+        self._lock = threading.RLock()
+        self._lock_depth = 0
+        self._meta_stat = None
+        with self._exclusive():
+            self._load()
+
+    @contextmanager
+    def _exclusive(self):
+        """Thread + süreç kilidi (iç içe çağrılabilir: refresh -> rebuild)."""
+        with self._lock:
+            if fcntl is None or self._lock_depth:
+                self._lock_depth += 1
+                try:
+                    yield
+                finally:
+                    self._lock_depth -= 1
+                return
+            with open(self.lock_path, "a+b") as f:
+                fcntl.flock(f, fcntl.LOCK_EX)
+                self._lock_depth += 1
+                try:
+                    yield
+                finally:
+                    self._lock_depth -= 1
+                    fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _stat_meta(self):
+        try:
+            st = os.stat(self.meta_path)
+            return st.st_ino, st.st_size, st.st_mtime_ns
+        except OSError:
+            return None
+
+    def _sync(self):
+        """Kilit altında: Başka bir süreç meta'yı değiştirdiyse onun durumu yüklenir."""
+        if self._stat_meta() != self._meta_stat:
+            self._load()
+
+    # --- Dosya durumu ---
+
+    def _sizes(self):
+        # (dosya, meta'ya göre beklenen boyut)
+        meta = self.meta
+        return ((self.blob_path, meta["blob_bytes"]), (self.keys_path, meta["key_bytes"]),
+                (self.idx_path, meta["rows"] * FIELDS * 8))
+
+    def _empty_state(self):
+        self.meta = {"version": SNAPSHOT_VERSION, "token": None, "rows": 0, "sorted_rows": 0, "dead": 0,
+                     "blob_bytes": 0, "key_bytes": 0, "last_id": 0, "last_seq": 0, "styles": []}
+
+    def _load(self):
+        self._empty_state()
+        try:
+            with open(self.meta_path, encoding="utf-8") as f:
+                meta = json.load(f)
+            if meta.get("version") == SNAPSHOT_VERSION:
+                self.meta = meta
+                if any(os.path.getsize(path) < size for path, size in self._sizes()):
+                    self._empty_state()
+        except (OSError, ValueError, KeyError):
+            self._empty_state()
+        self._meta_stat = self._stat_meta()
+        self._map()
+
+    @staticmethod
+    def _mmap(path, size, access=mmap.ACCESS_READ):
+        if not size:
+            return memoryview(b"")
+        with open(path, "r+b") as f:
+            return memoryview(mmap.mmap(f.fileno(), size, access=access))
+
+    def _map(self):
+        # Yarım kalmış eklemeler (meta yazılmadan önceki çökme) kesilir
+        for path, size in self._sizes():
+            if os.path.exists(path) and os.path.getsize(path) > size:
+                with open(path, "r+b") as f:
+                    f.truncate(size)
+        # Eski mmap'ler kapatılmaz: Onlara sabitlenmiş okuyucular işini bitirene kadar geçerli kalır
+        meta = self.meta
+        self._blob = self._mmap(self.blob_path, meta["blob_bytes"])
+        self._keys = self._mmap(self.keys_path, meta["key_bytes"])
+        if meta["rows"]:
+            # Yazılabilir: Değişen kayıtlar yerinde ölü işaretlenir
+            self._idx = self._mmap(self.idx_path, meta["rows"] * FIELDS * 8, mmap.ACCESS_WRITE).cast("q")
+        else:
+            self._idx = memoryview(array("q"))
+        self._styles = list(meta["styles"])
+        self._style_codes = {style: code for code, style in enumerate(self._styles)}
+        # Sıralı önek ikili aramayla, sona eklenen güncellemeler bu sözlükle bulunur
+        self._tail = {}
+        for pos in range(meta["sorted_rows"], meta["rows"]):
+            if self._idx[pos * FIELDS + F_LIVE]:
+                self._tail[self._idx[pos * FIELDS + F_ID]] = pos
+
+    def _write_meta(self):
+        tmp = self.meta_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.meta, f)
+        os.replace(tmp, self.meta_path)
+        self._meta_stat = self._stat_meta()
+
+    def __len__(self):
+        return self.meta["rows"]
+
+    @property
+    def live_rows(self):
+        return self.meta["rows"] - self.meta["dead"]
+
+    # --- Güncelleme ---
+
+    def refresh(self, conn):
+        """Snapshot'ı veritabanıyla eşitler (gerekirse baştan yazar). Eklenen kayıt sayısını döndürür."""
+        with self._exclusive():
+            self._sync()
+            token, max_seq, max_id = conn.execute('''
+                SELECT (SELECT token FROM history_snapshot),
+                       (SELECT COALESCE(MAX(seq), 0) FROM history_changes),
+                       (SELECT COALESCE(MAX(id), 0) FROM history)
+            ''').fetchone()
+            meta = self.meta
+            # Farklı/yeniden oluşturulmuş veritabanı veya kayıp değişiklik kaydı
+            if token is None or token != meta["token"] or max_seq < meta["last_seq"]:
+                return self.rebuild(conn)
+            if max_seq == meta["last_seq"] and max_id == meta["last_id"]:
+                return 0
+            changed = [row[0] for row in conn.execute(
+                'SELECT DISTINCT row_id FROM history_changes WHERE seq > ? AND row_id <= ?',
+                (meta["last_seq"], meta["last_id"]))]
+            if meta["dead"] + len(changed) > max(1000, meta["rows"] * REBUILD_DEAD_RATIO) or \
+                    meta["rows"] - meta["sorted_rows"] + len(changed) > MAX_TAIL_ROWS:
+                return self.rebuild(conn)
+
+            for row_id in changed:
+                pos = self.position(row_id)
+                if pos is not None:
+                    self._idx[pos * FIELDS + F_LIVE] = 0
+                    self._tail.pop(row_id, None)
+                    meta["dead"] += 1
+            appended = 0
+            for start in range(0, len(changed), 500):
+                ids = changed[start:start + 500]
+                rows = conn.execute(f'SELECT id, style, original_text, translation, norm_key FROM history '
+                                    f'WHERE id IN ({",".join("?" * len(ids))}) ORDER BY id', ids).fetchall()
+                appended += self._append(rows, in_order=False)
+            cursor = conn.execute('SELECT id, style, original_text, translation, norm_key FROM history '
+                                  'WHERE id > ? ORDER BY id', (meta["last_id"],))
+            while True:
+                rows = cursor.fetchmany(REBUILD_BATCH)
+                if not rows:
+                    break
+                appended += self._append(rows, in_order=True)
+            meta["last_seq"] = max_seq
+            self._write_meta()
+            self._map()
+            return appended
+
+    def _append(self, rows, in_order, suffix=""):
+        if not rows:
+            return 0
+        meta = self.meta
+        records = array("q")
+        texts = []
+        keys = []
+        offset = meta["blob_bytes"]
+        key_offset = meta["key_bytes"]
+        for row_id, style, original, translation, key in rows:
+            key = (_match_key(key, original) + "\n").encode("utf-8")
+            original = (original or "").encode("utf-8")
+            translation = (translation or "").encode("utf-8")
+            records.extend((row_id, self._style_code(style), offset, len(original), len(translation),
+                            key_offset, len(key) - 1, 1))
+            texts.extend((original, translation))
+            keys.append(key)
+            offset += len(original) + len(translation)
+            key_offset += len(key)
+        # Dosya sonuna değil meta'daki ofsetlere yazılır: Meta'ya girmemiş artıklar ezilir
+        _write_at(self.blob_path + suffix, meta["blob_bytes"], b"".join(texts))
+        _write_at(self.keys_path + suffix, meta["key_bytes"], b"".join(keys))
+        _write_at(self.idx_path + suffix, meta["rows"] * FIELDS * 8, records.tobytes())
+        # Sadece id sırasıyla gelen yeni satırlar sıralı öneki uzatır
+        if in_order:
+            if meta["sorted_rows"] == meta["rows"]:
+                meta["sorted_rows"] += len(rows)
+            meta["last_id"] = max(meta["last_id"], rows[-1][0])
+        meta["rows"] += len(rows)
+        meta["blob_bytes"] = offset
+        meta["key_bytes"] = key_offset
+        return len(rows)
+
+    def _style_code(self, style):
+        code = self._style_codes.get(style)
+        if code is None:
+            code = self._style_codes[style] = len(self._styles)
+            self._styles.append(style)
+            self.meta["styles"] = list(self._styles)
+        return code
+
+    def rebuild(self, conn):
+        """Tüm dosyaları history'den baştan yazar. Yazılan kayıt sayısını döndürür."""
+        with self._exclusive():
+            # Önce meta silinir: Yarıda kalan yeniden yazım açılışta geçersiz sayılır
+            if os.path.exists(self.meta_path):
+                os.remove(self.meta_path)
+            max_seq = conn.execute('SELECT COALESCE(MAX(seq), 0) FROM history_changes').fetchone()[0]
+            self._empty_state()
+            self._styles = []
+            self._style_codes = {}
+            # Geçici dosyalara yazılıp yerine taşınır: Eski mmap'lere sabitlenmiş okuyucular etkilenmez
+            paths = (self.blob_path, self.keys_path, self.idx_path)
+            for path in paths:
+                open(path + ".tmp", "wb").close()
+            cursor = conn.execute('SELECT id, style, original_text, translation, norm_key FROM history ORDER BY id')
+            while True:
+                rows = cursor.fetchmany(REBUILD_BATCH)
+                if not rows:
+                    break
+                self._append(rows, in_order=True, suffix=".tmp")
+            for path in paths:
+                os.replace(path + ".tmp", path)
+            token = uuid.uuid4().hex
+            conn.execute('DELETE FROM history_snapshot')
+            conn.execute('INSERT INTO history_snapshot (token) VALUES (?)', (token,))
+            conn.commit()
+            self.meta["token"] = token
+            self.meta["last_seq"] = max_seq
+            self._write_meta()
+            self._map()
+            logger.info(f"🗂️ [Snapshot] {self.meta['rows']} kayıt yazıldı "
+                        f"({(self.meta['blob_bytes'] + self.meta['key_bytes']) / 1024:.0f}KB).")
+            return self.meta["rows"]
+
+    def reset(self):
+        with self._exclusive():
+            for path in (self.meta_path, self.idx_path, self.keys_path, self.blob_path):
+                if os.path.exists(path):
+                    os.remove(path)
+            self._load()
+
+    # --- Okuma (kopyasız dilimleme) ---
+
+    def position(self, row_id):
+        """history.id'nin canlı kaydının konumu (yoksa None)."""
+        with self._lock:
+            pos = self._tail.get(row_id)
+            if pos is not None:
+                return pos
+            idx = self._idx
+            sorted_rows = self.meta["sorted_rows"]
+            pos = bisect.bisect_left(idx[F_ID::FIELDS], row_id, 0, sorted_rows)
+            if pos < sorted_rows and idx[pos * FIELDS + F_ID] == row_id and idx[pos * FIELDS + F_LIVE]:
+                return pos
+            return None
+
+    def reader(self):
+        """O anki dosyalara sabitlenmiş okuyucu (sonraki refresh/rebuild konumları bozmaz)."""
+        with self._lock:
+            return SnapshotReader(self._idx, self._blob, self._keys, self.meta["rows"], self._styles)
+
+    def view(self, rows):
+        """(id, timestamp, hit_count, last_access) satırları için tembel HistoryView."""
+        with self._lock:
+            positions = [self.position(row[0]) for row in rows]
+            return HistoryView(self.reader(), [(pos, *row[1:]) for pos, row in zip(positions, rows) if pos is not None])
+
+
+class SnapshotReader:
+    def __init__(self, idx, blob, keys, rows, styles):
+        self._idx = idx
+        self._blob = blob
+        self._keys = keys
+        self._rows = rows
+        self._styles = list(styles)
+
+    def __len__(self):
+        return self._rows
+
+    def row_id(self, pos):
+        return self._idx[pos * FIELDS + F_ID]
+
+    def text(self, pos, field):
+        """field: F_ORIGINAL, F_TRANSLATION veya F_KEY."""
+        idx = self._idx
+        base = pos * FIELDS
+        if field == F_KEY:
+            start = idx[base + F_KEY_OFFSET]
+            return str(self._keys[start:start + idx[base + F_KEY]], "utf-8")
+        start = idx[base + F_OFFSET] + (idx[base + F_ORIGINAL] if field == F_TRANSLATION else 0)
+        return str(self._blob[start:start + idx[base + field]], "utf-8")
+
+    def record(self, pos):
+        return {
+            "id": self.row_id(pos),
+            "original_text": self.text(pos, F_ORIGINAL),
+            "translation": self.text(pos, F_TRANSLATION),
+            "style": self._styles[self._idx[pos * FIELDS + F_STYLE]],
+        }
+
+    def key_chunks(self, style):
+        """(ilk konum, anahtar listesi) parçaları; başka stil veya ölü kayıtlar None."""
+        code = self._styles.index(style) if style in self._styles else -1
+        idx = self._idx
+        for first in range(0, self._rows, SCAN_CHUNK_ROWS):
+            last = min(first + SCAN_CHUNK_ROWS, self._rows) - 1
+            start = idx[first * FIELDS + F_KEY_OFFSET]
+            end = idx[last * FIELDS + F_KEY_OFFSET] + idx[last * FIELDS + F_KEY]
+            keys = str(self._keys[start:end], "utf-8").split("\n")
+            lives = idx[first * FIELDS + F_LIVE:(last + 1) * FIELDS:FIELDS].tolist()
+            styles = idx[first * FIELDS + F_STYLE:(last + 1) * FIELDS:FIELDS].tolist()
+            yield first, [key if live and s == code else None for key, live, s in zip(keys, lives, styles)]
+
+    def extract(self, query, style, scorer, limit, score_cutoff, extractor):
+        """
+        Parça parça en iyi 'limit' eşleşme: [(skor, konum), ...] (büyükten küçüğe).
+        extractor: rapidfuzz.process.extract (bağımlılık çağırana bırakılır).
+        """
+        best = []
+        for first, keys in self.key_chunks(style):
+            for _, score, index in extractor(query, keys, scorer=scorer, limit=limit, score_cutoff=score_cutoff):
+                best.append((score, first + index))
+        return heapq.nlargest(limit, best, key=lambda c: c[0])
+
+
+class HistoryView:
+    """
+    Geçmiş penceresi için tembel liste: SQL'den yalnızca (id, tarih, kullanım) gelir,
+    metinler öğeye erişildiğinde snapshot'tan dilimlenir.
+    """
+
+    def __init__(self, reader, rows):
+        self._reader = reader
+        self._rows = rows  # (konum, timestamp, hit_count, last_access)
+
+    def __len__(self):
+        return len(self._rows)
+
+    def __getitem__(self, index):
+        pos, timestamp, hit_count, last_access = self._rows[index]
+        record = self._reader.record(pos)
+        record.update(timestamp=timestamp, hit_count=hit_count, last_access=last_access)
+        return record
+
+    def __iter__(self):
+        return (self[index] for index in range(len(self._rows)))
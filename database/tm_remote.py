@@ -0,0 +1,131 @@
+import os
+import json
+import time
+import logging
+import threading
+import http.client
+from urllib.parse import urlsplit
+
+from core.backends import BackendStats
+from core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Lookup Cmd+C+C yolunda API çağrısından önce yapılır: Kısa zaman aşımı, hatada devre dışı kalma
+LOOKUP_TIMEOUT = 0.3
+COOLDOWN_SECONDS = 30.0
+
+REMOTE_REQUESTS = metrics.counter("mytranslator_tm_remote_requests_total", "Paylaşılan TM sunucusuna istekler (op/sonuç)")
+
+
+class RemoteTMClient:
+    """
+    PAYLAŞILAN ÇEVİRİ BELLEĞİ İSTEMCİSİ
+    Okuma ve yazma için ayrı kalıcı HTTP/1.1 bağlantıları (keep-alive) kullanılır: Arka plandaki
+    toplu upsert etkileşimli lookup'ı bekletmez. Bağlantı koparsa bir kez yeniden bağlanıp dener.
+    Lookup etkileşimli yolda olduğu için kısa zaman aşımıyla çalışır; hata veren sunucu
+    'cooldown' süresince hiç sorulmaz (BackendStats ile aynı sağlık mantığı).
+    Hatalar loglanır, çağırana None/False döner (uzak katman erişilemezse uygulama yerel
+    önbellekle çalışmaya devam eder; write-behind yazmaları sonra tekrar dener).
+    Sunucunun paylaşılan token'ı (MYTRANSLATOR_TM_TOKEN) her istekte Bearer olarak gönderilir.
+    """
+
+    def __init__(self, base_url, timeout=2.0, token=None, lookup_timeout=LOOKUP_TIMEOUT,
+                 max_errors=1, cooldown=COOLDOWN_SECONDS):
+        parts = urlsplit(base_url if "://" in base_url else f"http://{base_url}")
+        self.host = parts.hostname
+        self.port = parts.port or 80
+        self.prefix = parts.path.rstrip("/")
+        self.timeouts = {"lookup": lookup_timeout, "upsert": timeout}
+        self.token = os.getenv("MYTRANSLATOR_TM_TOKEN", "").strip() if token is None else token
+        self.max_errors = max_errors
+        self.cooldown = cooldown
+        self.health = BackendStats()
+        self._conns = {}
+        self._locks = {op: threading.Lock() for op in self.timeouts}
+
+    def is_healthy(self):
+        return self.health.is_healthy()
+
+    def _connection(self, op):
+        if self._conns.get(op) is None:
+            self._conns[op] = http.client.HTTPConnection(self.host, self.port, timeout=self.timeouts[op])
+        return self._conns[op]
+
+    def _drop(self, op):
+        conn = self._conns.pop(op, None)
+        if conn is not None:
+            conn.close()
+
+    def close(self):
+        for op, lock in self._locks.items():
+            with lock:
+                self._drop(op)
+
+    def _post(self, op, path, payload):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        headers = {"Content-Type": "application/json", "Content-Length": str(len(body))}
+        if self.token:
+            headers["Authorization"] = f"Bearer {self.token}"
+        started = time.monotonic()
+        with self._locks[op]:
+            for attempt in range(2):
+                try:
+                    conn = self._connection(op)
+                    conn.request("POST", self.prefix + path, body=body, headers=headers)
+                    response = conn.getresponse()
+                    data = response.read()
+                    if response.status != 200:
+                        raise RuntimeError(f"HTTP {response.status}")
+                    result = json.loads(data)
+                    self.health.record_ttft(time.monotonic() - started)
+                    return result
+                except TimeoutError:
+                    # Yavaş sunucuyu tekrar denemek gecikmeyi ikiye katlar
+                    self._drop(op)
+                    self.health.record_error(self.max_errors, self.cooldown)
+                    raise
+                except (http.client.HTTPException, ConnectionError, OSError) as e:
+                    # Sunucu keep-alive bağlantısını kapatmış olabilir: Yeniden bağlanıp bir kez dene
+                    self._drop(op)
+                    if attempt:
+                        self.health.record_error(self.max_errors, self.cooldown)
+                        raise e
+                except Exception:
+                    self.health.record_error(self.max_errors, self.cooldown)
+                    raise
+
+    def lookup_many(self, items, threshold=90, model=None, prompt_hash=None):
+        """items: [(text, style), ...] -> Aynı sırada kayıt (dict) veya None listesi. Hata: None."""
+        if not self.is_healthy():
+            REMOTE_REQUESTS.inc(op="lookup", status="skipped")
+            return None
+        try:
+            response = self._post("lookup", "/lookup", {
+                "items": [{"text": text, "style": style} for text, style in items],
+                "threshold": threshold, "model": model, "prompt_hash": prompt_hash,
+            })
+            REMOTE_REQUESTS.inc(op="lookup", status="ok")
+            return response["results"]
+        except Exception as e:
+            logger.warning(f"⚠️ [TM Remote] Lookup Error: {e}")
+            REMOTE_REQUESTS.inc(op="lookup", status="error")
+            return None
+
+    def lookup(self, text, style="Academic", threshold=90, model=None, prompt_hash=None):
+        results = self.lookup_many([(text, style)], threshold, model, prompt_hash)
+        return results[0] if results else None
+
+    def upsert_many(self, records):
+        """records: add_history alanlarını taşıyan dict listesi. Başarılıysa True."""
+        if not self.is_healthy():
+            REMOTE_REQUESTS.inc(op="upsert", status="skipped")
+            return False  # Write-behind kayıtları tutar, sunucu dönünce gönderilir
+        try:
+            self._post("upsert", "/upsert", {"items": records})
+            REMOTE_REQUESTS.inc(op="upsert", status="ok")
+            return True
+        except Exception as e:
+            logger.warning(f"⚠️ [TM Remote] Upsert Error: {e}")
+            REMOTE_REQUESTS.inc(op="upsert", status="error")
+            return False
@@ -0,0 +1,170 @@
+import os
+import sys
+import hmac
+import json
+import logging
+import ipaddress
+import argparse
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+from database.db_manager import DatabaseManager
+
+logger = logging.getLogger(__name__)
+
+MAX_BODY_BYTES = 16 * 1024 * 1024
+MAX_BATCH_ITEMS = 1000
+
+
+class _TMRequestHandler(BaseHTTPRequestHandler):
+    # HTTP/1.1: İstemciler aynı bağlantıyı art arda isteklerde kullanabilir (keep-alive)
+    protocol_version = "HTTP/1.1"
+    db = None
+    token = ""
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_json(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        if length <= 0 or length > MAX_BODY_BYTES:
+            return None
+        try:
+            return json.loads(self.rfile.read(length))
+        except ValueError:
+            return None
+
+    def _authorized(self):
+        """Token tanımlıysa her istek 'Authorization: Bearer <token>' taşımalı (sabit zamanlı karşılaştırma)."""
+        if not self.token:
+            return True
+        header = self.headers.get("Authorization") or ""
+        if hmac.compare_digest(header.encode("utf-8"), f"Bearer {self.token}".encode("utf-8")):
+            return True
+        # Gövde okunmadı: Bağlantı keep-alive ile sürdürülemez
+        self.close_connection = True
+        self._send_json(401, {"error": "unauthorized"})
+        return False
+
+    def do_GET(self):
+        if not self._authorized():
+            return
+        if self.path == "/health":
+            self._send_json(200, {"status": "ok"})
+        else:
+            self._send_json(404, {"error": "not found"})
+
+    def do_POST(self):
+        if not self._authorized():
+            return
+        payload = self._read_json()
+        if not isinstance(payload, dict) or not isinstance(payload.get("items"), list):
+            self._send_json(400, {"error": "invalid body"})
+            return
+        items = payload["items"]
+        if len(items) > MAX_BATCH_ITEMS:
+            self._send_json(413, {"error": f"max {MAX_BATCH_ITEMS} items per request"})
+            return
+
+        if self.path == "/lookup":
+            threshold = payload.get("threshold", 90)
+            results = []
+            for item in items:
+                record = self.db.get_translation(item.get("text"), item.get("style") or "Academic", threshold,
+                                                 model=payload.get("model"), prompt_hash=payload.get("prompt_hash"))
+                if record:
+                    record.pop("id", None)
+                results.append(record)
+            self._send_json(200, {"results": results})
+        elif self.path == "/upsert":
+            self._send_json(200, {"count": self.db.add_history_many(items)})
+        else:
+            self._send_json(404, {"error": "not found"})
+
+    def log_message(self, format, *args):
+        pass
+
+
+def _is_loopback(host):
+    if host == "localhost":
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+
+class TMServer:
+    """
+    PAYLAŞILAN ÇEVİRİ BELLEĞİ SUNUCUSU (Opsiyonel, yerel ağ)
+    DatabaseManager ile aynı şemayı kullanır.
+    GET  /health
+    POST /lookup  {"items": [{"text", "style"}], "threshold", "model", "prompt_hash"} -> {"results": [...]}
+    POST /upsert  {"items": [{"original_text", "translation", "style", "model", "prompt_hash"}]} -> {"count"}
+    Kimlik doğrulama: MYTRANSLATOR_TM_TOKEN (paylaşılan gizli anahtar) tanımlıysa her istek
+    'Authorization: Bearer <token>' ister. Loopback dışı bir adrese token olmadan bağlanılmaz
+    (yerel ağdaki herkes /upsert ile önbelleği zehirleyebilirdi).
+    """
+
+    def __init__(self, db=None, host="127.0.0.1", port=0, token=None):
+        if token is None:
+            token = os.getenv("MYTRANSLATOR_TM_TOKEN", "").strip()
+        if not token and not _is_loopback(host):
+            raise ValueError(f"TM server on {host} requires MYTRANSLATOR_TM_TOKEN")
+        # Sunucunun kendi veritabanı uzak katman kullanmaz (kendine istek atmasın)
+        self.db = db or DatabaseManager("tm_server.db", remote_url="")
+        handler = type("TMHandler", (_TMRequestHandler,), {"db": self.db, "token": token})
+        self.httpd = ThreadingHTTPServer((host, port), handler)
+        self.httpd.daemon_threads = True
+        self.host = host
+        self.port = self.httpd.server_address[1]
+
+    @property
+    def url(self):
+        return f"http://{self.host}:{self.port}"
+
+    def start(self):
+        threading.Thread(target=self.httpd.serve_forever, daemon=True, name="TMServer").start()
+        logger.info(f"🌐 [TM Server] {self.url}")
+        return self
+
+    def serve_forever(self):
+        logger.info(f"🌐 [TM Server] {self.url}")
+        self.httpd.serve_forever()
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def main(argv=None):
+    """MYTRANSLATOR_TM_TOKEN=<gizli> python -m database.tm_server --host 192.168.1.10 --port 8765 --db shared_tm.db"""
+    parser = argparse.ArgumentParser(description="MyTranslator paylaşılan çeviri belleği sunucusu")
+    parser.add_argument("--host", default="127.0.0.1", help="Loopback dışı adresler MYTRANSLATOR_TM_TOKEN gerektirir")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--db", default="tm_server.db")
+    args = parser.parse_args(argv)
+
+    from core.logging_setup import setup_logging
+    setup_logging("tm_server.log")
+    try:
+        server = TMServer(DatabaseManager(args.db, remote_url=""), host=args.host, port=args.port)
+    except ValueError as e:
+        print(f"Hata: {e}", file=sys.stderr)
+        return 2
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.httpd.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
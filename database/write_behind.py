@@ -0,0 +1,99 @@
+import time
+import atexit
+import logging
+import threading
+from collections import deque
+
+from core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+WRITE_BEHIND_DROPPED = metrics.counter("mytranslator_write_behind_dropped_total", "Kuyruk dolduğu için atılan yazma")
+
+
+class WriteBehindBuffer:
+    """
+    WRITE-BEHIND TAMPONU
+    Yazmalar bellekte biriktirilir ve ayrı bir thread tarafından toplu halde
+    'flush_fn(items)' ile yazılır: 'interval' saniyede bir veya 'max_batch' dolunca.
+    flush_fn False döndürür ya da hata fırlatırsa kayıtlar sonraki denemeye kalır.
+    Kuyruk 'max_pending' ile sınırlıdır; dolarsa en eski kayıtlar atılır.
+    """
+
+    def __init__(self, flush_fn, interval=1.0, max_batch=500, max_pending=10000, name="WriteBehind"):
+        self.flush_fn = flush_fn
+        self.interval = interval
+        self.max_batch = max_batch
+        self.max_pending = max_pending
+        self.name = name
+        self._items = deque()
+        self._cond = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._thread = None
+        self._running = False
+
+    def start(self):
+        with self._cond:
+            if self._running: return self
+            self._running = True
+        self._thread = threading.Thread(target=self._run, daemon=True, name=self.name)
+        self._thread.start()
+        atexit.register(self.stop)
+        return self
+
+    def stop(self):
+        with self._cond:
+            if not self._running: return
+            self._running = False
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout=2.0)
+            self._thread = None
+        self.flush()
+
+    def pending(self):
+        with self._cond:
+            return len(self._items)
+
+    def add(self, item):
+        if not self._running:
+            self.start()
+        with self._cond:
+            if len(self._items) >= self.max_pending:
+                self._items.popleft()
+                WRITE_BEHIND_DROPPED.inc(buffer=self.name)
+            self._items.append(item)
+            if len(self._items) >= self.max_batch:
+                self._cond.notify_all()
+
+    def flush(self):
+        """Bekleyen tüm kayıtları şimdi yazar. Başarılıysa True."""
+        with self._flush_lock:
+            while True:
+                with self._cond:
+                    batch = [self._items.popleft() for _ in range(min(self.max_batch, len(self._items)))]
+                if not batch:
+                    return True
+                try:
+                    ok = self.flush_fn(batch) is not False
+                except Exception as e:
+                    logger.error(f"Write-Behind Error ({self.name}): {e}")
+                    ok = False
+                if not ok:
+                    with self._cond:
+                        # Sıra korunarak geri konur (sınırı aşanlar atılır)
+                        room = max(0, self.max_pending - len(self._items))
+                        self._items.extendleft(reversed(batch[-room:] if room else []))
+                    return False
+
+    def _run(self):
+        while True:
+            with self._cond:
+                if not self._running:
+                    return
+                if len(self._items) < self.max_batch:
+                    self._cond.wait(self.interval)
+                if not self._running:
+                    return
+            if not self.flush():
+                time.sleep(self.interval)  # Hedef ulaşılamıyorsa bir sonraki turu bekle
@@ -1,7 +1,5 @@
 import sys
 import logging
-import faulthandler
-# faulthandler.enable()
 from PyQt6.QtWidgets import QApplication
 from PyQt6.QtCore import QObject, pyqtSignal, QLockFile, QDir 
 from PyQt6.QtGui import QIcon 
@@ -11,16 +9,17 @@ import platform
 # Import Classes
 from ui.popup_window import TranslationPopup
 from core.clipboard_handler import ClipboardHandler
+from core.metrics import metrics, start_metrics_server_from_env
+from core.ipc import start_ipc_server_from_env
+from core.logging_setup import setup_logging
+from core.profiler import enable_faulthandler
 
 # Configure Logging
-logging.basicConfig(
-    level=logging.INFO, 
-    format='%(asctime)s [%(threadName)s] %(message)s',
-    handlers=[
-        logging.FileHandler("debug_humanize.log", mode='w'),
-        logging.StreamHandler(sys.stdout)
-    ]
-)
+# QueueHandler -> QueueListener: Dosya/stdout yazımı ayrı thread'de (hot path'te disk I/O yok).
+# debug_humanize.log artık her açılışta silinmez; JSON-lines + boyut tabanlı rotasyon.
+setup_logging("debug_humanize.log")
+# Çökmede (ve Unix'te kill -USR1 ile) tüm thread yığınları crash_trace.log'a
+enable_faulthandler()
 
 # Custom Exception Hook to prevent PyQt from crashing on unhandled errors
 def exception_hook(exctype, value, traceback):
@@ -29,12 +28,15 @@ def exception_hook(exctype, value, traceback):
 
 sys.excepthook = exception_hook
 
+# Worker thread'lerden gönderilip GUI thread'inde henüz işlenmemiş güncelleme sayısı
+RENDER_QUEUE_DEPTH = metrics.gauge("mytranslator_render_queue_depth", "TranslationPopup bekleyen güncelleme sayısı")
+
 class SignalManager(QObject):
     """
     Bridge between non-GUI threads (pynput/worker) and GUI thread (PyQt)
     """
     update_signal = pyqtSignal(object) # Data carrier
-    move_signal = pyqtSignal()         # UI Action carrier
+    move_signal = pyqtSignal(object)   # UI Action carrier (aktivasyon zamanı, perf_counter)
     read_clipboard_signal = pyqtSignal() # Request carrier
 
 class MainApp(QObject):
@@ -74,12 +76,14 @@ class MainApp(QObject):
         self.signals = SignalManager()
         
         # Connect Signals -> GUI Slots
-        self.signals.update_signal.connect(self.popup.update_content)
+        self.signals.update_signal.connect(self.deliver_update)
         self.signals.move_signal.connect(self.popup.move_to_cursor_position)
         self.signals.read_clipboard_signal.connect(self.read_system_clipboard)
         
         # Connect Humanize Signal from UI
         self.popup.humanize_requested.connect(self.handle_humanize_request)
+        # Kaynak metin düzenlenince sadece değişen cümleler yeniden çevrilir
+        self.popup.edit_requested.connect(self.handle_edit_request)
 
         # Initialize Logic Controller
         # Pass callback methods that trigger signals
@@ -87,23 +91,42 @@ class MainApp(QObject):
             update_callback=self.emit_update,
             move_window_callback=self.emit_move
         )
+        # 🎨 Stil profilleri (DB) -> Popup seçicisi
+        self.popup.set_styles(self.clipboard_handler.engine.style_names(), self.clipboard_handler.style)
+        self.popup.style_changed.connect(self.clipboard_handler.set_style)
+        # 🧹 Geçmiş silinince VACUUM bakım kuyruğunda (PRIORITY_BACKGROUND), Qt thread'i beklemez
+        self.popup.history_cleared.connect(self.clipboard_handler.maintenance.request_compaction)
 
-
+        # 📈 Opt-in metrik ucu (MYTRANSLATOR_METRICS_PORT)
+        self.metrics_server = start_metrics_server_from_env()
+        # 🔌 Yerel IPC: Editörler/scriptler aynı sıcak bağlantı ve önbelleği kullanır (MYTRANSLATOR_IPC)
+        self.ipc_server = start_ipc_server_from_env(self.clipboard_handler.engine.ipc_handlers())
 
     def emit_update(self, data):
         """Called from background thread"""
+        RENDER_QUEUE_DEPTH.inc()
         self.signals.update_signal.emit(data)
 
-    def emit_move(self):
+    def deliver_update(self, data):
+        """Executes in Main Thread"""
+        RENDER_QUEUE_DEPTH.dec()
+        self.popup.update_content(data)
+
+    def emit_move(self, activated_at=None):
         """Called from background thread"""
-        self.signals.move_signal.emit()
+        self.signals.move_signal.emit(activated_at)
 
-    def handle_humanize_request(self, source_text, current_text):
-        """Called when user clicks Humanize button in UI"""
-        logging.info("✨ Humanize Requested...")
+    def handle_humanize_request(self, source_text, current_text, force_new=False):
+        """Called when user clicks Humanize button in UI (force_new: re-click on the unchanged output)"""
+        logging.info("✨ Humanize Requested..." + (" (new variant)" if force_new else ""))
         # Clear UI for stream
         self.popup.update_text("") 
-        self.clipboard_handler.process_humanize_request(source_text, current_text)
+        self.clipboard_handler.process_humanize_request(source_text, current_text, force_new)
+
+    def handle_edit_request(self, old_source, new_source, translation):
+        """Called when user re-translates an edited source in UI"""
+        logging.info("✂️ Edit Re-translation Requested...")
+        self.clipboard_handler.process_edit_request(old_source, new_source, translation)
 
     def emit_clipboard_read_request(self):
         """Called from background thread to request Main Thread clipboard read"""
@@ -2,13 +2,60 @@ import unittest
 from unittest.mock import MagicMock, patch
 import json
 import os
+import glob
 import sys
+import time
+import threading
+import socket
 
 # Add project root to path
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 from database.db_manager import DatabaseManager
-from core.api_service import APIService
+from database.normalize import normalize_key
+from database.tm_server import TMServer
+from database.tm_remote import RemoteTMClient
+from database.write_behind import WriteBehindBuffer
+from database.semantic import SemanticIndex, NUMPY_AVAILABLE
+from database.snapshot import HistorySnapshot
+from core.api_service import APIService, BUILTIN_STYLE_PROMPTS
+from core.revalidator import StaleRevalidator
+from core.backends import TranslationBackend, BackendRouter
+from core.maintenance import MaintenanceJob, RetentionPolicy
+from core.metrics import MetricsRegistry, MetricsServer
+from core.logging_setup import setup_logging, parse_module_levels
+from core.documents import DocumentTranslator, iter_paragraphs, count_completed_rows
+from core.hotkey import HotkeyEngine, ActivationDispatcher
+from core.ipc import IPCServer, IPCClient, IPCError
+from core.engine import TranslationEngine
+from core.profiler import SamplingProfiler, fold_stack
+from core.activation_log import ActivationLog
+from database import fuzzy_eval
+from core.diffing import plan_edit, apply_patches, sentence_pieces, utf16_offset
+from core.scheduler import (
+    JobScheduler, raise_if_cancelled, QUEUE_WAIT_SECONDS,
+    PRIORITY_INTERACTIVE, PRIORITY_BACKGROUND
+)
+from core.tokens import estimate_tokens, output_token_budget, split_for_budget, is_turkish
+
+def remove_db_files(path):
+    """Veritabanı ve yan dosyaları (-wal, -shm, snapshot, anlamsal dizin)."""
+    for file in glob.glob(glob.escape(path) + "*"):
+        os.remove(file)
+
+
+def mock_api(model_name, prompt_hash, styles=("Academic",)):
+    """Stil profilleri olan sahte APIService (her stil aynı model, farklı prompt_hash)."""
+    from types import SimpleNamespace
+    api = MagicMock()
+    api.model_name = model_name
+    api.prompt_hash = prompt_hash
+    api.profiles = {style: SimpleNamespace(name=style, model_name=model_name,
+                                           prompt_hash=prompt_hash if i == 0 else f"{prompt_hash}-{style}")
+                    for i, style in enumerate(styles)}
+    api.profile.side_effect = lambda style=None: api.profiles.get(style) or api.profiles[styles[0]]
+    return api
+
 
 class TestDatabaseManager(unittest.TestCase):
     def setUp(self):
@@ -18,8 +65,7 @@ class TestDatabaseManager(unittest.TestCase):
     
     def tearDown(self):
         # Cleanup test DB
-        if os.path.exists(self.db.db_path):
-            os.remove(self.db.db_path)
+        remove_db_files(self.db.db_path)
 
     def test_add_and_get_history(self):
         self.db.add_history("Hello", "Merhaba", "Academic")
@@ -34,6 +80,1246 @@ class TestDatabaseManager(unittest.TestCase):
         self.assertIsNotNone(result)
         self.assertEqual(result['translation'], "Önbellek")
 
+    def test_stale_flag_on_model_or_prompt_change(self):
+        self.db.add_history("Stale Me", "Bayat", "Academic", model="m1", prompt_hash="p1")
+        fresh = self.db.get_translation("Stale Me", "Academic", model="m1", prompt_hash="p1")
+        self.assertFalse(fresh['stale'])
+        stale = self.db.get_translation("Stale Me", "Academic", model="m1", prompt_hash="p2")
+        self.assertTrue(stale['stale'])
+
+    def test_get_stale_entries(self):
+        self.db.add_history("Legacy", "Eski", "Academic")
+        self.db.add_history("Current", "Güncel", "Academic", model="m1", prompt_hash="p1")
+        stale = self.db.get_stale_entries("m1", "p1")
+        self.assertEqual([e['original_text'] for e in stale], ["Legacy"])
+
+    def test_humanize_variants_rotate(self):
+        key = self.db.humanize_key("Kaynak", "Metin")
+        self.assertIsNone(self.db.get_humanize_variant(key))
+        self.db.add_humanize_variant(key, "Varyant 1", model="m1", prompt_hash="h1")
+        self.db.add_humanize_variant(key, "Varyant 2", model="m1", prompt_hash="h1")
+        self.db.add_humanize_variant(key, "Varyant 2", model="m1", prompt_hash="h1") # Tekrar eklenmez
+        served = {self.db.get_humanize_variant(key, model="m1", prompt_hash="h1") for _ in range(2)}
+        self.assertEqual(served, {"Varyant 1", "Varyant 2"})
+        # Farklı prompt ile üretilmiş varyantlar servis edilmez
+        self.assertIsNone(self.db.get_humanize_variant(key, model="m1", prompt_hash="h2"))
+
+    def test_usage_summary(self):
+        self.db.add_usage({"kind": "translate", "model": "m1", "prompt_hash": "p1",
+                           "prompt_tokens": 12, "output_tokens": 30, "continuations": 1, "duration_ms": 100.0})
+        summary = self.db.get_usage_summary()
+        self.assertEqual(summary[0]["requests"], 1)
+        self.assertEqual(summary[0]["output_tokens"], 30)
+        self.assertEqual(summary[0]["truncated"], 1)
+
+    def test_hits_are_batched_and_drive_ordering(self):
+        self.db.add_history("First entry", "Birinci", "Academic")
+        self.db.add_history("Second entry", "İkinci", "Academic")
+        conn = self.db.connect()
+        conn.execute("UPDATE history SET timestamp = '2026-01-01 00:00:00'")  # İkisi de eski kayıt
+        conn.commit()
+        conn.close()
+        for _ in range(3):
+            self.db.get_translation("First entry")
+        self.assertEqual(self.db.hit_writer.pending(), 3)  # Okuma başına yazma yok
+        history = self.db.get_last_history(order="frequent")  # Bekleyen isabetler önce yazılır
+        self.assertEqual(self.db.hit_writer.pending(), 0)
+        self.assertEqual((history[0]["original_text"], history[0]["hit_count"]), ("First entry", 3))
+        self.assertIsNotNone(history[0]["last_access"])
+        self.assertEqual(self.db.get_last_history(order="recent")[0]["original_text"], "First entry")
+
+    def test_fuzzy_prefers_frequently_hit_translation(self):
+        self.db.add_history("The results were statistically significant here", "Sonuçlar burada anlamlıydı", "Academic")
+        self.db.add_history("The results are statistically significant in here", "Sonuçlar burada anlamlıdır", "Academic")
+        query = "The results are statistically significant here"  # Ham skor: İkinci kayıt biraz daha yakın
+        self.assertEqual(self.db.get_translation(query)["translation"], "Sonuçlar burada anlamlıdır")
+        for _ in range(7):
+            self.db.get_translation("The results were statistically significant here")
+        self.db.hit_writer.flush()
+        self.assertEqual(self.db.get_translation(query)["translation"], "Sonuçlar burada anlamlıydı")
+
+    def test_normalized_match_prefers_frequently_hit_translation(self):
+        self.db.add_history("The results are significant", "Sonuçlar anlamlı", "Academic")
+        self.db.add_history("The results are significant!", "Sonuçlar anlamlıdır!", "Academic")
+        for _ in range(3):
+            self.db.get_translation("The results are significant")
+        self.db.hit_writer.flush()
+        result = self.db.get_translation("The results are significant.")
+        self.assertEqual((result["translation"], result["match_type"]), ("Sonuçlar anlamlı", "normalized"))
+
+    def test_normalized_key_match(self):
+        self.db.add_history("The “Results” — see [12].", "Sonuçlar", "Academic")
+        result = self.db.get_translation("the results - see")
+        self.assertEqual((result["translation"], result["match_type"]), ("Sonuçlar", "normalized"))
+        self.assertIsNone(self.db.get_translation("...")) # Sadece noktalama: Eşleşme yok
+
+    def test_year_parentheticals_are_not_citations(self):
+        self.assertEqual(normalize_key("Deep learning (Smith et al., 2020; Yılmaz, 2019a)."), "deep learning")
+        self.assertEqual(normalize_key("The company (founded in 1998) grew fast."), "the company founded in 1998 grew fast")
+        self.assertNotEqual(normalize_key("The company (founded in 1998) grew fast."),
+                            normalize_key("The company (founded in 2005) grew fast."))
+        self.assertEqual(normalize_key("Sales rose (see Table 2, 2019)."), "sales rose see table 2 2019")
+        self.db.add_history("The company (founded in 1998) grew fast.", "Şirket (1998'de kuruldu) hızla büyüdü.", "Academic")
+        result = self.db.get_translation("The company (founded in 2005) grew fast.")
+        self.assertTrue(result is None or result["match_type"] == "fuzzy")
+
+    def test_meaning_bearing_symbols_do_not_collide(self):
+        for a, b in (("p < 0.05", "p > 0.05"), ("Costs rose 5%", "Costs rose 5$"), ("C++", "C"),
+                     ("x = 1", "x + 1"), ("-5 °C", "5 °C")):
+            self.assertNotEqual(normalize_key(a), normalize_key(b))
+        self.assertEqual(normalize_key("p<0.05."), normalize_key("P < 0.05"))
+        self.db.add_history("The effect was significant (p < 0.05).", "Etki anlamlıydı (p < 0.05).", "Academic")
+        result = self.db.get_translation("The effect was significant (p > 0.05).")
+        self.assertTrue(result is None or result["match_type"] == "fuzzy")
+        self.assertEqual(self.db.get_translation("the effect was significant p<0.05")["match_type"], "normalized")
+
+    def test_norm_key_backfill_for_old_rows(self):
+        conn = self.db.connect()
+        conn.execute("INSERT INTO history (original_text, translation) VALUES ('Deep LEARNING (Smith et al., 2020)', 'Derin öğrenme')")
+        conn.commit()
+        conn.close()
+        self.db.init_db()  # Uygulama yeniden açılışı
+        self.assertEqual(self.db.get_translation("deep learning")["translation"], "Derin öğrenme")
+
+    def test_tmx_round_trip_and_import_not_stale(self):
+        import tempfile
+        path = os.path.join(tempfile.mkdtemp(), "tm.tmx")
+        self.db.add_history("Fish & <chips>", "Balık & patates", "Academic", model="m1", prompt_hash="p1")
+        self.db.add_history("Second unit", "İkinci birim", "Casual", model="m1", prompt_hash="p1")
+        self.assertEqual(self.db.export_tmx(path), 2)
+        self.db.clear_history()
+
+        summary = self.db.import_tmx(path)
+        self.assertEqual(summary, {"read": 2, "inserted": 2, "updated": 0})
+        imported = self.db.get_translation("Fish & <chips>", "Academic", model="m2", prompt_hash="p2")
+        self.assertEqual(imported["translation"], "Balık & patates")
+        self.assertFalse(imported["stale"])  # İnsan çeviri belleği model değişince bayatlamaz
+        self.assertEqual(self.db.get_translation("Second unit", "Casual")["translation"], "İkinci birim")
+        self.assertEqual(self.db.get_stale_entries("m2", "p2"), [])
+        os.remove(path)
+
+    def test_tmx_language_direction(self):
+        import tempfile
+        path = os.path.join(tempfile.mkdtemp(), "tm.tmx")
+        self.db.add_history("Derin öğrenme yöntemleri", "Deep learning methods", "Academic")
+        self.db.add_history("Deep learning methods", "Derin öğrenme yöntemleri", "Casual")
+        self.assertEqual(self.db.export_tmx(path), 2)
+        with open(path, encoding="utf-8") as f:
+            content = f.read()
+        self.assertIn('<tu srclang="tr"><prop type="x-style">Academic</prop><tuv xml:lang="tr"><seg>Derin', content)
+        self.assertIn('<tu srclang="en"><prop type="x-style">Casual</prop><tuv xml:lang="en"><seg>Deep', content)
+
+        # Başka bir CAT aracından: srclang başlıkta, dil çifti de-DE -> en-US, tuv sırası ters
+        with open(path, "w", encoding="utf-8") as f:
+            f.write('<?xml version="1.0" encoding="UTF-8"?>\n<tmx version="1.4"><header srclang="de-DE"/><body>'
+                    '<tu><tuv xml:lang="en-US"><seg>The house</seg></tuv><tuv xml:lang="de-DE"><seg>Das Haus</seg></tuv></tu>'
+                    '</body></tmx>\n')
+        self.db.clear_history()
+        self.assertEqual(self.db.import_tmx(path)["inserted"], 1)
+        self.assertEqual(self.db.get_translation("Das Haus")["translation"], "The house")
+        os.remove(path)
+
+    def test_jsonl_import_merge(self):
+        import tempfile
+        path = os.path.join(tempfile.mkdtemp(), "tm.jsonl")
+        self.db.add_history("Keep", "Mevcut", "Academic")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write('{"source": "Keep", "target": "Yeni"}\n')
+            f.write('{"source": "Dup", "target": "İlk"}\nnot json\n')
+            f.write('{"source": "Dup", "target": "Son"}\n')
+        self.assertEqual(self.db.import_jsonl(path), {"read": 3, "inserted": 1, "updated": 0})
+        self.assertEqual(self.db.get_translation("Keep")["translation"], "Mevcut")
+        self.assertEqual(self.db.get_translation("Dup")["translation"], "Son")
+        self.assertEqual(self.db.import_jsonl(path, overwrite=True)["updated"], 2)
+        self.assertEqual(self.db.get_translation("Keep")["translation"], "Yeni")
+        os.remove(path)
+
+    def test_style_profiles_round_trip(self):
+        self.db.save_style_profiles([{"name": "Academic", "system_prompt": "A"},
+                                     {"name": "Casual", "system_prompt": "C", "temperature": 0.7}])
+        self.db.save_style_profiles([{"name": "Legal", "system_prompt": "L", "model": "m2", "max_output_tokens": 512},
+                                     {"name": "Academic", "system_prompt": "A2"}])
+        profiles = self.db.get_style_profiles()
+        self.assertEqual([p["name"] for p in profiles], ["Academic", "Casual", "Legal"])  # Güncelleme sırayı bozmaz
+        self.assertEqual(profiles[0]["system_prompt"], "A2")
+        self.assertEqual((profiles[2]["model"], profiles[2]["max_output_tokens"]), ("m2", 512))
+        self.assertTrue(self.db.delete_style_profile("Casual"))
+        self.assertEqual([p["name"] for p in self.db.get_style_profiles()], ["Academic", "Legal"])
+
+    def test_legacy_style_profiles_accept_builtin_profiles(self):
+        conn = self.db.connect()
+        conn.execute('DROP TABLE style_profiles')
+        conn.execute('CREATE TABLE style_profiles (name TEXT PRIMARY KEY, system_prompt TEXT NOT NULL, temperature REAL DEFAULT 0.3, '
+                     'model TEXT, max_output_tokens INTEGER, position INTEGER DEFAULT 0, updated DATETIME DEFAULT CURRENT_TIMESTAMP)')
+        conn.execute("INSERT INTO style_profiles (name, system_prompt) VALUES ('Legal', 'L')")
+        conn.commit()
+        conn.close()
+        self.db.init_db()  # Eski şema yeniden kurulur, kayıtlar korunur
+        self.assertTrue(self.db.save_style_profiles([{"name": "Academic", "system_prompt": None}]))
+        self.assertEqual([(p["name"], p["system_prompt"]) for p in self.db.get_style_profiles()],
+                         [("Legal", "L"), ("Academic", None)])
+
+class TestRetention(unittest.TestCase):
+    def setUp(self):
+        self.db = DatabaseManager(db_name="test_retention.db")
+        rows = [(f"text {i}", f"çeviri {i}", "Academic", i % 10, f"2026-01-{i % 28 + 1:02d} 00:00:00") for i in range(100)]
+        conn = self.db.connect()
+        conn.executemany("INSERT INTO history (original_text, translation, style, hit_count, last_access) VALUES (?, ?, ?, ?, ?)", rows)
+        conn.commit()
+        conn.close()
+
+    def tearDown(self):
+        remove_db_files(self.db.db_path)
+
+    def remaining(self):
+        return self.db.get_last_history(limit=1000)
+
+    def test_max_rows_keeps_recent_and_hot_entries(self):
+        deleted = self.db.enforce_retention(max_rows=20, keep_hits=9)
+        rows = self.remaining()
+        self.assertEqual(len(rows), 20)
+        self.assertEqual(deleted, 80)
+        self.assertEqual(sum(1 for r in rows if r["hit_count"] == 9), 10)  # Sık kullanılanlar korunur
+        self.assertTrue(all(r["last_access"] >= "2026-01-25" for r in rows if r["hit_count"] < 9))
+
+    def test_max_age_and_max_bytes(self):
+        self.db.add_history("fresh", "taze")  # last_access yok -> timestamp (şimdi) kullanılır
+        self.db.enforce_retention(max_age_days=30)
+        self.assertEqual([r["original_text"] for r in self.remaining()], ["fresh"])
+        self.db.add_history("a" * 500, "b" * 500)
+        self.db.add_history("c" * 500, "d" * 500)
+        self.db.enforce_retention(max_bytes=1500)  # En yeni 1000 byte sığar, daha eskiler silinir
+        self.assertEqual([r["original_text"] for r in self.remaining()], ["c" * 500])
+
+    def test_lfu_eviction(self):
+        self.db.enforce_retention(max_rows=10, eviction="lfu")
+        self.assertEqual({r["hit_count"] for r in self.remaining()}, {9})
+
+    def test_maintenance_job_reports_reclaimed_space(self):
+        conn = self.db.connect()
+        conn.executemany("INSERT INTO history (original_text, translation) VALUES (?, ?)",
+                         [(f"padding {i} " + "z" * 2000, "p") for i in range(300)])
+        conn.commit()
+        conn.close()
+        self.db.compact()
+        job = MaintenanceJob(self.db, scheduler=MagicMock(), policy=RetentionPolicy(max_rows=10))
+        report = job.run_once()
+        self.assertEqual(report["deleted"], 390)
+        self.assertGreater(report["reclaimed"], 300 * 2000)
+        self.assertEqual(len(self.remaining()), 10)
+
+
+    def test_clear_history_compacts_in_background(self):
+        scheduler = JobScheduler(workers=1, reserved=0)
+        job = MaintenanceJob(self.db, scheduler=scheduler)
+        busy = threading.Event()
+        scheduler.submit(busy.wait, 5)  # Worker meşgulken istekler kuyrukta bekler
+        with patch.object(self.db, "compact", wraps=self.db.compact) as compact:
+            self.db.clear_history()
+            compact.assert_not_called()  # Çağıran thread VACUUM'u beklemez
+            first = job.request_compaction()
+            self.assertIsNone(job.request_compaction())  # Bekleyen istek birleştirilir
+            busy.set()
+            first.wait()
+            compact.assert_called_once()
+        self.assertIn("reclaimed", first.result)
+        self.assertEqual(self.remaining(), [])
+        scheduler.stop()
+
+
+class TestFuzzyTuning(unittest.TestCase):
+    OLD = "The results of the experiment were significant"
+    NEW = "The results of the experiments were significant"
+
+    def setUp(self):
+        self.db = DatabaseManager(db_name="test_fuzzy_eval.db", remote_url="", snapshot=False)
+        self.db.add_history(self.OLD, "Deneyin sonuçları anlamlıydı", "Academic")
+        self.db.add_history(self.NEW, "Deneylerin sonuçları anlamlıydı", "Academic")
+        conn = self.db.connect()
+        with conn:
+            conn.execute("UPDATE history SET timestamp = '2020-01-01 00:00:00' WHERE original_text = ?", (self.OLD,))
+            conn.execute("UPDATE history SET timestamp = '2021-01-01 00:00:00' WHERE original_text = ?", (self.NEW,))
+        conn.close()
+        self.activations = [
+            {"ts": 1609459100, "text": self.NEW, "style": "Academic", "tier": "miss"},  # NEW eklenmeden hemen önce
+            {"ts": 1609459300, "text": self.OLD, "style": "Academic", "tier": "exact"},
+        ]
+
+    def tearDown(self):
+        self.db.hit_writer.stop()
+        remove_db_files(self.db.db_path)
+
+    def test_threshold_and_scorer_are_configurable(self):
+        query = "the results were significant"
+        self.assertIsNone(self.db.get_translation(query))
+        self.db.fuzzy_scorer = "token_set_ratio"
+        self.assertEqual(self.db.get_translation(query)["match_type"], "fuzzy")
+        with patch.dict(os.environ, {"MYTRANSLATOR_FUZZY_THRESHOLD": "99.5", "MYTRANSLATOR_FUZZY_SCORER": "nope"}):
+            db = DatabaseManager(db_name="test_fuzzy_eval.db", remote_url="", snapshot=False)
+        self.assertEqual((db.fuzzy_threshold, db.fuzzy_scorer), (99.5, "ratio"))
+        self.assertIsNone(db.get_translation("The results of the experimentz were significant"))
+        db.hit_writer.stop()
+
+    def test_replay_reports_hits_and_quality(self):
+        history = fuzzy_eval.load_history(fuzzy_eval.copy_database(self.db.db_path))
+        report = fuzzy_eval.evaluate(self.activations, history, "ratio", 90, "scan", api_latency=2.0)
+        self.assertEqual((report["cached"], report["fuzzy"], report["api_calls"]), (1, 1, 0))
+        self.assertEqual((report["saved_s"], report["judged"], report["wrong"]), (2.0, 1, 0))
+        self.assertEqual(fuzzy_eval.evaluate(self.activations, history, "ratio", 90, "length")["fuzzy"], 1)
+        strict = fuzzy_eval.evaluate(self.activations, history, "ratio", 99.5, "scan", agree=99)
+        self.assertEqual((strict["fuzzy"], strict["hit_rate"]), (0, 0.5))
+        self.assertEqual(fuzzy_eval.evaluate(self.activations, history, "ratio", 90, "scan", agree=99)["wrong"], 1)
+
+    def test_activation_log_round_trip(self):
+        import tempfile
+        path = os.path.join(tempfile.mkdtemp(), "activations.jsonl")
+        log = ActivationLog(path)
+        log.record(self.NEW, "Academic", None)
+        log.record(self.OLD, "Academic", {"translation": "x", "match_type": "fuzzy", "match_score": 95.0})
+        log.stop()
+        records = fuzzy_eval.load_activations(path)
+        self.assertEqual([(r["tier"], r["score"]) for r in records], [("miss", None), ("fuzzy", 95.0)])
+        os.remove(path)
+
+@unittest.skipUnless(NUMPY_AVAILABLE, "numpy yok")
+class TestSemanticTM(unittest.TestCase):
+    def setUp(self):
+        self.db = DatabaseManager(db_name="test_semantic.db", remote_url="", semantic=True)
+        self.db.add_history("The results clearly show a significant improvement in accuracy.", "Sonuçlar doğrulukta belirgin bir iyileşme gösteriyor.")
+        self.db.add_history("Neural networks require large amounts of training data.", "Sinir ağları büyük miktarda eğitim verisi gerektirir.")
+        self.db.catch_up_semantic(block=True)
+
+    def tearDown(self):
+        self.db.hit_writer.stop()
+        with self.db._semantic_lock:  # Arka plan catch_up dosyaları silerken yazmasın
+            remove_db_files(self.db.db_path)
+
+    def test_lookup_skips_semantic_tier_until_index_is_ready(self):
+        db = DatabaseManager(db_name="test_semantic_cold.db", remote_url="", semantic=False)
+        db.add_history("The results clearly show a significant improvement in accuracy.", "Sonuçlar doğrulukta belirgin bir iyileşme gösteriyor.")
+        release = threading.Event()
+        original = SemanticIndex.catch_up
+        db.semantic = SemanticIndex(db.db_path)
+        with patch.object(db.semantic, "catch_up", side_effect=lambda conn: release.wait(5) and original(db.semantic, conn)):
+            started = time.perf_counter()
+            self.assertIsNone(db.get_translation("A significant improvement in accuracy is clearly shown by the results."))
+            self.assertLess(time.perf_counter() - started, 1.0)  # catch_up arka planda, arama beklemez
+            release.set()
+            with db._semantic_lock:
+                pass  # Arka plan turu bitti
+        self.assertEqual(db.get_translation("A significant improvement in accuracy is clearly shown by the results.")["match_type"], "semantic")
+        db.hit_writer.stop()
+        remove_db_files(db.db_path)
+
+    def test_semantic_candidates_are_filtered_by_style(self):
+        query = "A significant improvement in accuracy is clearly shown by the results."
+        for i in range(3):  # Diğer stilde sorguya daha yakın kayıtlar global top-k'yı doldurur
+            self.db.add_history(query + " " * i, f"Casual {i}", "Casual")
+        self.db.catch_up_semantic(block=True)
+        with patch("database.db_manager.SEMANTIC_CANDIDATES", 1):
+            result = self.db.get_translation(query, "Academic")
+        self.assertEqual(result["match_type"], "semantic")
+        self.assertIn("iyileşme", result["translation"])
+
+    def test_reordered_sentence_matches_semantic_tier(self):
+        result = self.db.get_translation("A significant improvement in accuracy is clearly shown by the results.")
+        self.assertIsNotNone(result)
+        self.assertEqual(result["match_type"], "semantic")
+        self.assertIn("iyileşme", result["translation"])
+        self.assertIsNone(self.db.get_translation("Completely unrelated sentence about cooking pasta."))
+
+    def test_deleted_rows_are_skipped(self):
+        self.db.get_translation("Training data in large amounts is required by neural networks.")  # Dizin oluşur
+        conn = self.db.connect()
+        conn.execute("DELETE FROM history WHERE original_text LIKE 'Neural%'")
+        conn.commit()
+        conn.close()
+        self.assertIsNone(self.db.get_translation("Training data in large amounts is required by neural networks."))
+
+    def test_index_survives_reload(self):
+        index = SemanticIndex(self.db.db_path)
+        conn = self.db.connect()
+        self.assertEqual(index.catch_up(conn), 2)
+        index.flush()
+        self.assertEqual(SemanticIndex(self.db.db_path).catch_up(conn), 0)  # Dosyadan yüklendi
+        conn.close()
+        top_id, score = index.search("neural networks require training data", k=1)[0]
+        self.assertGreater(score, 0.5)
+        self.assertEqual(top_id, 2)
+
+
+class TestHistorySnapshot(unittest.TestCase):
+    def setUp(self):
+        self.db = DatabaseManager(db_name="test_snapshot.db", remote_url="")
+        self.db.add_history("The experiment was repeated three times.", "Deney üç kez tekrarlandı.")
+        self.db.add_history("Samples were stored at room temperature.", "Örnekler oda sıcaklığında saklandı.")
+        self.db.add_history("Samples were stored at room temperature.", "Numuneler oda sıcaklığında saklandı.", "Casual")
+
+    def tearDown(self):
+        self.db.hit_writer.stop()
+        remove_db_files(self.db.db_path)
+
+    def test_fuzzy_lookup_reads_snapshot_and_follows_updates(self):
+        result = self.db.get_translation("The experiment was repeated three time.")
+        self.assertEqual(result["match_type"], "fuzzy")
+        self.assertEqual(len(self.db.snapshot), 3)
+        token = self.db.snapshot.meta["token"]
+
+        self.db.add_history("The experiment was repeated three times.", "Deney üç defa tekrarlandı.")  # UPDATE
+        self.db.add_history("Cells were counted twice.", "Hücreler iki kez sayıldı.")
+        result = self.db.get_translation("The experiment was repeated three time.")
+        self.assertEqual(result["translation"], "Deney üç defa tekrarlandı.")
+        self.assertEqual(self.db.get_translation("Cells were counted twic.")["translation"], "Hücreler iki kez sayıldı.")
+        self.assertEqual(self.db.snapshot.meta["token"], token)  # Baştan yazılmadı, artımlı güncellendi
+        self.assertEqual(self.db.snapshot.live_rows, 4)
+
+    def test_deleted_rows_and_other_styles_are_not_served(self):
+        self.db.get_translation("Samples were stored at room temperatur.")
+        conn = self.db.connect()
+        conn.execute("DELETE FROM history WHERE style = 'Academic' AND original_text LIKE 'Samples%'")
+        conn.commit()
+        conn.close()
+        self.assertIsNone(self.db.get_translation("Samples were stored at room temperatur."))
+        casual = self.db.get_translation("Samples were stored at room temperatur.", "Casual")
+        self.assertEqual(casual["translation"], "Numuneler oda sıcaklığında saklandı.")
+
+    def test_history_view_matches_history_list(self):
+        view = self.db.get_history_view(limit=10)
+        expected = self.db.get_last_history(limit=10)
+        self.assertEqual(len(view), len(expected))
+        for item, row in zip(view, expected):
+            for field in ("id", "original_text", "translation", "style", "timestamp", "hit_count"):
+                self.assertEqual(item[field], row[field])
+
+    def test_two_processes_share_snapshot_files(self):
+        # İkinci örnek = aynı veritabanını kullanan başka bir süreç (GUI + daemon)
+        conn = self.db.connect()
+        try:
+            self.db.snapshot.refresh(conn)
+            other = HistorySnapshot(self.db.db_path)
+            token = other.meta["token"]
+            self.db.add_history("Cells were counted twice.", "Hücreler iki kez sayıldı.")
+            self.db.snapshot.refresh(conn)
+            self.db.add_history("The mixture was heated slowly.", "Karışım yavaşça ısıtıldı.")
+            other.refresh(conn)
+            self.db.snapshot.refresh(conn)
+        finally:
+            conn.close()
+        expected = {row["id"]: (row["original_text"], row["translation"]) for row in self.db.get_last_history(limit=10)}
+        self.assertEqual(other.meta["token"], token)  # Artımlı (baştan yazılmadan)
+        for snapshot in (self.db.snapshot, other):
+            reader = snapshot.reader()
+            records = [reader.record(pos) for pos in range(len(reader)) if snapshot.position(reader.row_id(pos)) == pos]
+            self.assertEqual({r["id"]: (r["original_text"], r["translation"]) for r in records}, expected)
+        self.assertEqual(self.db.get_translation("Samples were stored at room temperatur.")["translation"],
+                         "Örnekler oda sıcaklığında saklandı.")
+        self.assertEqual(self.db.get_translation("The mixture was heated slowy.")["translation"], "Karışım yavaşça ısıtıldı.")
+
+    def test_reopen_truncates_partial_append_and_detects_new_database(self):
+        conn = self.db.connect()
+        self.db.snapshot.refresh(conn)
+        with open(self.db.snapshot.keys_path, "ab") as f:
+            f.write(b"half written")  # Meta yazılmadan çökme
+        reopened = HistorySnapshot(self.db.db_path)
+        self.assertEqual(len(reopened), 3)
+        self.assertEqual(os.path.getsize(reopened.keys_path), reopened.meta["key_bytes"])
+        conn.close()
+
+        # Aynı isimle yeniden oluşturulan veritabanı eski snapshot'ı kullanmaz
+        self.db.hit_writer.stop()
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(self.db.db_path + suffix):
+                os.remove(self.db.db_path + suffix)
+        self.db = DatabaseManager(db_name="test_snapshot.db", remote_url="")
+        self.db.add_history("Brand new entry.", "Yepyeni kayıt.")
+        self.assertIsNone(self.db.get_translation("The experiment was repeated three time."))
+        self.assertEqual(len(self.db.get_history_view()), 1)
+
+
+class TestIPCServer(unittest.TestCase):
+    def setUp(self):
+        import tempfile
+        self.tmp = tempfile.mkdtemp()
+        self.produced = 0
+        self.closed = threading.Event()
+        self.release = threading.Event()
+
+        def translate(request):
+            yield from request["text"].split()
+            yield {"cached": False}
+
+        def flood(request):
+            try:
+                for _ in range(request["count"]):
+                    self.produced += 1
+                    yield "x" * 65536
+            finally:
+                self.closed.set()
+
+        def wait(request):
+            self.release.wait(5)
+            yield "ok"
+
+        def fail(request):
+            raise RuntimeError("boom")
+            yield
+
+        handlers = {"translate": translate, "flood": flood, "wait": wait, "fail": fail}
+        self.server = IPCServer(handlers, os.path.join(self.tmp, "ipc.sock")).start()
+
+    def tearDown(self):
+        import shutil
+        self.release.set()
+        self.server.stop()
+        shutil.rmtree(self.tmp)
+
+    def test_streams_chunks_and_done_frame(self):
+        with IPCClient(self.server.address, timeout=5) as client:
+            self.assertEqual(list(client.stream("translate", text="bir iki üç")), ["bir", "iki", "üç"])
+            self.assertFalse(client.last_done["cached"])
+            self.assertEqual(client.call("ping"), "")
+
+    def test_errors_keep_connection_usable(self):
+        with IPCClient(self.server.address, timeout=5) as client:
+            with self.assertRaises(IPCError):
+                client.call("nope")
+            with self.assertRaises(IPCError):
+                client.call("fail")
+            self.assertEqual(client.translate("tekrar"), "tekrar")
+
+    @unittest.skipUnless(hasattr(socket, "AF_UNIX"), "Unix soketi yok")
+    def test_unix_socket_created_private(self):
+        path = os.path.join(self.tmp, "private.sock")
+        with patch("os.umask") as umask:  # Süreç genelindeki umask'a dokunulmaz (diğer thread'ler)
+            server = IPCServer({}, path).start()
+        umask.assert_not_called()
+        self.assertEqual(os.stat(path).st_mode & 0o777, 0o600)
+        self.assertEqual(sorted(os.listdir(self.tmp)), ["ipc.sock", "private.sock"])  # Geçici dizin kalmaz
+        with IPCClient(path, timeout=5) as client:
+            self.assertEqual(client.call("ping"), "")
+        server.stop()
+
+    def test_rejects_non_loopback_tcp(self):
+        with self.assertRaises(IPCError):
+            IPCServer({}, ("0.0.0.0", 0))
+
+    def test_concurrent_clients_over_tcp(self):
+        server = IPCServer({"wait": self.server.handlers["wait"]}, ("127.0.0.1", 0)).start()
+        try:
+            results = []
+            def worker():
+                with IPCClient(server.address, timeout=5) as client:
+                    results.append(client.call("wait"))
+            threads = [threading.Thread(target=worker) for _ in range(3)]
+            for t in threads:
+                t.start()
+            time.sleep(0.1)
+            self.assertEqual(results, [])  # Hepsi aynı anda bekliyor
+            self.release.set()
+            for t in threads:
+                t.join(5)
+            self.assertEqual(results, ["ok"] * 3)
+        finally:
+            server.stop()
+
+    def test_slow_reader_backpressures_and_disconnect_closes_producer(self):
+        client = IPCClient(self.server.address, timeout=5)
+        stream = client.stream("flood", count=1000)
+        next(stream)
+        time.sleep(0.2)
+        self.assertLess(self.produced, 200)  # Okunmayan veri soket tamponunu doldurunca üretim durur
+        client.close()
+        self.assertTrue(self.closed.wait(5))
+        self.assertLess(self.produced, 1000)
+
+
+class TestTranslationEngine(unittest.TestCase):
+    def setUp(self):
+        self.db = DatabaseManager(db_name="test_engine.db", remote_url="")
+        self.api = mock_api("m1", "p1", styles=("Academic", "Casual"))
+        self.api.humanize_prompt_hash = "h1"
+        self.engine = TranslationEngine(self.api, self.db, JobScheduler(workers=1, reserved=0), warmup=False)
+
+    def tearDown(self):
+        self.engine.stop()
+        remove_db_files(self.db.db_path)
+
+    def test_stream_translation_stores_then_serves_from_cache(self):
+        self.api.translate_text_stream.return_value = iter(["Mer", "haba"])
+        self.assertEqual(list(self.engine.stream_translation("Hello")), ["Mer", "haba", {"cached": False}])
+        self.assertEqual(list(self.engine.stream_translation("Hello")),
+                         ["Merhaba", {"cached": True, "match_type": "exact"}])
+        self.api.translate_text_stream.assert_called_once()
+
+    def test_builtin_style_prompts_are_not_persisted(self):
+        # Eski sürümün DB'ye kopyaladığı hazır prompt + kullanıcının özelleştirdiği profil
+        self.db.save_style_profiles([{"name": "Academic", "system_prompt": BUILTIN_STYLE_PROMPTS["Academic"]},
+                                     {"name": "Mine", "system_prompt": "Custom"}])
+        self.engine.reload_styles()
+        stored = {p["name"]: p["system_prompt"] for p in self.db.get_style_profiles()}
+        self.assertIsNone(stored["Academic"])
+        self.assertEqual(stored["Mine"], "Custom")
+        self.assertTrue(self.engine.save_style({"name": "Casual", "system_prompt": BUILTIN_STYLE_PROMPTS["Casual"]}))
+        self.assertIsNone({p["name"]: p["system_prompt"] for p in self.db.get_style_profiles()}["Casual"])
+
+    def test_styles_partition_cache(self):
+        self.api.translate_text_stream.side_effect = lambda text, partial="", style=None: iter([f"{style}:{text}"])
+        self.assertEqual("".join(self.engine.translate_stream("Hello", "Casual")), "Casual:Hello")
+        self.assertIsNone(self.engine.lookup_cache("Hello", "Academic"))
+        self.assertEqual(self.engine.lookup_cache("Hello", "Casual")["translation"], "Casual:Hello")
+        cached = self.db.get_translation("Hello", "Casual", model="m1", prompt_hash="p1-Casual")
+        self.assertFalse(cached["stale"])
+        frames = list(self.engine.ipc_handlers()["styles"]({}))
+        self.assertEqual(frames, [{"styles": ["Academic", "Casual"], "default": "Academic"}])
+
+    def test_humanize_new_variant_feeds_rotation(self):
+        self.api.humanize_text_stream.side_effect = [iter(["Varyant 1"]), iter(["Varyant 2"])]
+        self.assertEqual(list(self.engine.stream_humanize("Kaynak", "Metin")), ["Varyant 1", {"cached": False}])
+        self.assertEqual(list(self.engine.stream_humanize("Kaynak", "Metin", force_new=True)), ["Varyant 2", {"cached": False}])
+        served = {self.engine.humanize_cached("Kaynak", "Metin") for _ in range(2)}
+        self.assertEqual(served, {"Varyant 1", "Varyant 2"})
+        self.assertEqual(self.api.humanize_text_stream.call_count, 2)
+
+    def test_translate_batch_op(self):
+        self.db.add_history("Hello", "Merhaba", "Academic", model="m1", prompt_hash="p1")
+        self.api.translate_batch.return_value = ["Dünya"]
+        frames = list(self.engine.ipc_handlers()["translate_batch"]({"texts": ["Hello", "World"]}))
+        self.assertEqual(frames, [{"translations": ["Merhaba", "Dünya"]}])
+        self.api.translate_batch.assert_called_once_with(["World"], style="Academic")
+
+    def test_retranslate_edit_only_sends_changed_sentences(self):
+        old = "Hello world. This is a test. Last sentence."
+        translation = "Merhaba dünya. Bu bir test. Son cümle."
+        self.api.translate_batch.return_value = ["Bu büyük bir test."]
+        patches, new_translation = self.engine.retranslate_edit(old, "Hello world. This is a big test. Last sentence.", translation)
+        self.api.translate_batch.assert_called_once_with(["This is a big test."], style="Academic")
+        self.assertEqual(new_translation, "Merhaba dünya. Bu büyük bir test. Son cümle.")
+        self.assertEqual(apply_patches(translation, patches), new_translation)
+        cached = self.db.get_translation("Hello world. This is a big test. Last sentence.", model="m1", prompt_hash="p1")
+        self.assertEqual(cached["translation"], new_translation)
+
+    def test_daemon_does_not_import_gui(self):
+        import subprocess
+        root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+        code = "import sys, daemon, core.engine; print(any(m.split('.')[0] in ('PyQt6', 'pynput') for m in sys.modules))"
+        result = subprocess.run([sys.executable, "-c", code], cwd=root, capture_output=True, text=True, timeout=60)
+        self.assertEqual(result.stdout.strip(), "False", result.stderr)
+
+
+class TestJobJournal(unittest.TestCase):
+    def setUp(self):
+        self.db = DatabaseManager(db_name="test_journal.db", remote_url="")
+        self.api = mock_api("m1", "p1")
+        self.engine = TranslationEngine(self.api, self.db, JobScheduler(workers=1, reserved=0), warmup=False)
+
+    def tearDown(self):
+        self.engine.stop()
+        remove_db_files(self.db.db_path)
+
+    def interrupted_job(self):
+        """Yarıda kesilen stream + yeniden başlatma (yeni DatabaseManager)."""
+        self.api.translate_text_stream.return_value = iter(["Merhaba ", "güzel ", "[kesildi]"])
+        stream = self.engine.translate_stream("Hello beautiful world", "Academic")
+        self.assertEqual([next(stream), next(stream)], ["Merhaba ", "güzel "])
+        stream.close()
+        self.db.journal.stop()
+        return DatabaseManager(db_name="test_journal.db", remote_url="")
+
+    def count_rows(self):
+        conn = self.db.connect()
+        try:
+            return conn.execute('SELECT (SELECT COUNT(*) FROM job_journal) + (SELECT COUNT(*) FROM job_chunks)').fetchone()[0]
+        finally:
+            conn.close()
+
+    def test_finished_job_leaves_no_rows(self):
+        self.api.translate_text_stream.return_value = iter(["Mer", "haba"])
+        self.assertEqual("".join(self.engine.translate_stream("Hello")), "Merhaba")
+        self.assertEqual(self.db.journal.incomplete(), [])
+        self.assertEqual(self.count_rows(), 0)
+        self.assertEqual(self.db.get_translation("Hello", model="m1", prompt_hash="p1")["translation"], "Merhaba")
+
+    def test_partial_survives_restart_and_resumes_in_background(self):
+        restarted = self.interrupted_job()
+        jobs = restarted.journal.incomplete()
+        self.assertEqual([(job["source_text"], job["partial"]) for job in jobs], [("Hello beautiful world", "Merhaba güzel ")])
+
+        self.api.translate_text_stream.return_value = iter(["dünya"])
+        engine = TranslationEngine(self.api, restarted, JobScheduler(workers=1, reserved=0), warmup=False)
+        self.assertEqual(engine.resume_jobs(), 1)
+        self.api.translate_text_stream.assert_called_with("Hello beautiful world", "Merhaba güzel ", style="Academic")
+        self.assertEqual(restarted.get_translation("Hello beautiful world", model="m1", prompt_hash="p1")["translation"],
+                         "Merhaba güzel dünya")
+        engine.stop()
+        self.assertEqual(self.count_rows(), 0)
+
+    def test_fuzzy_neighbour_does_not_cancel_resume(self):
+        restarted = self.interrupted_job()
+        restarted.add_history("Hello beautiful world!", "Merhaba güzel dünya!", model="m1", prompt_hash="p1")
+        self.api.translate_text_stream.return_value = iter(["dünya"])
+        engine = TranslationEngine(self.api, restarted, JobScheduler(workers=1, reserved=0), warmup=False)
+        with patch.object(restarted, "record_hit") as record_hit:
+            self.assertEqual(engine.resume_jobs(), 1)  # Benzer kayıt işi düşürmez
+        record_hit.assert_not_called()
+        engine.stop()
+
+    def test_same_text_continues_from_partial(self):
+        restarted = self.interrupted_job()
+        engine = TranslationEngine(self.api, restarted, JobScheduler(workers=1, reserved=0), warmup=False)
+        self.api.translate_text_stream.return_value = iter(["dünya"])
+        self.assertEqual(list(engine.translate_stream("Hello beautiful world")), ["Merhaba güzel ", "dünya"])
+        engine.stop()
+        self.assertEqual(restarted.journal.incomplete(), [])
+
+
+class TestEditDiff(unittest.TestCase):
+    OLD = "Hello world. This is a test! Last sentence."
+    TRANSLATION = "Merhaba dünya. Bu bir test! Son cümle."
+
+    def patch(self, new_source, translations):
+        plan = plan_edit(self.OLD, new_source, self.TRANSLATION)
+        patches = [(start, end, " ".join(translations.get(s, s) if s else "" for s in group)) for start, end, group in plan]
+        return plan, apply_patches(self.TRANSLATION, patches)
+
+    def test_pieces_round_trip(self):
+        text = "Bir.  İki!\nÜç… dört"
+        self.assertEqual("".join(sentence_pieces(text)), text)
+        self.assertEqual(len(sentence_pieces(text)), 4)
+
+    def test_replace_insert_delete(self):
+        plan, result = self.patch("Hello world. This is a big test! Last sentence.", {"This is a big test!": "Bu büyük bir test!"})
+        self.assertEqual([group for _, _, group in plan], [["This is a big test!"]])
+        self.assertEqual(result, "Merhaba dünya. Bu büyük bir test! Son cümle.")
+        self.assertEqual(self.patch("Start. " + self.OLD, {"Start.": "Başla."})[1], "Başla. " + self.TRANSLATION)
+        self.assertEqual(self.patch(self.OLD + " New.", {"New.": "Yeni."})[1], self.TRANSLATION + " Yeni.")
+        self.assertEqual(self.patch("Hello world. Last sentence.", {})[1], "Merhaba dünya. Son cümle.")
+        self.assertEqual(self.patch("Hello world. This is a test!", {})[1], "Merhaba dünya. Bu bir test!")
+
+    def test_patches_are_back_to_front(self):
+        plan = plan_edit(self.OLD, "Hi world. This is a test! Final sentence.", self.TRANSLATION)
+        self.assertEqual(len(plan), 2)
+        self.assertGreater(plan[0][0], plan[1][0])
+
+    def test_unaligned_translation_falls_back_to_full(self):
+        plan = plan_edit(self.OLD, "Hello world. Changed.", "Tek parça çeviri")
+        self.assertEqual(plan, [(0, len("Tek parça çeviri"), ["Hello world.", "Changed."])])
+
+    def test_utf16_offset(self):
+        self.assertEqual(utf16_offset("a😀b", 2), 3)
+
+
+class TestSharedTM(unittest.TestCase):
+    def setUp(self):
+        self.server = TMServer(DatabaseManager("test_tm_server.db", remote_url="")).start()
+        self.db = DatabaseManager("test_tm_client.db", remote_url=self.server.url)
+
+    def tearDown(self):
+        self.db.remote_writer.stop()
+        self.server.stop()
+        for path in (self.db.db_path, self.server.db.db_path):
+            remove_db_files(path)
+
+    def test_read_through_caches_locally(self):
+        self.server.db.add_history("Shared sentence", "Paylaşılan cümle", "Academic", model="m1", prompt_hash="p1")
+        result = self.db.get_translation("Shared sentence", model="m1", prompt_hash="p1")
+        self.assertEqual(result["translation"], "Paylaşılan cümle")
+        self.assertEqual(result["source"], "remote")
+        self.assertFalse(result["stale"])
+        conn = self.db.remote._conns["lookup"]
+        self.assertIsNone(self.db.get_translation("Never seen anywhere"))
+        self.assertIs(self.db.remote._conns["lookup"], conn)  # Bağlantı yeniden kullanılır (keep-alive)
+
+        self.server.stop()
+        local = self.db.get_translation("Shared sentence", model="m1", prompt_hash="p1")
+        self.assertNotIn("source", local)  # Artık yerel önbellekten
+        self.server = TMServer(self.server.db).start()  # tearDown için
+
+    def test_write_behind_batches_upserts(self):
+        for i in range(3):
+            self.db.add_history(f"Local {i} text", f"Yerel {i}", "Academic", model="m1", prompt_hash="p1")
+        self.assertTrue(self.db.remote_writer.flush())
+        self.assertEqual(self.server.db.get_translation("Local 2 text")["translation"], "Yerel 2")
+        self.assertEqual(self.db.remote_writer.pending(), 0)
+
+    def test_dead_server_is_skipped_after_first_failure(self):
+        hung = socket.socket()  # Bağlantıyı kabul eder (backlog) ama hiç cevap vermez
+        hung.bind(("127.0.0.1", 0))
+        hung.listen(8)
+        client = RemoteTMClient(f"127.0.0.1:{hung.getsockname()[1]}", token="", lookup_timeout=0.2)
+        try:
+            started = time.perf_counter()
+            self.assertIsNone(client.lookup("Anything"))
+            self.assertLess(time.perf_counter() - started, 1.0)  # Tek kısa zaman aşımı, tekrar deneme yok
+            self.assertFalse(client.is_healthy())
+            started = time.perf_counter()
+            self.assertIsNone(client.lookup("Anything else"))
+            self.assertFalse(client.upsert_many([{"original_text": "a", "translation": "b"}]))
+            self.assertLess(time.perf_counter() - started, 0.05)  # Cooldown boyunca sunucuya gidilmez
+        finally:
+            client.close()
+            hung.close()
+
+    def test_token_required_for_every_request(self):
+        server = TMServer(self.server.db, token="s3cret").start()
+        try:
+            self.assertFalse(RemoteTMClient(server.url, token="").upsert_many([{"original_text": "Poison", "translation": "Zehir"}]))
+            self.assertFalse(RemoteTMClient(server.url, token="wrong").upsert_many([{"original_text": "Poison", "translation": "Zehir"}]))
+            self.assertIsNone(self.server.db.get_translation("Poison"))
+            client = RemoteTMClient(server.url, token="s3cret")
+            self.assertTrue(client.upsert_many([{"original_text": "Trusted", "translation": "Güvenilir"}]))
+            self.assertEqual(client.lookup("Trusted")["translation"], "Güvenilir")
+            client.close()
+        finally:
+            server.stop()
+        with self.assertRaises(ValueError):
+            TMServer(self.server.db, host="0.0.0.0", token="")
+
+    def test_write_behind_retries_after_failure(self):
+        results = [False, True]
+        flushed = []
+        buffer = WriteBehindBuffer(lambda items: flushed.extend(items) or results.pop(0), interval=60)
+        buffer.add("a")
+        buffer.add("b")
+        self.assertFalse(buffer.flush())
+        self.assertEqual(buffer.pending(), 2)
+        self.assertTrue(buffer.flush())
+        self.assertEqual(flushed, ["a", "b", "a", "b"])
+        buffer.stop()
+
+
+class TestStaleRevalidator(unittest.TestCase):
+    def setUp(self):
+        self.db = DatabaseManager(db_name="test_revalidator.db")
+        self.api = mock_api("m2", "p2")
+
+    def tearDown(self):
+        remove_db_files(self.db.db_path)
+
+    def test_revalidate_upgrades_entry(self):
+        self.db.add_history("Hello", "Merhaba", "Academic", model="m1", prompt_hash="p1")
+        self.api.translate_text_stream.return_value = iter(["Selam"])
+        revalidator = StaleRevalidator(self.api, self.db)
+        self.assertTrue(revalidator.revalidate("Hello", "Academic"))
+        result = self.db.get_translation("Hello", "Academic", model="m2", prompt_hash="p2")
+        self.assertEqual(result['translation'], "Selam")
+        self.assertFalse(result['stale'])
+
+    def test_failed_revalidation_keeps_old_entry(self):
+        self.db.add_history("Hello", "Merhaba", "Academic", model="m1", prompt_hash="p1")
+        self.api.translate_text_stream.return_value = iter([" [Hata: timeout]"])
+        revalidator = StaleRevalidator(self.api, self.db)
+        self.assertFalse(revalidator.revalidate("Hello", "Academic"))
+        self.assertEqual(self.db.get_translation("Hello", "Academic")['translation'], "Merhaba")
+
+class TestDocumentTranslator(unittest.TestCase):
+    def setUp(self):
+        import tempfile
+        self.tmp = tempfile.mkdtemp()
+        self.db = DatabaseManager(db_name="test_documents.db")
+        self.api = mock_api("m", "p")
+        self.api.translate_text_stream.side_effect = lambda text, style=None: iter(["TR:", text])
+        self.scheduler = JobScheduler(workers=2, reserved=0)
+
+    def tearDown(self):
+        import shutil
+        self.scheduler.stop()
+        shutil.rmtree(self.tmp)
+        remove_db_files(self.db.db_path)
+
+    def path(self, name):
+        return os.path.join(self.tmp, name)
+
+    def test_readers(self):
+        import zipfile
+        with open(self.path("a.txt"), "w", encoding="utf-8") as f:
+            f.write("First para-\ngraph line\n\n\nSecond\n")
+        self.assertEqual(list(iter_paragraphs(self.path("a.txt"))), ["First paragraph line", "Second"])
+
+        body = ('<w:document xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main"><w:body>'
+                '<w:p><w:r><w:t>Hello </w:t></w:r><w:r><w:t>world</w:t></w:r></w:p><w:p/>'
+                '<w:p><w:r><w:t>Again</w:t></w:r></w:p></w:body></w:document>')
+        with zipfile.ZipFile(self.path("a.docx"), "w") as archive:
+            archive.writestr("word/document.xml", body)
+        self.assertEqual(list(iter_paragraphs(self.path("a.docx"))), ["Hello world", "Again"])
+
+    def test_large_docx_streams_with_bounded_tree(self):
+        import zipfile
+        import core.documents
+        row = '<w:tr><w:tc><w:p><w:r><w:t>Cell {0}</w:t></w:r></w:p></w:tc></w:tr>'
+        chunks = ['<w:document xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main"><w:body>']
+        for i in range(3000):
+            chunks.append(f'<w:p><w:r><w:t>Paragraph {i}</w:t></w:r></w:p><w:bookmarkStart w:id="{i}"/>')
+            if i % 100 == 0:
+                chunks.append('<w:tbl>' + ''.join(row.format(f"{i}.{j}") for j in range(3)) + '</w:tbl>')
+        chunks.append('<w:sectPr><w:pgSz w:w="11906"/></w:sectPr></w:body></w:document>')
+        with zipfile.ZipFile(self.path("big.docx"), "w") as archive:
+            archive.writestr("word/document.xml", "".join(chunks))
+
+        roots, sizes = [], []
+        real_iterparse = core.documents.iterparse
+        def tracking_iterparse(source, events):
+            for event, element in real_iterparse(source, ("start", "end")):
+                if not roots:
+                    roots.append(element)  # İlk "start": <w:document>
+                if event in events:
+                    yield event, element
+        with patch.object(core.documents, "iterparse", tracking_iterparse):
+            paragraphs = []
+            for text in iter_paragraphs(self.path("big.docx")):
+                paragraphs.append(text)
+                sizes.append(sum(1 for _ in roots[0].iter()))
+        self.assertEqual(len(paragraphs), 3000 + 30 * 3)
+        self.assertEqual(paragraphs[:3], ["Paragraph 0", "Cell 0.0", "Cell 0.1"])
+        # ~16k öğelik belge; ağaçta yalnızca ayrıştırıcının okuma tamponu kadar öğe kalır
+        self.assertLess(max(sizes), 2000)
+        self.assertLessEqual(max(sizes[-500:]), max(sizes[:500]) + 100)
+
+    def test_pdf_without_pypdf_raises(self):
+        import core.documents
+        with patch.object(core.documents, "PdfReader", None):
+            with self.assertRaises(ImportError):
+                iter_paragraphs(self.path("a.pdf"))
+
+    def test_translate_file_in_order_and_resume(self):
+        with open(self.path("doc.txt"), "w", encoding="utf-8") as f:
+            f.write("\n\n".join(["Alpha beta", "Gamma delta", "Epsilon zeta", "Theta iota", "Kappa lambda"]))
+        out = self.path("doc.tsv")
+        # Yarıda kalmış çalışma: 2 tamamlanmış satır + yarım satır
+        with open(out, "w", encoding="utf-8") as f:
+            f.write("0\tAlpha beta\tTR:Alpha beta\n1\tGamma delta\tTR:Gamma delta\n2\tEps")
+
+        translator = DocumentTranslator(self.api, self.db, self.scheduler, concurrency=2)
+        self.assertEqual(translator.translate_file(self.path("doc.txt"), out), 5)
+
+        with open(out, encoding="utf-8") as f:
+            rows = [line.rstrip("\n").split("\t") for line in f]
+        self.assertEqual([int(r[0]) for r in rows], [0, 1, 2, 3, 4])
+        self.assertEqual(rows[4], ["4", "Kappa lambda", "TR:Kappa lambda"])
+        self.assertEqual(self.api.translate_text_stream.call_count, 3)  # Sadece eksik paragraflar
+        self.assertEqual(count_completed_rows(out), 5)
+
+    def test_failure_stops_at_last_completed_paragraph(self):
+        with open(self.path("doc.txt"), "w", encoding="utf-8") as f:
+            f.write("ok one\n\nbad\n\nok two")
+        self.api.translate_text_stream.side_effect = (
+            lambda text, style=None: iter([" [Hata: 500]"] if text == "bad" else ["TR:", text]))
+        translator = DocumentTranslator(self.api, self.db, self.scheduler, concurrency=1)
+        self.assertEqual(translator.translate_file(self.path("doc.txt"), self.path("doc.tsv")), 1)
+        self.assertEqual(count_completed_rows(self.path("doc.tsv")), 1)
+
+
+class TestTokenBudget(unittest.TestCase):
+    def test_budget_scales_with_input(self):
+        short = output_token_budget("Hello world.")
+        long = output_token_budget("Hello world. " * 400)
+        self.assertLess(short, 256)
+        self.assertGreater(long, 2048)
+
+    def test_turkish_detection(self):
+        self.assertTrue(is_turkish("Yapay zekâ hızla gelişiyor ve çok güçlü."))
+        self.assertFalse(is_turkish("Artificial intelligence is evolving rapidly."))
+
+    def test_split_keeps_parts_within_budget(self):
+        text = "This is a sentence. " * 200
+        parts = split_for_budget(text, 100)
+        self.assertGreater(len(parts), 1)
+        self.assertTrue(all(estimate_tokens(p) <= 100 for p in parts))
+        self.assertEqual(" ".join(parts), text.strip())
+
+class TestProfiler(unittest.TestCase):
+    def setUp(self):
+        import tempfile
+        self.tmp = tempfile.mkdtemp()
+        self.stop = threading.Event()
+
+    def tearDown(self):
+        import shutil
+        self.stop.set()
+        shutil.rmtree(self.tmp)
+
+    def busy_loop(self):
+        while not self.stop.is_set():
+            sum(range(1000))
+
+    def test_samples_all_threads_to_folded_file(self):
+        import tracemalloc
+        threading.Thread(target=self.busy_loop, daemon=True, name="BusyWorker").start()
+        profiler = SamplingProfiler(output_dir=self.tmp, interval=0.002)
+        self.assertTrue(profiler.start(0.3, memory=True))
+        self.assertFalse(profiler.start(1))  # Tek oturum
+        result = profiler.wait(timeout=10)
+        self.assertGreater(result["samples"], 0)
+        with open(result["folded"], encoding="utf-8") as f:
+            lines = f.read().splitlines()
+        busy = [line for line in lines if line.startswith("BusyWorker;")]
+        self.assertTrue(busy and all("TestProfiler.busy_loop" in line for line in busy))
+        self.assertTrue(all(line.rsplit(" ", 1)[1].isdigit() for line in lines))
+        self.assertTrue(os.path.exists(result["memory"]))
+        self.assertFalse(tracemalloc.is_tracing())  # Profiler başlattıysa kapatır
+
+    def test_fold_stack_root_first(self):
+        def inner():
+            return fold_stack(sys._getframe(), "Main")
+        stack = inner().split(";")
+        self.assertEqual(stack[0], "Main")
+        self.assertTrue(stack[-1].endswith("inner"))
+
+class TestMetrics(unittest.TestCase):
+    def test_prometheus_and_json_output(self):
+        registry = MetricsRegistry()
+        registry.counter("t_hits_total", "Hits").inc(tier="exact")
+        registry.histogram("t_latency_seconds", "Latency", buckets=(0.1, 1.0)).observe(0.5)
+        text = registry.render_prometheus()
+        self.assertIn('t_hits_total{tier="exact"} 1', text)
+        self.assertIn('t_latency_seconds_bucket{le="1.0"} 1', text)
+        self.assertIn('t_latency_seconds_count 1', text)
+        self.assertEqual(registry.snapshot()["t_hits_total"]["values"], {'{tier="exact"}': 1})
+
+    def test_metrics_server_serves_localhost(self):
+        from urllib.request import urlopen
+        registry = MetricsRegistry()
+        registry.counter("t_requests_total", "Requests").inc()
+        server = MetricsServer(port=0, registry=registry).start()
+        try:
+            body = urlopen(f"http://127.0.0.1:{server.port}/metrics").read().decode()
+            self.assertIn("t_requests_total 1", body)
+            snapshot = json.loads(urlopen(f"http://127.0.0.1:{server.port}/metrics.json").read())
+            self.assertIn("t_requests_total", snapshot)
+        finally:
+            server.stop()
+
+class TestLoggingSetup(unittest.TestCase):
+    def setUp(self):
+        import logging, tempfile
+        self.root = logging.getLogger()
+        self.saved = (list(self.root.handlers), self.root.level)
+        self.tmpdir = tempfile.mkdtemp()
+        self.log_path = os.path.join(self.tmpdir, "test.log")
+
+    def tearDown(self):
+        import shutil
+        self.root.handlers[:] = self.saved[0]
+        self.root.setLevel(self.saved[1])
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+    def test_json_lines_and_module_levels(self):
+        import logging
+        with patch.dict(os.environ, {"MYTRANSLATOR_LOG_LEVELS": "test.quiet=WARNING"}):
+            listener = setup_logging(self.log_path, console=False)
+        logging.getLogger("test.loud").info("görünür")
+        logging.getLogger("test.quiet").info("gizli")
+        listener.stop()
+        listener.stop()  # atexit kancası tekrar durdurur: Hata vermemeli
+        logging.getLogger("test.quiet").setLevel(logging.NOTSET)
+        with open(self.log_path, encoding="utf-8") as f:
+            entries = [json.loads(line) for line in f]
+        self.assertEqual([e["msg"] for e in entries], ["görünür"])
+        self.assertEqual(entries[0]["logger"], "test.loud")
+
+    def test_parse_module_levels(self):
+        self.assertEqual(parse_module_levels("a=DEBUG, b.c=error,bad"), {"a": 10, "b.c": 40})
+        self.assertEqual(parse_module_levels("a=Level 5,b=notset,c=WARN"), {"b": 0, "c": 30})
+
+class TestJobScheduler(unittest.TestCase):
+    def setUp(self):
+        self.scheduler = JobScheduler(workers=1, reserved=0)
+
+    def tearDown(self):
+        self.scheduler.stop()
+
+    def test_interactive_runs_before_background(self):
+        import threading
+        gate = threading.Event()
+        order = []
+        self.scheduler.submit(gate.wait, priority=PRIORITY_BACKGROUND)  # Tek worker'ı meşgul et
+        jobs = [self.scheduler.submit(order.append, "background", priority=PRIORITY_BACKGROUND),
+                self.scheduler.submit(order.append, "interactive", priority=PRIORITY_INTERACTIVE)]
+        gate.set()
+        for job in jobs:
+            self.assertTrue(job.wait(2))
+        self.assertEqual(order, ["interactive", "background"])
+
+    def test_deadline_and_cancel(self):
+        import threading
+        gate = threading.Event()
+        ran = []
+        self.scheduler.submit(gate.wait)
+        expired = self.scheduler.submit(ran.append, "expired", deadline=0.01)
+        cancelled = self.scheduler.submit(ran.append, "cancelled")
+        cancelled.cancel()
+        time.sleep(0.05)
+        gate.set()
+        self.assertTrue(expired.wait(2) and cancelled.wait(2))
+        self.assertEqual(ran, [])
+
+    def test_running_job_can_be_cancelled(self):
+        import threading
+        started = threading.Event()
+        def long_job():
+            started.set()
+            while True:
+                raise_if_cancelled()
+                time.sleep(0.005)
+        job = self.scheduler.submit(long_job)
+        self.assertTrue(started.wait(2))
+        job.cancel()
+        self.assertTrue(job.wait(2))
+        self.assertIsNone(job.error)
+
+    def test_reserved_worker_skips_background(self):
+        import threading
+        scheduler = JobScheduler(workers=2, reserved=1)
+        gate = threading.Event()
+        try:
+            scheduler.submit(gate.wait, priority=PRIORITY_BACKGROUND)
+            scheduler.submit(gate.wait, priority=PRIORITY_BACKGROUND)
+            interactive = scheduler.submit(lambda: "ok", priority=PRIORITY_INTERACTIVE)
+            self.assertTrue(interactive.wait(2))  # Arka plan işleri havuzu tıkasa da çalışır
+            self.assertEqual(interactive.result, "ok")
+        finally:
+            gate.set()
+            scheduler.stop()
+
+    def test_stop_joins_workers_and_does_not_restart(self):
+        import threading
+        self.scheduler.submit(lambda: None).wait(2)
+        threads = list(self.scheduler._threads)
+        self.scheduler.stop()
+        self.assertFalse(any(thread.is_alive() for thread in threads))
+        job = self.scheduler.submit(lambda: "late")
+        self.assertTrue(job.done() and job.cancelled)  # Durdurulmuş havuz kendiliğinden kurulmaz
+        self.assertFalse(self.scheduler.running)
+
+        # Restart: join'i aşan eski worker işini bitirince çıkar, yeni havuza karışmaz
+        gate = threading.Event()
+        scheduler = JobScheduler(workers=1, reserved=0, name="RestartTest").start()
+        slow = scheduler.submit(gate.wait, 5)
+        time.sleep(0.05)
+        scheduler.stop(timeout=0.05)
+        scheduler.start()
+        gate.set()
+        self.assertTrue(slow.wait(2))
+        time.sleep(0.05)
+        workers = [t for t in threading.enumerate() if t.name == "RestartTest-0"]
+        self.assertEqual(len(workers), 1)
+        scheduler.stop()
+
+    def test_pending_counts_delayed_jobs(self):
+        self.scheduler.submit_later(60, lambda: None)
+        self.assertEqual(self.scheduler.pending(), 1)
+
+    def test_submit_later_and_queue_wait_metric(self):
+        before = QUEUE_WAIT_SECONDS.count(priority="prefetch")
+        job = self.scheduler.submit_later(0.02, lambda: "late", priority=2)
+        self.assertTrue(job.wait(2))
+        self.assertEqual(job.result, "late")
+        self.assertEqual(QUEUE_WAIT_SECONDS.count(priority="prefetch"), before + 1)
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestHotkeyEngine(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.engine = HotkeyEngine(clock=self.clock)
+
+    def feed(self, events):
+        """events: ('+cmd', '+c', '-c', 0.1 (saniye ilerlet), ...) -> aktivasyon sayısı"""
+        activations = 0
+        for event in events:
+            if isinstance(event, float):
+                self.clock.now += event
+            elif event.startswith("+"):
+                activations += self.engine.press(event[1:])
+            else:
+                self.engine.release(event[1:])
+        return activations
+
+    def test_cmd_c_c_activates_once(self):
+        self.assertEqual(self.feed(["+cmd", "+c", "-c", 0.1, "+c", "-c", "-cmd"]), 1)
+        self.assertEqual(self.engine.activations.qsize(), 1)
+
+    def test_typing_without_cmd_never_activates(self):
+        self.assertEqual(self.feed(["+c", "-c", 0.1, "+c", "-c", 0.1, "+c", "-c"]), 0)
+
+    def test_auto_repeat_and_bounce_ignored(self):
+        # Basılı tutulan 'c' (release yok) ve 5ms'lik sıçrama aktivasyon değildir
+        self.assertEqual(self.feed(["+cmd", "+c", 0.05, "+c", 0.05, "+c"]), 0)
+        self.assertEqual(self.feed(["-c", 0.005, "+c", "-c", "-cmd"]), 0)
+
+    def test_slow_or_interrupted_sequence_resets(self):
+        self.assertEqual(self.feed(["+cmd", "+c", "-c", 0.6, "+c", "-c", "-cmd"]), 0)
+        self.assertEqual(self.feed([1.0, "+cmd", "+c", "-c", "+v", "-v", 0.1, "+c", "-c", "-cmd"]), 0)
+        self.assertEqual(self.feed([1.0, "+cmd", "+c", "-c", "-cmd", 0.1, "+cmd", "+c", "-c", "-cmd"]), 0)
+
+    def test_dispatcher_coalesces_pending_activations(self):
+        calls = []
+        for _ in range(3):
+            self.engine.activations.put(self.clock())
+        dispatcher = ActivationDispatcher(self.engine.activations, lambda: calls.append(1))
+        dispatcher.start()
+        dispatcher.stop()
+        self.assertEqual(calls, [1])
+
+
+class FakeBackend(TranslationBackend):
+    """Ağ kullanmayan sahte backend: İlk token öncesi gecikme ve hata simülasyonu."""
+    def __init__(self, name, chunks, delay=0.0, error=None):
+        self.name = name
+        self.chunks = chunks
+        self.delay = delay
+        self.error = error
+        self.calls = 0
+
+    def stream(self, contents, config):
+        self.calls += 1
+        time.sleep(self.delay)
+        if self.error:
+            raise self.error
+        for text in self.chunks:
+            yield MagicMock(text=text)
+
+class TestBackendRouter(unittest.TestCase):
+    def collect(self, router):
+        return "".join(chunk.text for chunk in router.stream("Test", None))
+
+    def test_backend_without_stream_cannot_be_instantiated(self):
+        class Incomplete(TranslationBackend):
+            pass
+        with self.assertRaises(TypeError):
+            Incomplete()
+
+    def test_routes_to_fastest_backend(self):
+        # Gecikme farkı tam GC duraklamasından (~50ms) büyük olmalı
+        slow = FakeBackend("slow", ["Yavaş"], delay=0.2)
+        fast = FakeBackend("fast", ["Hızlı"])
+        router = BackendRouter([slow, fast])
+        self.collect(router)
+        self.collect(router)
+        self.assertEqual(router.ranked()[0], fast)
+        self.assertEqual(self.collect(router), "Hızlı")
+
+    def test_falls_back_on_error_before_first_token(self):
+        broken = FakeBackend("broken", [], error=RuntimeError("503"))
+        healthy = FakeBackend("healthy", ["Tamam"])
+        router = BackendRouter([broken, healthy], max_errors=1)
+        self.assertEqual(self.collect(router), "Tamam")
+        self.assertFalse(router.stats_for(broken).is_healthy())
+        self.assertEqual(router.ranked(), [healthy])
+
+    def test_hedges_slow_primary(self):
+        slow = FakeBackend("slow", ["Yavaş"], delay=0.5)
+        fast = FakeBackend("fast", ["Hızlı"])
+        router = BackendRouter([slow, fast], hedge=True, default_ttft=0.05, min_hedge_delay=0.05)
+        router.stats_for(fast).record_ttft(1.0)  # İlk tercih 'slow' olsun
+        self.assertEqual(self.collect(router), "Hızlı")
+        self.assertEqual(fast.calls, 1)
+
 class TestAPIService(unittest.TestCase):
     def setUp(self):
         # Mock API Key to bypass check
@@ -60,5 +1346,74 @@ class TestAPIService(unittest.TestCase):
         
         self.assertEqual("".join(chunks), "Deneme")
 
+    def test_truncated_output_is_continued(self):
+        from google.genai import types
+        class TruncatingBackend(TranslationBackend):
+            name = "truncating"
+            def __init__(self):
+                self.requests = []
+            def stream(self, contents, config):
+                self.requests.append((contents, config.max_output_tokens))
+                reason = types.FinishReason.MAX_TOKENS if len(self.requests) == 1 else types.FinishReason.STOP
+                yield MagicMock(text="Parça" if len(self.requests) == 1 else " devamı",
+                                candidates=[MagicMock(finish_reason=reason)],
+                                usage_metadata=MagicMock(prompt_token_count=10, candidates_token_count=5))
+        backend = TruncatingBackend()
+        records = []
+        self.api.router = BackendRouter([backend])
+        self.api.usage_callback = records.append
+        self.assertEqual("".join(self.api.translate_text_stream("Short text")), "Parça devamı")
+        self.assertEqual(len(backend.requests), 2)
+        self.assertLess(backend.requests[0][1], 2048)  # Kısa girdi için küçük limit
+        self.assertEqual(records[0]["continuations"], 1)
+        self.assertEqual(records[0]["output_tokens"], 10)
+
+    def test_translate_batch_single_request(self):
+        backend = FakeBackend("fake", ['["Bir", ', '"İki"]'])
+        self.api.router = BackendRouter([backend])
+        self.assertEqual(self.api.translate_batch(["One", "Two"]), ["Bir", "İki"])
+        self.assertEqual(backend.calls, 1)
+
+    def test_translate_batch_falls_back_per_item(self):
+        class EchoBackend(TranslationBackend):
+            name = "echo"
+            def stream(self, contents, config):
+                # Toplu istekte bozuk JSON, tekil istekte düzgün çeviri
+                text = "not json" if contents.startswith("[") else f"TR:{contents}"
+                yield MagicMock(text=text)
+        self.api.router = BackendRouter([EchoBackend()])
+        self.assertEqual(self.api.translate_batch(["One", "Two"]), ["TR:One", "TR:Two"])
+
+    def test_style_profiles_prebuild_and_reuse_configs(self):
+        self.api.set_profiles([{"name": "Academic", "system_prompt": "A"},
+                               {"name": "Terse", "system_prompt": "T", "temperature": 0.0, "max_output_tokens": 256}])
+        academic, terse = self.api.profile("Academic"), self.api.profile("Terse")
+        self.assertEqual(terse.stream_config.max_output_tokens, 256)
+        self.assertIn("T", terse.batch_config.system_instruction)
+        self.assertIs(self.api.profile("Unknown"), academic)  # Tanımsız stil varsayılan profille çevrilir
+        self.assertNotEqual(academic.prompt_hash, terse.prompt_hash)
+        self.api.set_profiles([{"name": "Academic", "system_prompt": "A"},
+                               {"name": "Terse", "system_prompt": "T2", "temperature": 0.0, "max_output_tokens": 256}])
+        self.assertIs(self.api.profile("Academic"), academic)  # Değişmeyen profil (ve config'i) korunur
+        self.assertIsNot(self.api.profile("Terse"), terse)
+
+    def test_builtin_profiles_resolve_prompt_from_code(self):
+        self.api.set_profiles([{"name": "Casual", "system_prompt": None}, {"name": "Legal", "system_prompt": None}])
+        self.assertEqual(self.api.profile("Casual").system_prompt, BUILTIN_STYLE_PROMPTS["Casual"])
+        self.assertEqual(self.api.profile("Legal").system_prompt, BUILTIN_STYLE_PROMPTS["Academic"])
+
+    def test_profile_with_other_model_gets_own_router(self):
+        self.api.set_profiles([{"name": "Academic", "system_prompt": "A"},
+                               {"name": "Pro", "system_prompt": "P", "model": "gemini-2.5-pro"}])
+        self.assertIs(self.api._router_for(self.api.profile("Academic")), self.api.router)
+        router = self.api._router_for(self.api.profile("Pro"))
+        self.assertIsNot(router, self.api.router)
+        self.assertIs(self.api._router_for(self.api.profile("Pro")), router)
+
+    def test_translate_batch_respects_token_budget(self):
+        batches = list(self.api._pack_batches(["word " * 20] * 5, token_budget=60))
+        self.assertEqual(sum(len(b) for b in batches), 5)
+        self.assertGreater(len(batches), 1)
+
 if __name__ == '__main__':
     unittest.main()
@@ -38,7 +38,8 @@ class HistoryItemWidget(QFrame):
 
         # Üst Satır: Tarih (Sol)
         timestamp = item_data['timestamp'].split('.')[0] 
-        time_lbl = QLabel(f"🕒 {timestamp}")
+        hits = item_data.get('hit_count') or 0
+        time_lbl = QLabel(f"🕒 {timestamp}" + (f"  ·  🔁 {hits}" if hits else ""))
         time_lbl.setStyleSheet("color: #888; font-size: 11px; border: none; background: transparent;")
         layout.addWidget(time_lbl)
 
@@ -99,6 +100,8 @@ class HistoryItemWidget(QFrame):
             QTimer.singleShot(1000, lambda: window.setWindowTitle(original_title))
 
 class HistoryWindow(QWidget):
+    history_cleared = pyqtSignal()
+
     def __init__(self):
         super().__init__()
         self.db = DatabaseManager()
@@ -177,9 +180,8 @@ class HistoryWindow(QWidget):
             if item.widget():
                 item.widget().deleteLater()
                 
-        history = self.db.get_last_history()
-        
-        history = self.db.get_last_history()
+        # Tembel liste: Metinler widget oluşturulurken snapshot'tan dilimlenir
+        history = self.db.get_history_view()
         
         # ASYNC LOADING (Arayüz donmasını engeller)
         iterator = iter(history)
@@ -211,3 +213,5 @@ class HistoryWindow(QWidget):
         if reply == QMessageBox.StandardButton.Yes:
             self.db.clear_history()
             self.load_data()
+            # Sıkıştırma (VACUUM) arka planda: UI thread'i bloklanmaz
+            self.history_cleared.emit()
@@ -1,11 +1,13 @@
 from PyQt6.QtWidgets import (
     QMainWindow, QTextEdit, QVBoxLayout, QWidget, QLabel, 
-    QSplitter, QProgressBar, QApplication, QPushButton, QHBoxLayout, QFrame
+    QSplitter, QProgressBar, QApplication, QPushButton, QHBoxLayout, QFrame, QComboBox
 )
 from PyQt6.QtCore import Qt, QTimer, QSize, QEvent, pyqtSignal
-from PyQt6.QtGui import QCursor, QTextCursor, QIcon, QFont, QAction, QPixmap
+from PyQt6.QtGui import QCursor, QTextCursor, QIcon, QFont, QAction, QPixmap, QShortcut, QKeySequence
 import platform
 import os
+import time
+import logging
 import subprocess
 try:
     if platform.system() == 'Darwin':
@@ -13,9 +15,26 @@ try:
 except ImportError:
     pass
 
+from core.diffing import utf16_offset
+from core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# 60Hz ekranda bir kare; gösterim yolu bunu aşarsa loglanır
+FRAME_BUDGET = 1 / 60
+# stage=show: move_to_cursor_position -> ilk boyama | stage=activation: Cmd+C+C -> ilk boyama
+POPUP_SHOW_SECONDS = metrics.histogram("mytranslator_popup_show_seconds", "Popup görünür olana kadar geçen süre",
+                                       buckets=(0.004, 0.008, 0.016, 0.033, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5))
+
 class TranslationPopup(QMainWindow):
-    # Yeni Signal: Rephrase/Humanize isteği için (source_text, current_text) gönderir
-    humanize_requested = pyqtSignal(str, str) 
+    # Yeni Signal: Rephrase/Humanize isteği için (source_text, current_text, force_new) gönderir
+    humanize_requested = pyqtSignal(str, str, bool)
+    # Düzenlenen kaynak için: (eski kaynak, yeni kaynak, mevcut çeviri)
+    edit_requested = pyqtSignal(str, str, str)
+    # Stil seçici: Seçilen profil adı
+    style_changed = pyqtSignal(str)
+    # Geçmiş penceresinde geçmiş silindi (sıkıştırma arka planda planlanır)
+    history_cleared = pyqtSignal()
 
     def __init__(self):
         super().__init__()
@@ -23,6 +42,11 @@ class TranslationPopup(QMainWindow):
         # --- EKLENEN KISIM 1: Değişkeni Başlat ---
         self.original_translation = None 
         # ---------------------------------------
+        # Son humanize isteğinin girdisi ve çıktısı: Değişmemiş çıktıya tekrar tıklama = yeni varyant
+        self.humanize_input = None
+        self.humanize_output = None
+        self._humanizing = False
+        self.committed_source = None  # Mevcut çevirinin ait olduğu kaynak metin
 
         # --- PENCERE AYARLARI (DÜZELTİLDİ) ---
         self.setWindowFlags(
@@ -36,6 +60,23 @@ class TranslationPopup(QMainWindow):
         self.resize(500, 480) 
         self.initUI()
 
+        # Gösterim yolu durumu
+        self._screen_geometry = {}   # ekran adı -> availableGeometry (ekran değişince silinir)
+        self._watch_screens()
+        self._show_started = None    # (activation, show) perf_counter; ilk boyamada ölçülür
+        self._height_pending = False
+        self._prewarm()
+
+    def _prewarm(self):
+        """
+        İLK AÇILIŞ MALİYETİNİ BAŞLANGIÇTA ÖDE
+        Native pencere, stil (polish) ve layout gizliyken hazırlanır; aktivasyonda
+        pencere sadece taşınıp gösterilir. Aynı pencere her aktivasyonda tekrar kullanılır.
+        """
+        self.winId()
+        self.ensurePolished()  # Alt widget'ları da polish eder (stylesheet'ler)
+        self.centralWidget().layout().activate()
+
     def initUI(self):
         central_widget = QWidget()
         central_widget.setStyleSheet("background-color: #FFFFFF;")
@@ -64,7 +105,26 @@ class TranslationPopup(QMainWindow):
         top_header_layout.addWidget(self.title_label)
         
         top_header_layout.addStretch()
-        
+
+        # STİL SEÇİCİ (Profiller DB'den gelir: set_styles)
+        self.style_combo = QComboBox()
+        self.style_combo.setToolTip("Çeviri stili")
+        self.style_combo.setCursor(Qt.CursorShape.PointingHandCursor)
+        self.style_combo.setStyleSheet("""
+            QComboBox {
+                background-color: transparent;
+                border: 1px solid #ddd;
+                border-radius: 6px;
+                padding: 2px 8px;
+                color: #555;
+                font-size: 12px;
+            }
+            QComboBox:hover { background-color: #e0e0e0; }
+        """)
+        self.style_combo.currentTextChanged.connect(self._on_style_selected)
+        self.style_combo.hide()
+        top_header_layout.addWidget(self.style_combo)
+
         self.history_btn = QPushButton("🕒")
         self.history_btn.setFixedSize(30, 30)
         self.history_btn.setToolTip("Geçmiş (Son 100)")
@@ -115,8 +175,10 @@ class TranslationPopup(QMainWindow):
 
         # 1. ÜST BÖLME
         self.original_text = QTextEdit()
-        self.original_text.setReadOnly(True)
-        self.original_text.setPlaceholderText("Kaynak metin...")
+        self.original_text.setAcceptRichText(False)
+        self.original_text.setPlaceholderText("Kaynak metin... (düzenleyip Ctrl+Enter)")
+        self.original_text.textChanged.connect(self.on_source_edited)
+        QShortcut(QKeySequence("Ctrl+Return"), self.original_text, activated=self.request_edit_translation)
         self.original_text.setStyleSheet("""
             QTextEdit { 
                 border: none; 
@@ -184,7 +246,7 @@ class TranslationPopup(QMainWindow):
 
         # HUMANİZE BUTONU
         self.humanize_btn = QPushButton("✨") 
-        self.humanize_btn.setToolTip("Humanize (Daha Doğal Yap)")
+        self.humanize_btn.setToolTip("Humanize (Daha Doğal Yap)\nTekrar tıkla: Yeni varyant · Shift+tık: Kayıtlı varyantlar")
         self.humanize_btn.setFixedSize(32, 32)
         self.humanize_btn.setCursor(Qt.CursorShape.PointingHandCursor)
         self.humanize_btn.setStyleSheet("""
@@ -204,6 +266,27 @@ class TranslationPopup(QMainWindow):
         self.humanize_btn.clicked.connect(self.on_humanize_click)
         self.humanize_btn.hide() # Başlangıçta gizli
 
+        # YENİDEN ÇEVİR BUTONU (Kaynak düzenlenince görünür)
+        self.retranslate_btn = QPushButton("🔄")
+        self.retranslate_btn.setToolTip("Değişen cümleleri yeniden çevir (Ctrl+Enter)")
+        self.retranslate_btn.setFixedSize(32, 32)
+        self.retranslate_btn.setCursor(Qt.CursorShape.PointingHandCursor)
+        self.retranslate_btn.setStyleSheet("""
+            QPushButton {
+                background-color: transparent; 
+                border: none;
+                border-radius: 4px;
+                font-size: 16px;
+            }
+            QPushButton:hover { 
+                background-color: #E3F2FD;
+                border: 1px solid #BBDEFB;
+            }
+        """)
+        self.retranslate_btn.clicked.connect(self.request_edit_translation)
+        self.retranslate_btn.hide()
+
+        header_row_layout.addWidget(self.retranslate_btn)
         header_row_layout.addWidget(self.humanize_btn)
         header_row_layout.addWidget(self.copy_btn)
 
@@ -235,21 +318,25 @@ class TranslationPopup(QMainWindow):
 
     def start_loading(self):
         self.progress_bar.show()
-        self.original_text.setText("Veri alınıyor...")
+        self.original_text.setPlainText("Veri alınıyor...")  # setText zengin metin tespiti yapar
         self.translated_text.clear()
         
         # --- EKLENEN KISIM 2: Yeni işlemde eski kaydı temizle ---
         self.original_translation = None 
         # --------------------------------------------------------
+        self.committed_source = None
+        self.humanize_input = self.humanize_output = None
 
         self.copy_btn.hide()
         self.humanize_btn.hide()
+        self.retranslate_btn.hide()
 
     def stop_loading(self):
         self.progress_bar.hide()
         if self.translated_text.toPlainText():
             self.copy_btn.show()
             self.humanize_btn.show()
+        self.on_source_edited()
 
     def update_content(self, data):
         try:
@@ -263,8 +350,14 @@ class TranslationPopup(QMainWindow):
                 
             if isinstance(data, dict):
                 if "source_text" in data:
-                    self.original_text.setText(data["source_text"])
-                    self.adjust_input_height()
+                    self.committed_source = data["source_text"]
+                    self.original_text.setPlainText(data["source_text"])
+                    self._schedule_input_height()
+                if "patches" in data:
+                    self.apply_patches(data["patches"])
+                if "source_committed" in data:
+                    self.committed_source = data["source_committed"]
+                    self.on_source_edited()
                 if "chunk" in data:
                     self.append_chunk(data["chunk"])
                 elif "translation" in data:
@@ -273,6 +366,9 @@ class TranslationPopup(QMainWindow):
                     self.stop_loading()
                     if self.original_translation is None:
                          self.original_translation = self.translated_text.toPlainText()
+                    if self._humanizing:
+                        self._humanizing = False
+                        self.humanize_output = self.translated_text.toPlainText()
                 
             elif isinstance(data, str):
                 self.stop_loading()
@@ -282,9 +378,7 @@ class TranslationPopup(QMainWindow):
                 else:
                     self.update_text(data)
         except Exception as e:
-            print(f"Error in update_content: {e}")
-            import traceback
-            traceback.print_exc()
+            logger.exception(f"Error in update_content: {e}")
             
     def update_text(self, content):
         """Metni tamamen değiştirir (İlk açılışta veya temizlemede)"""
@@ -304,20 +398,91 @@ class TranslationPopup(QMainWindow):
             sb = self.translated_text.verticalScrollBar()
             sb.setValue(sb.maximum())
         except Exception as e:
-            print(f"Error append: {e}")
+            logger.error(f"Error append: {e}")
+
+    def set_styles(self, names, current):
+        """Stil listesini doldurur; tek profil varsa seçici gizli kalır."""
+        self.style_combo.blockSignals(True)
+        self.style_combo.clear()
+        self.style_combo.addItems(names)
+        self.style_combo.setCurrentText(current)
+        self.style_combo.blockSignals(False)
+        self.style_combo.setVisible(len(names) > 1)
+
+    def _on_style_selected(self, name):
+        if name:
+            self.style_changed.emit(name)
+
+    def on_source_edited(self):
+        """Kaynak, çevirisi gösterilen metinden farklıysa yeniden çevir butonu görünür."""
+        edited = (self.committed_source is not None and not self.progress_bar.isVisible()
+                  and self.original_text.toPlainText().strip() != self.committed_source)
+        self.retranslate_btn.setVisible(edited)
+
+    def request_edit_translation(self):
+        new_source = self.original_text.toPlainText()
+        translation = self.translated_text.toPlainText()
+        if self.committed_source is None or not translation or new_source.strip() == self.committed_source:
+            return
+        self.progress_bar.show()
+        self.retranslate_btn.hide()
+        self.info_label.setText("")
+        self.original_translation = None  # Humanize referansı yeni çeviri olur
+        self.humanize_input = self.humanize_output = None
+        self.edit_requested.emit(self.committed_source, new_source, translation)
+
+    def apply_patches(self, patches):
+        """
+        Sadece değişen aralıklar yerinde güncellenir (tüm metin yeniden çizilmez).
+        Aralıklar sondan başa gelir; Python indeksleri QTextDocument (UTF-16) konumlarına çevrilir.
+        """
+        text = self.translated_text.toPlainText()
+        cursor = QTextCursor(self.translated_text.document())
+        cursor.beginEditBlock()
+        try:
+            for start, end, replacement in patches:
+                cursor.setPosition(utf16_offset(text, start))
+                cursor.setPosition(utf16_offset(text, end), QTextCursor.MoveMode.KeepAnchor)
+                cursor.insertText(replacement)
+        finally:
+            cursor.endEditBlock()
 
     def on_humanize_click(self):
         """Humanize butonuna basılınca"""
-        print("DEBUG: Humanize Button Clicked!") # Debug Log
+        logger.debug("Humanize Button Clicked!")
         current_text = self.translated_text.toPlainText()
         
         # Eğer henüz orijinal kaydedilmediyse (örn. tamamlanmadan basıldıysa), şu anki hali orijinal kabul et
         source_ref = self.original_translation if self.original_translation else current_text
-        
+
+        # Değişmemiş humanize çıktısına tekrar tıklama: Aynı girdi için yeni varyant üretilir,
+        # Shift ile kayıtlı varyantlar arasında (en az gösterilen önce) gezilir
+        force_new = False
+        if self.humanize_output is not None and current_text == self.humanize_output:
+            current_text = self.humanize_input
+            force_new = not (QApplication.keyboardModifiers() & Qt.KeyboardModifier.ShiftModifier)
+        else:
+            self.humanize_input = current_text
+
         if source_ref.strip():
             self.translated_text.setPlainText("Humanizing...") 
-            # (Source Reference, Current Text) gönderilir
-            self.humanize_requested.emit(source_ref, current_text)
+            self._humanizing = True
+            self.humanize_output = None
+            # (Source Reference, Current Text, Yeni Varyant) gönderilir
+            self.humanize_requested.emit(source_ref, current_text, force_new)
+
+    def _schedule_input_height(self):
+        """Doküman layout'u (yükseklik hesabı) ilk boyamadan sonraya ertelenir; art arda istekler birleşir."""
+        if self._height_pending:
+            return
+        self._height_pending = True
+        if self._show_started is None:
+            QTimer.singleShot(0, self._run_input_height)
+        # Aksi halde paintEvent ilk boyamadan sonra çalıştırır
+
+    def _run_input_height(self):
+        self._height_pending = False
+        self.adjust_input_height()
 
     def adjust_input_height(self):
         doc_height = self.original_text.document().size().height()
@@ -327,24 +492,47 @@ class TranslationPopup(QMainWindow):
         final_height = max(60, min(target_height, max_allowed_height))
         self.splitter.setSizes([final_height, total_height - final_height])
 
-    def move_to_cursor_position(self):
+    def _watch_screens(self):
+        """Ekran sinyallerine bir kez bağlanır: Her ekran eklendiğinde tek bağlantı, önbellek ıskasında hiç."""
+        app = QApplication.instance()
+        for screen in app.screens():
+            self._watch_screen(screen)
+        app.screenAdded.connect(self._watch_screen)
+        app.screenRemoved.connect(lambda screen: self._screen_geometry.pop(screen.name(), None))
+
+    def _watch_screen(self, screen):
+        key = screen.name()
+        self._screen_geometry.pop(key, None)
+        # Dock/menü çubuğu veya çözünürlük değişirse önbellek düşer
+        screen.availableGeometryChanged.connect(lambda *_: self._screen_geometry.pop(key, None))
+
+    def _available_geometry(self, screen):
+        key = screen.name()
+        geo = self._screen_geometry.get(key)
+        if geo is None:
+            geo = self._screen_geometry[key] = screen.availableGeometry()
+        return geo
+
+    def move_to_cursor_position(self, activated_at=None):
+        started = time.perf_counter()
+        self._show_started = (activated_at, started)
+
         # 1. Pencereyi mouse yanına taşı
-        self.hide()
         mouse_pos = QCursor.pos()
         target_screen = QApplication.screenAt(mouse_pos) or QApplication.primaryScreen()
-        
-        if not self.windowHandle(): self.winId()
-        if self.windowHandle(): self.windowHandle().setScreen(target_screen)
-        
-        geo = target_screen.availableGeometry()
+        geo = self._available_geometry(target_screen)
+
         x = mouse_pos.x() + 20
         y = mouse_pos.y() + 20
-        
         if x + self.width() > geo.right(): x = geo.right() - self.width() - 20
         if y + self.height() > geo.bottom(): y = geo.bottom() - self.height() - 20
-        
-        self.move(x, y)
-        self.showNormal()
+
+        handle = self.windowHandle()
+        if handle.screen() is not target_screen: handle.setScreen(target_screen)
+        if self.pos().x() != x or self.pos().y() != y: self.move(x, y)
+        # Zaten açıksa hide/show döngüsü yok: sadece taşınır ve öne getirilir
+        if not self.isVisible() or self.isMinimized():
+            self.showNormal()
         try:
             self.raise_()
             self.activateWindow()
@@ -356,12 +544,31 @@ class TranslationPopup(QMainWindow):
             try:
                 NSApplication.sharedApplication().activateIgnoringOtherApps_(True)
             except Exception as e:
-                print(f"Focus Error: {e}")
+                logger.error(f"Focus Error: {e}")
+
+        self.update()  # Açık pencerede de bir sonraki karede paintEvent -> ölçüm
+
+    def paintEvent(self, event):
+        super().paintEvent(event)
+        if self._show_started is None:
+            return
+        now = time.perf_counter()
+        activated_at, started = self._show_started
+        self._show_started = None
+        show_seconds = now - started
+        POPUP_SHOW_SECONDS.observe(show_seconds, stage="show")
+        if activated_at is not None:
+            POPUP_SHOW_SECONDS.observe(now - activated_at, stage="activation")
+        if show_seconds > FRAME_BUDGET:
+            logger.info(f"🐢 [Popup] Gösterim {show_seconds * 1000:.1f}ms (> 1 kare)")
+        if self._height_pending:
+            QTimer.singleShot(0, self._run_input_height)
 
     def open_history(self):
         from ui.history_window import HistoryWindow
         if not hasattr(self, 'history_window') or self.history_window is None:
             self.history_window = HistoryWindow()
+            self.history_window.history_cleared.connect(self.history_cleared)
         self.history_window.load_data()
         self.history_window.show()
         self.history_window.raise_()